@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+SSE-поток уведомлений (api/v1/async/notifications/stream/) держит
+соединение открытым и работает только под ASGI.
 """
 
 import os
@@ -0,0 +1,136 @@
+"""
+Общие части асинхронных read-only endpoints.
+
+DRF 3.15 не умеет асинхронные view, поэтому горячие эндпоинты чтения
+реализованы обычными async view Django поверх асинхронного ORM. Здесь —
+то, что в синхронных view делает DRF: JWT-аутентификация, ответы в формате
+DRF и постраничная выдача, совместимая с PageNumberPagination.
+
+Сериализаторы DRF используются как есть, но только над уже загруженными
+объектами: любой ленивый запрос к БД внутри них под ASGI приведет к
+SynchronousOnlyOperation, поэтому все связи загружаются заранее.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from baseAPI.renderers import dumps
+
+
+def api_response(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+async def aauthenticate(request):
+    """
+    Асинхронная JWT-аутентификация (аналог JWTAuthentication.authenticate).
+
+    Проверка подписи токена не обращается к БД, пользователь загружается
+    через aget. Результат сохраняется в request.user. При неверном токене
+    поднимает AuthenticationFailed.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        request.user = AnonymousUser()
+        return request.user
+
+    validated_token = authentication.get_validated_token(raw_token)
+    try:
+        user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise AuthenticationFailed("Token contained no recognizable user identification")
+    try:
+        user = await get_user_model().objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+    except get_user_model().DoesNotExist:
+        raise AuthenticationFailed("User not found", code='user_not_found')
+    if not user.is_active:
+        raise AuthenticationFailed("User is inactive", code='user_inactive')
+
+    request.user = user
+    return user
+
+
+def authentication_failed_response(exc):
+    response = api_response(exc.detail, status=exc.status_code)
+    response['WWW-Authenticate'] = JWTAuthentication().authenticate_header(None)
+    return response
+
+
+def not_authenticated_response():
+    return authentication_failed_response(
+        AuthenticationFailed("Authentication credentials were not provided.", code='not_authenticated')
+    )
+
+
+class AsyncPageNumberPagination:
+    """Постраничная выдача с тем же форматом ответа, что у PageNumberPagination."""
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.GET[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def get_page_number(self, request):
+        try:
+            page_number = int(request.GET.get('page', 1))
+        except ValueError:
+            return None
+        return page_number if page_number > 0 else None
+
+    async def paginate_queryset(self, queryset, request):
+        """
+        Возвращает объекты страницы или None, если страницы нет.
+
+        Страница читается через aiterator(chunk_size=...), поэтому
+        prefetch_related выполняется пачками по размеру страницы.
+        """
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        self.page_number = self.get_page_number(request)
+        self.count = await queryset.acount()
+        if self.page_number is None:
+            return None
+        start = (self.page_number - 1) * self.page_size_value
+        if start and start >= self.count:
+            return None
+        page = queryset[start:start + self.page_size_value]
+        return [obj async for obj in page.aiterator(chunk_size=self.page_size_value)]
+
+    def get_next_link(self):
+        if self.page_number * self.page_size_value >= self.count:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, 'page', self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, 'page')
+        return replace_query_param(url, 'page', self.page_number - 1)
+
+    def get_paginated_response(self, data, **extra):
+        """extra — дополнительные ключи ответа после results (например, facets)."""
+        return api_response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+            **extra,
+        })
+
+
+def invalid_page_response():
+    return api_response({"detail": "Invalid page."}, status=404)
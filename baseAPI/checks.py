@@ -0,0 +1,39 @@
+"""
+Системные проверки настроек, которые Django сам не проверяет.
+
+Состояние троттлинга и circuit breaker чата, сигналы уведомлений и
+закрепление за основной базой после записи (baseAPI/db_router.py) хранятся
+в кэше и должны быть общими для всех воркеров Gunicorn. Кэш процесса
+(LocMemCache) и DummyCache для этого не подходят: каждый воркер видел бы
+только свое состояние. В разработке это допустимо, поэтому проверка —
+ошибка только в manage.py check --deploy.
+"""
+from django.conf import settings
+from django.core import checks
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def check_shared_cache(setting_name, default, check_id):
+    """Ошибки, если кэш из настройки setting_name не общий для воркеров."""
+    alias = getattr(settings, setting_name, default)
+    if alias not in settings.CACHES:
+        return [checks.Error(f"{setting_name} refers to unknown cache alias {alias!r}.", id=check_id)]
+    backend = settings.CACHES[alias].get('BACKEND')
+    if backend in PROCESS_LOCAL_BACKENDS:
+        return [checks.Error(
+            f"{setting_name} uses cache {alias!r} with {backend}, which is not shared between workers.",
+            hint="Set REDIS_URL so that the 'shared' cache uses Redis, or point the setting at a shared cache.",
+            id=check_id,
+        )]
+    return []
+
+
+def check_replica_pin_cache(app_configs=None, **kwargs):
+    """Закрепление за основной базой после записи должно видеть каждый воркер (только при репликах)."""
+    if not getattr(settings, 'DATABASE_REPLICAS', []):
+        return []
+    return check_shared_cache('REPLICA_PIN_CACHE', 'shared', 'baseAPI.E001')
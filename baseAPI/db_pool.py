@@ -0,0 +1,207 @@
+"""
+Пул соединений с базой данных на процесс.
+
+Django (кроме PostgreSQL) открывает новое соединение на каждый запрос при
+CONN_MAX_AGE=0 и каждый раз платит за TCP, аутентификацию и init_command.
+Пул хранит ограниченное число открытых соединений и выдает их повторно:
+
+- MAX_SIZE   — сколько соединений может существовать одновременно;
+- TIMEOUT    — сколько секунд ждать свободного соединения, когда пул исчерпан;
+- MAX_LIFETIME — через сколько секунд соединение закрывается и создается заново;
+- PRE_PING   — проверять ли соединение перед выдачей (ping), чтобы не отдать
+               разорванное сервером соединение.
+
+Статистика (get_pool_stats) доступна для инструментирования.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_OPTIONS = {
+    'MAX_SIZE': 10,
+    'TIMEOUT': 5,
+    'MAX_LIFETIME': 1800,
+    'PRE_PING': True,
+}
+
+
+class PoolTimeout(Exception):
+    """Не удалось получить соединение за отведенное время."""
+
+
+class ConnectionPool:
+    def __init__(self, create, ping, close, max_size=10, timeout=5, max_lifetime=1800, pre_ping=True):
+        self._create = create
+        self._ping = ping
+        self._close = close
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.pre_ping = pre_ping
+
+        self._condition = threading.Condition()
+        self._idle = []
+        # id(raw connection) -> время создания, для всех выданных и свободных соединений
+        self._created_at = {}
+        self._pid = os.getpid()
+
+        self.created = 0
+        self.reused = 0
+        self.recycled = 0
+        self.ping_failures = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.timeouts = 0
+
+    @property
+    def size(self):
+        return len(self._created_at)
+
+    @property
+    def in_use(self):
+        return self.size - len(self._idle)
+
+    def _check_fork(self):
+        # После fork соединения родителя использовать нельзя: сокеты общие.
+        # Закрывать их тоже нельзя (закрытие отправит COM_QUIT за родителя).
+        if self._pid != os.getpid():
+            self._idle = []
+            self._created_at = {}
+            self._pid = os.getpid()
+
+    def _expired(self, connection):
+        created_at = self._created_at.get(id(connection), 0)
+        return self.max_lifetime is not None and time.monotonic() - created_at > self.max_lifetime
+
+    def _discard(self, connection):
+        self._created_at.pop(id(connection), None)
+        try:
+            self._close(connection)
+        except Exception:
+            logger.debug("Error while closing pooled connection", exc_info=True)
+
+    def acquire(self):
+        """Выдает соединение из пула, при необходимости создавая новое."""
+        started = time.monotonic()
+        with self._condition:
+            self._check_fork()
+            while True:
+                while self._idle:
+                    connection = self._idle.pop()
+                    if self._expired(connection):
+                        self.recycled += 1
+                        self._discard(connection)
+                        continue
+                    if self.pre_ping and not self._is_alive(connection):
+                        self.ping_failures += 1
+                        self._discard(connection)
+                        continue
+                    self.reused += 1
+                    return connection
+
+                if self.size < self.max_size:
+                    # Резервируем место, чтобы не держать блокировку во время подключения
+                    placeholder = object()
+                    self._created_at[id(placeholder)] = time.monotonic()
+                    break
+
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f"Could not get a database connection within {self.timeout}s "
+                        f"(pool size {self.max_size})"
+                    )
+                self.waits += 1
+                wait_started = time.monotonic()
+                self._condition.wait(remaining)
+                self.wait_time += time.monotonic() - wait_started
+
+        try:
+            connection = self._create()
+        except Exception:
+            with self._condition:
+                self._created_at.pop(id(placeholder), None)
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._created_at.pop(id(placeholder), None)
+            self._created_at[id(connection)] = time.monotonic()
+            self.created += 1
+        return connection
+
+    def _is_alive(self, connection):
+        try:
+            self._ping(connection)
+            return True
+        except Exception:
+            return False
+
+    def release(self, connection, discard=False):
+        """Возвращает соединение в пул (или закрывает, если оно испорчено или устарело)."""
+        with self._condition:
+            if self._pid != os.getpid() or id(connection) not in self._created_at:
+                return
+            if discard or self._expired(connection):
+                if not discard:
+                    self.recycled += 1
+                self._discard(connection)
+            else:
+                self._idle.append(connection)
+            self._condition.notify()
+
+    def close_all(self):
+        """Закрывает все свободные соединения (например, перед fork)."""
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop())
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'in_use': self.in_use,
+            'idle': len(self._idle),
+            'max_size': self.max_size,
+            'created': self.created,
+            'reused': self.reused,
+            'recycled': self.recycled,
+            'ping_failures': self.ping_failures,
+            'waits': self.waits,
+            'wait_time': self.wait_time,
+            'timeouts': self.timeouts,
+        }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, create, ping, close, options=None):
+    """Пул для алиаса базы; создается при первом обращении."""
+    pool = _pools.get(alias)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(alias)
+            if pool is None:
+                opts = {**DEFAULT_POOL_OPTIONS, **(options or {})}
+                pool = _pools[alias] = ConnectionPool(
+                    create, ping, close,
+                    max_size=opts['MAX_SIZE'],
+                    timeout=opts['TIMEOUT'],
+                    max_lifetime=opts['MAX_LIFETIME'],
+                    pre_ping=opts['PRE_PING'],
+                )
+    return pool
+
+
+def get_pool_stats():
+    """Статистика всех пулов процесса: {alias: {...}}."""
+    return {alias: pool.stats() for alias, pool in _pools.items()}
+
+
+def close_all_pools():
+    for pool in list(_pools.values()):
+        pool.close_all()
@@ -0,0 +1,157 @@
+"""
+Маршрутизация запросов между основной базой и репликами.
+
+- Запись всегда идет в default.
+- Чтение идет на одну из реплик (DATABASE_REPLICAS), кроме случаев:
+  * запрос изменяет данные (POST/PUT/PATCH/DELETE) — весь запрос работает с default;
+  * пользователь недавно что-то записал — в течение REPLICA_PIN_SECONDS его чтения
+    идут в default (read-your-writes): признак хранится в cookie и в кэше по id
+    пользователя, чтобы работать и для JWT-клиентов без cookie. Кэш
+    REPLICA_PIN_CACHE (по умолчанию shared) должен быть общим для воркеров,
+    иначе чтение на другом воркере уйдет в отстающую реплику — с репликами
+    manage.py check --deploy требует этого (baseAPI.E001);
+  * открыта транзакция на default — чтение внутри нее должно видеть свои же записи.
+
+Без настроенных реплик роутер ничего не меняет.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import empty
+
+PIN_COOKIE_NAME = 'db_pin_primary'
+PIN_CACHE_KEY = 'db_pin_primary:{}'
+
+_current_request = ContextVar('db_router_request', default=None)
+_force_primary = ContextVar('db_router_force_primary', default=False)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def get_pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+
+def get_pin_cache():
+    return caches[getattr(settings, 'REPLICA_PIN_CACHE', 'shared')]
+
+
+def _get_authenticated_user_id(request):
+    """id пользователя, если аутентификация уже выполнена (без обращения к БД)."""
+    user = request.__dict__.get('user')
+    if user is None:
+        return None
+    # Ленивый request.user еще не вычислен: вычисление само читает БД через роутер
+    if getattr(user, '_wrapped', None) is empty:
+        return None
+    if not user.is_authenticated:
+        return None
+    return user.pk
+
+
+def is_pinned_to_primary(request):
+    if request is None:
+        return False
+    if request.COOKIES.get(PIN_COOKIE_NAME):
+        return True
+    user_id = _get_authenticated_user_id(request)
+    if user_id is None:
+        return False
+    cached = request.__dict__.get('_db_pin_checked')
+    if cached is None or cached[0] != user_id:
+        cached = (user_id, bool(get_pin_cache().get(PIN_CACHE_KEY.format(user_id))))
+        request._db_pin_checked = cached
+    return cached[1]
+
+
+def use_primary():
+    """Нужно ли в текущем контексте читать из default."""
+    if _force_primary.get():
+        return True
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return True
+    return is_pinned_to_primary(_current_request.get())
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if not replicas or use_primary():
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит через репликацию
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """
+    Делает контекст запроса доступным роутеру и закрепляет пользователя
+    за основной базой на короткое время после записи.
+
+    Поддерживает и синхронный, и асинхронный режим, чтобы под ASGI
+    асинхронные view не переводились в поток ради одного middleware.
+    """
+    sync_capable = True
+    async_capable = True
+    UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        is_write = request.method in self.UNSAFE_METHODS
+        request_token = _current_request.set(request)
+        force_token = _force_primary.set(is_write)
+        try:
+            response = self.get_response(request)
+        finally:
+            _force_primary.reset(force_token)
+            _current_request.reset(request_token)
+        return self.process_response(request, response, is_write)
+
+    async def __acall__(self, request):
+        is_write = request.method in self.UNSAFE_METHODS
+        request_token = _current_request.set(request)
+        force_token = _force_primary.set(is_write)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _force_primary.reset(force_token)
+            _current_request.reset(request_token)
+        return self.process_response(request, response, is_write)
+
+    def process_response(self, request, response, is_write):
+        if is_write and response.status_code < 400 and get_replicas():
+            self.pin(request, response)
+        return response
+
+    def pin(self, request, response):
+        seconds = get_pin_seconds()
+        response.set_cookie(PIN_COOKIE_NAME, '1', max_age=seconds, httponly=True, samesite='Lax')
+        user_id = _get_authenticated_user_id(request)
+        if user_id is not None:
+            get_pin_cache().set(PIN_CACHE_KEY.format(user_id), True, seconds)
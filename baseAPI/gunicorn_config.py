@@ -0,0 +1,84 @@
+"""
+Конфигурация Gunicorn.
+
+    gunicorn -c python:baseAPI.gunicorn_config
+
+- preload_app: Django загружается и прогревается в мастере (baseAPI.warmup),
+  воркеры получают импортированные модули, скомпилированные URL и схему
+  через copy-on-write и не тратят на это время и память каждый сам;
+- post_fork: пересоздаются клиенты, которые нельзя делить между процессами;
+- post_worker_init: воркер открывает соединения с БД и кэшем до первого запроса;
+- в лог пишется RSS/PSS каждого воркера после запуска и время его первого запроса.
+
+Параметры задаются переменными окружения GUNICORN_*; GUNICORN_PRELOAD=0
+отключает preload (например, чтобы сравнить память и время первого запроса).
+"""
+import multiprocessing
+import os
+import time
+
+wsgi_app = 'baseAPI.wsgi:application'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def _format_memory(pid):
+    from devtools.process import read_memory
+
+    memory = read_memory(pid)
+    if memory is None:
+        return 'memory n/a'
+    parts = [f"rss {memory['rss'] / 1024:.1f} MB"]
+    for key in ('pss', 'shared', 'private'):
+        if memory[key] is not None:
+            parts.append(f"{key} {memory[key] / 1024:.1f} MB")
+    return ', '.join(parts)
+
+
+def when_ready(server):
+    # Мастер прогревается один раз до запуска воркеров
+    if server.cfg.preload_app:
+        from baseAPI.warmup import warmup_application
+
+        elapsed = warmup_application()
+        server.log.info("Master warmed up in %.0f ms: %s", elapsed, _format_memory(os.getpid()))
+
+
+def post_fork(server, worker):
+    from baseAPI.warmup import reinit_after_fork
+
+    reinit_after_fork()
+
+
+def post_worker_init(worker):
+    from baseAPI.warmup import warmup_application, warmup_worker
+
+    if not worker.cfg.preload_app:
+        warmup_application()
+    elapsed = warmup_worker()
+    worker.first_request_started = None
+    worker.first_request_logged = False
+    worker.log.info("Worker %s ready in %.0f ms: %s", worker.pid, elapsed, _format_memory(worker.pid))
+
+
+def pre_request(worker, req):
+    if not worker.first_request_logged and worker.first_request_started is None:
+        worker.first_request_started = time.perf_counter()
+
+
+def post_request(worker, req, environ, resp):
+    if worker.first_request_logged or worker.first_request_started is None:
+        return
+    worker.first_request_logged = True
+    elapsed = (time.perf_counter() - worker.first_request_started) * 1000
+    worker.log.info("Worker %s first request %s %s took %.1f ms: %s",
+                    worker.pid, req.method, req.path, elapsed, _format_memory(worker.pid))
@@ -0,0 +1,43 @@
+"""
+MySQL-бэкенд Django с пулом соединений (см. baseAPI.db_pool).
+
+Подключается через ENGINE='baseAPI.mysql_pool'; параметры пула задаются
+ключом POOL в настройках базы (не в OPTIONS — они уходят в MySQLdb.connect).
+Django по-прежнему «закрывает» соединение в конце запроса, но физически
+оно возвращается в пул и переиспользуется без повторного TCP, аутентификации
+и init_command.
+"""
+from django.db.backends.mysql import base as mysql_base
+
+from baseAPI.db_pool import get_pool
+
+
+class DatabaseWrapper(mysql_base.DatabaseWrapper):
+    def _get_pool(self, conn_params):
+        # Ключ включает базу и сервер: тестовый раннер меняет NAME на лету,
+        # и соединение к старой базе не должно достаться новому запросу
+        key = ':'.join(str(conn_params.get(param) or '') for param in ('host', 'port', 'user', 'database'))
+        return get_pool(
+            f'{self.alias}:{key}',
+            create=lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+            ping=lambda connection: connection.ping(),
+            close=lambda connection: connection.close(),
+            options=self.settings_dict.get('POOL'),
+        )
+
+    def get_new_connection(self, conn_params):
+        return self._get_pool(conn_params).acquire()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = self._get_pool(self.get_connection_params())
+        broken = self.errors_occurred and not self.is_usable()
+        if not broken:
+            try:
+                # Незавершенная транзакция не должна достаться следующему запросу
+                if not self.get_autocommit():
+                    self.connection.rollback()
+            except self.Database.Error:
+                broken = True
+        pool.release(self.connection, discard=broken)
@@ -0,0 +1,88 @@
+"""
+Быстрые JSON-рендерер и парсер для DRF на orjson.
+
+orjson сам сериализует datetime/date/time/UUID, подклассы dict и list
+(ReturnDict, ReturnList) и пишет UTF-8 без экранирования кириллицы.
+Остальное (Decimal, ленивые строки, QuerySet, timedelta, ...) передается
+стандартному JSONEncoder из DRF, поэтому ответы совпадают с JSONRenderer.
+"""
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder = JSONEncoder()
+
+# Как и JSONRenderer: U+2028 и U+2029 допустимы в JSON, но не в JavaScript
+_LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+def default(obj):
+    return _encoder.default(obj)
+
+
+def dumps(data, indent=False):
+    """Сериализует data в UTF-8 JSON (bytes)."""
+    option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    ret = orjson.dumps(data, default=default, option=option)
+    for char, escaped in _LINE_SEPARATORS:
+        if char in ret:
+            ret = ret.replace(char, escaped)
+    return ret
+
+
+class ORJSONRenderer(BaseRenderer):
+    """Замена rest_framework.renderers.JSONRenderer."""
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def get_indent(self, accepted_media_type, renderer_context):
+        if accepted_media_type:
+            # Браузерный API и клиенты могут запросить форматирование: application/json; indent=4
+            _, _, params = accepted_media_type.partition(';')
+            for param in params.split(';'):
+                key, _, value = param.strip().partition('=')
+                if key == 'indent' and value.strip().isdigit():
+                    return int(value) > 0
+        return bool(renderer_context.get('indent'))
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        return dumps(data, indent=self.get_indent(accepted_media_type, renderer_context))
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline-delimited JSON: по объекту на строку.
+
+    Потоковые выгрузки отдают StreamingHttpResponse сами; рендерер нужен,
+    чтобы клиент мог запросить Accept: application/x-ndjson, и чтобы
+    ошибки (401, 403) пришли одной JSON-строкой.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = [data] if isinstance(data, dict) else data
+        return b''.join(dumps(row) + b'\n' for row in rows)
+
+
+class ORJSONParser(BaseParser):
+    """Замена rest_framework.parsers.JSONParser."""
+    media_type = 'application/json'
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -77,12 +77,16 @@ INSTALLED_APPS = [
     'chatAI',
     'recipe',
     'users.apps.UsersConfig',
+    'profiles',
+    'notifications',
     'storages',
+    'devtools',
 ]
 
 AUTH_USER_MODEL = 'users.CustomUser'
 
 MIDDLEWARE = [
+    'devtools.middleware.QueryInspectorMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.cache.UpdateCacheMiddleware',
@@ -91,6 +95,7 @@ MIDDLEWARE = [
     'django.middleware.cache.FetchFromCacheMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'baseAPI.db_router.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -121,27 +126,58 @@ WSGI_APPLICATION = 'baseAPI.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.sqlite3',
-#         'NAME': BASE_DIR / 'db.sqlite3',
-#     }
-# }
+MYSQL_DATABASE = {
+    # MySQL с пулом соединений на процесс (baseAPI/db_pool.py)
+    'ENGINE': 'baseAPI.mysql_pool',
+    'NAME': os.environ.get("DATABASE_NAME"),
+    'USER': os.environ.get("DATABASE_USER"),
+    'PASSWORD': os.environ.get("DATABASE_PASSWORD"),
+    'HOST': os.environ.get("DATABASE_HOST"),
+    'PORT': '3306',
+    'OPTIONS': {
+        'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+        'charset': 'utf8mb4',
+    },
+    'POOL': {
+        'MAX_SIZE': int(os.environ.get("DATABASE_POOL_SIZE", 10)),
+        'TIMEOUT': 5,
+        'MAX_LIFETIME': 1800,
+        'PRE_PING': True,
+    },
+}
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': os.environ.get("DATABASE_NAME"),
-        'USER': os.environ.get("DATABASE_USER"),
-        'PASSWORD': os.environ.get("DATABASE_PASSWORD"),
-        'HOST': os.environ.get("DATABASE_HOST"),
-        'PORT': '3306',
-        'OPTIONS': {
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-            'charset': 'utf8mb4',
-        },
+# DATABASE_ENGINE=sqlite — локальный запуск без MySQL; реплики — отдельные файлы
+# из DATABASE_REPLICAS (например "replica.sqlite3"), для MySQL — хосты из DATABASE_REPLICA_HOSTS
+if os.environ.get("DATABASE_ENGINE") == "sqlite":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
     }
-}
+    REPLICA_DATABASES = [
+        {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / name}
+        for name in os.environ.get("DATABASE_REPLICAS", "").split(",") if name
+    ]
+else:
+    DATABASES = {
+        'default': MYSQL_DATABASE,
+    }
+    REPLICA_DATABASES = [
+        {**MYSQL_DATABASE, 'HOST': host}
+        for host in os.environ.get("DATABASE_REPLICA_HOSTS", "").split(",") if host
+    ]
+
+for index, replica in enumerate(REPLICA_DATABASES):
+    # В тестах реплика смотрит в тестовую основную базу
+    DATABASES[f'replica_{index}'] = {**replica, 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+DATABASE_ROUTERS = ['baseAPI.db_router.ReplicaRouter']
+# Сколько секунд после записи чтения пользователя идут в основную базу
+REPLICA_PIN_SECONDS = 10
+# Кэш с закреплениями пользователей за основной базой (общий для воркеров)
+REPLICA_PIN_CACHE = 'shared'
 
 # Подключение MongoDB
 MONGO_DB_NAME = 'mongodb'  # Имя вашей БД в MongoDB
@@ -163,6 +199,16 @@ REST_FRAMEWORK = {
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    # JSON через orjson (baseAPI/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'baseAPI.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'baseAPI.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 # Password validation
@@ -247,6 +293,79 @@ STORAGES = {
 
 AI_TOKEN = os.environ.get("AI_TOKEN")
 
+# Лента подписок: рецепты авторов с большим числом подписчиков не рассылаются
+# по лентам при публикации, а подмешиваются при чтении
+FEED_FANOUT_MAX_FOLLOWERS = 5000
+# Сколько последних рецептов автора попадает в ленту сразу после подписки
+FEED_BACKFILL_SIZE = 50
+
+# Чат с ИИ (см. chatAI/throttling.py): token bucket на пользователя —
+# CHAT_RATE_BURST сообщений подряд, дальше CHAT_RATE_PER_MINUTE в минуту,
+# и ограничение числа одновременных генераций ответа
+CHAT_RATE_BURST = 5
+CHAT_RATE_PER_MINUTE = 6
+CHAT_MAX_CONCURRENT = 8
+CHAT_MAX_CONCURRENT_PER_USER = 1
+CHAT_GENERATION_LEASE_SECONDS = 120
+CHAT_CONCURRENCY_RETRY_AFTER = 5
+CHAT_THROTTLE_CACHE = 'shared'
+# Вызовы GigaChat (см. chatAI/resilience.py): таймаут и повторы одного
+# вызова, circuit breaker и максимум одновременных вызовов на все воркеры
+CHAT_AI_TIMEOUT = 20
+CHAT_AI_RETRIES = 1
+CHAT_AI_FAILURE_THRESHOLD = 5
+CHAT_AI_RESET_TIMEOUT = 30
+CHAT_AI_MAX_CONCURRENT = 8
+# Контекст разговора (см. chatAI/context.py): бюджет промпта в токенах;
+# когда несжатых сообщений больше CHAT_SUMMARY_TRIGGER_TURNS, старые
+# (кроме последних CHAT_SUMMARY_KEEP_TURNS) сворачиваются в summary в фоне
+CHAT_CONTEXT_TOKENS = 2000
+CHAT_SUMMARY_TRIGGER_TURNS = 20
+CHAT_SUMMARY_KEEP_TURNS = 6
+CHAT_SUMMARY_INPUT_TOKENS = 3000
+CHAT_SUMMARY_TOKENS = 400
+CHAT_SUMMARY_IN_BACKGROUND = True
+
+# Уведомления (см. notifications/hub.py): кэш для сигналов между воркерами
+# (должен быть общим — shared с REDIS_URL), интервал его опроса, keepalive и
+# максимальная длительность одного SSE-соединения в секундах
+NOTIFICATIONS_CACHE = 'shared'
+NOTIFICATIONS_POLL_INTERVAL = 1
+NOTIFICATIONS_KEEPALIVE = 15
+NOTIFICATIONS_STREAM_TIMEOUT = 300
+
+# Поиск N+1 и медленных запросов (см. devtools/middleware.py) — только для
+# dev/staging. Бюджеты запросов задаются по имени маршрута, например
+# {'recipe_viewset-list': 10}; с QUERY_INSPECTOR_RAISE превышение бюджета
+# поднимает исключение (для тестов)
+QUERY_INSPECTOR_ENABLED = os.environ.get('QUERY_INSPECTOR_ENABLED', '') == '1'
+QUERY_INSPECTOR_N_PLUS_ONE = 5
+QUERY_INSPECTOR_SLOW_MS = 100
+QUERY_INSPECTOR_RAISE = False
+QUERY_BUDGETS = {}
+QUERY_BUDGET_DEFAULT = None
+
+# Кэши: default — локальный кэш процесса, shared — общий для всех воркеров
+# (троттлинг чата, сигналы уведомлений, закрепление за основной базой, см.
+# baseAPI/checks.py). Без REDIS_URL shared тоже локальный — это годится только
+# для разработки, manage.py check --deploy сообщит об ошибке
+REDIS_URL = os.environ.get("REDIS_URL")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": REDIS_URL,
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+        },
+    } if REDIS_URL else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "shared",
+    },
+}
+
 # Cache settings
 # CACHE_MIDDLEWARE_ALIAS = 'default'
 # CACHE_MIDDLEWARE_SECONDS = 60 * 15  # 15 minutes
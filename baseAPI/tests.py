@@ -0,0 +1,265 @@
+import threading
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import SimpleTestCase, RequestFactory, override_settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from baseAPI import db_router
+from baseAPI.checks import check_replica_pin_cache
+from baseAPI.db_pool import ConnectionPool, PoolTimeout
+from baseAPI.db_router import ReplicaRouter, ReplicaPinningMiddleware, PIN_CACHE_KEY, PIN_COOKIE_NAME
+from baseAPI.renderers import ORJSONParser, ORJSONRenderer
+from baseAPI.warmup import warmup_serializers, warmup_urls
+from users.models import CustomUser
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'], REPLICA_PIN_SECONDS=10)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.clear_caches()
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        self.seen_alias = None
+
+    def tearDown(self):
+        self.clear_caches()
+
+    def clear_caches(self):
+        for backend in caches.all():
+            backend.clear()
+
+    def view(self, request):
+        self.seen_alias = self.router.db_for_read(CustomUser)
+        return HttpResponse()
+
+    def run_request(self, request):
+        return ReplicaPinningMiddleware(self.view)(request)
+
+    def test_safe_request_reads_from_replica(self):
+        """Тест: GET без недавних записей читает из реплики"""
+        self.run_request(self.factory.get('/'))
+        self.assertEqual(self.seen_alias, 'replica_0')
+
+    def test_write_request_uses_primary_and_pins(self):
+        """Тест: изменяющий запрос читает из основной базы и закрепляет клиента за ней"""
+        response = self.run_request(self.factory.post('/'))
+        self.assertEqual(self.seen_alias, 'default')
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+        self.assertEqual(response.cookies[PIN_COOKIE_NAME]['max-age'], 10)
+
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE_NAME] = '1'
+        self.run_request(request)
+        self.assertEqual(self.seen_alias, 'default')
+
+    def test_authenticated_user_pinned_through_cache(self):
+        """Тест: клиент без cookie (JWT) закрепляется по id пользователя"""
+        user = CustomUser(id=42, username='pinned')
+
+        request = self.factory.post('/')
+        request.user = user
+        self.run_request(request)
+
+        request = self.factory.get('/')
+        request.user = user
+        self.run_request(request)
+        self.assertEqual(self.seen_alias, 'default')
+
+        request = self.factory.get('/')
+        request.user = CustomUser(id=43, username='other')
+        self.run_request(request)
+        self.assertEqual(self.seen_alias, 'replica_0')
+
+    def test_pin_is_visible_to_other_workers(self):
+        """Тест: закрепление пишется в общий кэш и читается через другой экземпляр (другой воркер)"""
+        user = CustomUser(id=44, username='pinned')
+        writer, reader = caches.create_connection('shared'), caches.create_connection('shared')
+
+        with mock.patch.object(db_router, 'get_pin_cache', return_value=writer):
+            request = self.factory.post('/')
+            request.user = user
+            self.run_request(request)
+        with mock.patch.object(db_router, 'get_pin_cache', return_value=reader):
+            request = self.factory.get('/')
+            request.user = user
+            self.run_request(request)
+        self.assertEqual(self.seen_alias, 'default')
+        self.assertTrue(caches['shared'].get(PIN_CACHE_KEY.format(44)))
+        self.assertIsNone(caches['default'].get(PIN_CACHE_KEY.format(44)))
+
+    def test_deploy_check_requires_shared_pin_cache(self):
+        """Тест: с репликами check --deploy требует общий для воркеров кэш закреплений"""
+        redis = {'BACKEND': 'django_redis.cache.RedisCache', 'LOCATION': 'redis://localhost:6379/1'}
+        locmem = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        with self.settings(CACHES={'default': locmem, 'shared': redis}):
+            self.assertEqual(check_replica_pin_cache(), [])
+        with self.settings(CACHES={'default': locmem, 'shared': locmem}):
+            self.assertEqual([error.id for error in check_replica_pin_cache()], ['baseAPI.E001'])
+            with self.settings(DATABASE_REPLICAS=[]):
+                self.assertEqual(check_replica_pin_cache(), [])
+
+    def test_failed_write_does_not_pin(self):
+        """Тест: неуспешная запись не закрепляет клиента"""
+        response = ReplicaPinningMiddleware(lambda request: HttpResponse(status=400))(self.factory.post('/'))
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+
+    def test_reads_in_transaction_use_primary(self):
+        """Тест: внутри транзакции чтение идет в основную базу"""
+        db_router.connections['default'].in_atomic_block = True
+        try:
+            self.assertEqual(self.router.db_for_read(CustomUser), 'default')
+        finally:
+            db_router.connections['default'].in_atomic_block = False
+
+    def test_writes_and_migrations_go_to_primary(self):
+        """Тест: запись и миграции только в основную базу"""
+        self.assertEqual(self.router.db_for_write(CustomUser), 'default')
+        self.assertFalse(self.router.allow_migrate('replica_0', 'recipe'))
+        self.assertIsNone(self.router.allow_migrate('default', 'recipe'))
+
+    async def test_async_write_request_uses_primary_and_pins(self):
+        """Тест: в асинхронном режиме middleware тоже пускает запись в основную базу"""
+        async def async_view(request):
+            return self.view(request)
+
+        middleware = ReplicaPinningMiddleware(async_view)
+        response = await middleware(self.factory.post('/'))
+        self.assertEqual(self.seen_alias, 'default')
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        """Тест: без реплик все чтения идут в основную базу"""
+        self.run_request(self.factory.get('/'))
+        self.assertEqual(self.seen_alias, 'default')
+
+
+class FakeConnection:
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+
+    def ping(self):
+        if not self.alive:
+            raise ConnectionError("gone away")
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def make_pool(self, **kwargs):
+        self.connections = []
+
+        def create():
+            connection = FakeConnection()
+            self.connections.append(connection)
+            return connection
+
+        return ConnectionPool(create, lambda c: c.ping(), lambda c: c.close(), **kwargs)
+
+    def test_connection_is_reused(self):
+        """Тест: возвращенное в пул соединение выдается повторно"""
+        pool = self.make_pool()
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        self.assertEqual(pool.stats()['created'], 1)
+        self.assertEqual(pool.stats()['reused'], 1)
+
+    def test_dead_connection_is_replaced(self):
+        """Тест: соединение, не прошедшее ping, закрывается и заменяется новым"""
+        pool = self.make_pool()
+        first = pool.acquire()
+        pool.release(first)
+        first.alive = False
+        second = pool.acquire()
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['ping_failures'], 1)
+
+    def test_connection_recycled_after_max_lifetime(self):
+        """Тест: соединение старше MAX_LIFETIME пересоздается"""
+        pool = self.make_pool(max_lifetime=60)
+        with mock.patch('baseAPI.db_pool.time.monotonic', return_value=1000):
+            first = pool.acquire()
+            pool.release(first)
+        with mock.patch('baseAPI.db_pool.time.monotonic', return_value=1100):
+            second = pool.acquire()
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['recycled'], 1)
+
+    def test_pool_is_bounded(self):
+        """Тест: при исчерпании пула запрос ждет и получает таймаут"""
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        stats = pool.stats()
+        self.assertEqual((stats['size'], stats['in_use'], stats['timeouts']), (1, 1, 1))
+
+    def test_waiting_request_gets_released_connection(self):
+        """Тест: ожидающий поток получает соединение, как только его вернули"""
+        pool = self.make_pool(max_size=1, timeout=5)
+        first = pool.acquire()
+        result = {}
+        waiter = threading.Thread(target=lambda: result.update(connection=pool.acquire()))
+        waiter.start()
+        while pool.stats()['waits'] == 0:
+            pass
+        pool.release(first)
+        waiter.join()
+        self.assertIs(result['connection'], first)
+
+    def test_broken_connection_is_discarded_on_release(self):
+        """Тест: испорченное соединение не возвращается в пул"""
+        pool = self.make_pool()
+        first = pool.acquire()
+        pool.release(first, discard=True)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+
+class WarmupTests(SimpleTestCase):
+    def test_warmup_urls_and_serializers(self):
+        """Тест: прогрев обходит все маршруты и сериализаторы без обращения к БД"""
+        self.assertGreater(warmup_urls(), 50)
+        self.assertGreater(warmup_serializers(), 5)
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    def test_matches_drf_renderer(self):
+        """Тест: вывод совпадает с JSONRenderer для типов, которые встречаются в ответах"""
+        data = ReturnDict({
+            'title': 'Борщ',
+            'created_at': datetime(2025, 1, 2, 3, 4, 5, 678000, tzinfo=dt_timezone.utc),
+            'price': Decimal('1.50'),
+            'label': gettext_lazy('Name'),
+            'results': ReturnList([{'id': 1, 'note': 'line\u2028break'}], serializer=None),
+            7: 'non-string key',
+        }, serializer=None)
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indent(self):
+        """Тест: форматирование по запросу клиента"""
+        body = ORJSONRenderer().render({'a': 1}, 'application/json; indent=4')
+        self.assertIn(b'\n', body)
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_parser(self):
+        """Тест: парсер читает UTF-8 JSON и сообщает об ошибке как JSONParser"""
+        body = '{"title": "Пельмени", "count": 2}'.encode()
+        self.assertEqual(ORJSONParser().parse(BytesIO(body)), JSONParser().parse(BytesIO(body)))
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(BytesIO(b'{broken'))
+
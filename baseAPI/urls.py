@@ -21,9 +21,10 @@ from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenVerifyView, TokenRefreshView
 from users.urls import router as user_router
-from recipe.urls import router as recipe_router
+from recipe.urls import router as recipe_router, async_urlpatterns as recipe_async_urls
 from chatAI.urls import router as chatai_router
-from profiles.urls import urlpatterns as profiles_router
+from profiles.urls import urlpatterns as profiles_router, async_urlpatterns as profiles_async_urls
+from notifications.urls import router as notifications_router, async_urlpatterns as notifications_async_urls
 
 
 schema_view = get_schema_view(
@@ -46,6 +47,10 @@ urlpatterns = [
     path('api/v1/recipe/', include(recipe_router.urls)),
     path('api/v1/chat/', include(chatai_router.urls)),
     path('api/v1/profiles/', include(profiles_router)),
+    path('api/v1/notifications/', include(notifications_router.urls)),
+    path('api/v1/async/recipe/', include(recipe_async_urls)),
+    path('api/v1/async/profiles/', include(profiles_async_urls)),
+    path('api/v1/async/notifications/', include(notifications_async_urls)),
     re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
 ]
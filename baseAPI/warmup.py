@@ -0,0 +1,116 @@
+"""
+Прогрев приложения перед приемом запросов.
+
+Первый запрос на свежем воркере платит за компиляцию регулярных выражений
+URL, построение полей сериализаторов, импорт drf-yasg и подключение к БД.
+
+- warmup_application() — выполняется один раз в мастере Gunicorn (preload_app),
+  результат достается воркерам через copy-on-write после fork;
+- reinit_after_fork() — в каждом воркере сразу после fork пересоздает
+  клиенты, которые нельзя делить между процессами;
+- warmup_worker() — в каждом воркере открывает соединения с БД и кэшем.
+"""
+import logging
+import time
+
+from django.core.cache import caches
+from django.db import connections
+from django.urls import URLPattern, URLResolver, get_resolver
+
+from baseAPI.db_pool import close_all_pools
+
+logger = logging.getLogger(__name__)
+
+
+def iter_url_patterns(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield pattern
+            yield from iter_url_patterns(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            yield pattern
+
+
+def warmup_urls():
+    """Компилирует регулярные выражения всех маршрутов и заполняет кэши reverse()."""
+    resolver = get_resolver()
+    count = 0
+    for pattern in iter_url_patterns(resolver.url_patterns):
+        pattern.pattern.regex
+        count += 1
+    resolver.reverse_dict
+    return count
+
+
+def warmup_serializers():
+    """Создает сериализаторы всех DRF-view и строит их поля."""
+    built = set()
+    for pattern in iter_url_patterns(get_resolver().url_patterns):
+        view_class = getattr(getattr(pattern, 'callback', None), 'cls', None)
+        serializer_class = getattr(view_class, 'serializer_class', None)
+        if serializer_class is None or serializer_class in built:
+            continue
+        try:
+            serializer_class(context={}).fields
+        except Exception:
+            logger.warning("Could not warm up %s", serializer_class.__name__, exc_info=True)
+        built.add(serializer_class)
+    return len(built)
+
+
+def warmup_schema():
+    """Генерирует OpenAPI-схему: импортирует drf-yasg и обходит все endpoints."""
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+    from drf_yasg import openapi
+    from drf_yasg.generators import OpenAPISchemaGenerator
+    from rest_framework.request import Request
+
+    # Схема строится так же, как при анонимном запросе к /swagger/
+    request = Request(RequestFactory().get('/swagger/'))
+    request.user = AnonymousUser()
+    generator = OpenAPISchemaGenerator(openapi.Info(title="API", default_version='v1'))
+    try:
+        generator.get_schema(request=request, public=True)
+    except Exception:
+        logger.warning("Could not warm up OpenAPI schema", exc_info=True)
+
+
+def warmup_application():
+    """Прогрев, общий для всех воркеров. Соединения, открытые по пути, закрываются."""
+    started = time.perf_counter()
+    routes = warmup_urls()
+    serializers = warmup_serializers()
+    warmup_schema()
+    # Соединения мастера не должны достаться воркерам после fork
+    connections.close_all()
+    close_all_pools()
+    elapsed = (time.perf_counter() - started) * 1000
+    logger.info("Application warmed up in %.0f ms: %d routes, %d serializers", elapsed, routes, serializers)
+    return elapsed
+
+
+def reinit_after_fork():
+    """Пересоздает клиенты с собственными сокетами и пулами в новом процессе."""
+    from chatAI.views import ChatHistoryViewSet, create_ai_client
+
+    ChatHistoryViewSet.ai_client = create_ai_client()
+
+
+def warmup_worker():
+    """Открывает соединения воркера с базами и кэшем до первого запроса."""
+    started = time.perf_counter()
+    for connection in connections.all():
+        try:
+            connection.ensure_connection()
+        except Exception:
+            logger.warning("Could not connect to database %r during warmup", connection.alias, exc_info=True)
+        finally:
+            # С пулом соединение возвращается в пул и достается первому запросу
+            connection.close()
+    for cache in caches.all():
+        try:
+            cache.get('warmup')
+        except Exception:
+            logger.warning("Could not reach cache during warmup", exc_info=True)
+    return (time.perf_counter() - started) * 1000
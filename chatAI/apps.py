@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class ChataiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chatAI'
+
+    def ready(self):
+        from .checks import check_throttle_cache
+
+        checks.register(check_throttle_cache, checks.Tags.caches, deploy=True)
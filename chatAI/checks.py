@@ -0,0 +1,6 @@
+from baseAPI.checks import check_shared_cache
+
+
+def check_throttle_cache(app_configs=None, **kwargs):
+    """Троттлинг чата, circuit breaker и bulkhead GigaChat (chatAI/resilience.py) должны работать на общем кэше."""
+    return check_shared_cache('CHAT_THROTTLE_CACHE', 'shared', 'chatAI.E001')
@@ -0,0 +1,190 @@
+"""
+Контекст разговора для GigaChat.
+
+В запрос к модели попадают:
+
+- системный промпт и краткое содержание (ChatSummary) старых сообщений;
+- последние сообщения, которые еще не вошли в summary, — от новых к старым,
+  пока помещаются в бюджет CHAT_CONTEXT_TOKENS;
+- новое сообщение пользователя.
+
+Так размер промпта не зависит от длины истории. Когда несжатых сообщений
+становится больше CHAT_SUMMARY_TRIGGER_TURNS, после сохранения ответа
+запускается фоновое сжатие: старые сообщения (кроме последних
+CHAT_SUMMARY_KEEP_TURNS) сворачиваются в summary тем же клиентом LLM.
+
+Токены считаются приближенно по длине текста — точный подсчет у GigaChat
+требует отдельного запроса к API.
+"""
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from .models import ChatHistory, ChatSummary
+from .throttling import get_cache
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "Ты бот, который придумывает рецепты. На любой запрос придумай рецепт"
+SUMMARY_PROMPT = (
+    "Кратко перескажи разговор пользователя с ботом-кулинаром: предпочтения, ограничения, "
+    "продукты и блюда, которые обсуждались. Учти предыдущее краткое содержание, если оно есть. "
+    "Не больше {words} слов."
+)
+# Кириллица токенизируется плотнее латиницы, поэтому оценка с запасом
+CHARS_PER_TOKEN = 3
+# Сколько проходов сжатия делает одна фоновая задача
+MAX_FOLDS = 5
+SUMMARY_LOCK_TIMEOUT = 300
+
+_executor = None
+
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_tokens(text, tokens):
+    return text[:tokens * CHARS_PER_TOKEN]
+
+
+def system_message(summary):
+    content = SYSTEM_PROMPT
+    if summary:
+        content += f"\n\nКраткое содержание предыдущего разговора:\n{summary}"
+    return SystemMessage(content=content)
+
+
+def history_message(sender_type, text):
+    return AIMessage(content=text) if sender_type == 'AI' else HumanMessage(content=text)
+
+
+def build_context(user, text):
+    """
+    Сообщения для ответа на text с учетом истории пользователя.
+
+    Returns:
+        tuple: (список сообщений для LLM, нужно ли сжать историю после ответа)
+    """
+    trigger = get_setting('CHAT_SUMMARY_TRIGGER_TURNS', 20)
+    summary, last_message_id = (ChatSummary.objects.filter(user=user)
+                                .values_list('text', 'last_message_id').first() or ('', 0))
+    # Несжатых сообщений читается не больше порога: дальше их все равно сожмут
+    recent = list(ChatHistory.objects
+                  .filter(user=user, id__gt=last_message_id)
+                  .order_by('-id')
+                  .values_list('sender_type', 'text')[:trigger])
+
+    system = system_message(summary)
+    budget = (get_setting('CHAT_CONTEXT_TOKENS', 2000)
+              - estimate_tokens(system.content) - estimate_tokens(text))
+    history = []
+    for sender_type, message in recent:
+        budget -= estimate_tokens(message)
+        if budget < 0:
+            break
+        history.append(history_message(sender_type, message))
+    history.reverse()
+
+    # После ответа в истории станет на два сообщения больше
+    needs_summary = len(recent) + 2 > trigger
+    return [system, *history, HumanMessage(content=text)], needs_summary
+
+
+def transcript(rows, budget):
+    """Текст сообщений для сжатия в пределах budget токенов; первое сообщение берется всегда."""
+    lines = []
+    last_id = None
+    for message_id, sender_type, text in rows:
+        speaker = 'Бот' if sender_type == 'AI' else 'Пользователь'
+        line = f"{speaker}: {text}"
+        tokens = estimate_tokens(line)
+        if lines and tokens > budget:
+            break
+        lines.append(truncate_tokens(line, budget))
+        budget -= tokens
+        last_id = message_id
+    return "\n".join(lines), last_id
+
+
+def summarize_history(user_id, client):
+    """
+    Сворачивает старые несжатые сообщения пользователя в ChatSummary.
+
+    Последние CHAT_SUMMARY_KEEP_TURNS сообщений остаются как есть; за один
+    вызов LLM сжимается не больше CHAT_SUMMARY_INPUT_TOKENS токенов истории.
+
+    Returns:
+        int: число сообщений, вошедших в summary
+    """
+    keep = get_setting('CHAT_SUMMARY_KEEP_TURNS', 6)
+    input_tokens = get_setting('CHAT_SUMMARY_INPUT_TOKENS', 3000)
+    summary_tokens = get_setting('CHAT_SUMMARY_TOKENS', 400)
+    batch = get_setting('CHAT_SUMMARY_TRIGGER_TURNS', 20)
+
+    summary, _ = ChatSummary.objects.get_or_create(user_id=user_id)
+    folded = 0
+    for _ in range(MAX_FOLDS):
+        pending = list(ChatHistory.objects
+                       .filter(user_id=user_id, id__gt=summary.last_message_id)
+                       .order_by('id')
+                       .values_list('id', 'sender_type', 'text')[:batch + keep])
+        if len(pending) <= keep:
+            break
+        rows = pending[:len(pending) - keep]
+        text, last_id = transcript(rows, input_tokens)
+        messages = [SystemMessage(content=SUMMARY_PROMPT.format(words=summary_tokens // 2))]
+        if summary.text:
+            messages.append(HumanMessage(content=f"Предыдущее краткое содержание:\n{summary.text}"))
+        messages.append(HumanMessage(content=text))
+
+        response = client.invoke(messages)
+        summary.text = truncate_tokens(response.content, summary_tokens)
+        summary.last_message_id = last_id
+        summary.save(update_fields=['text', 'last_message_id', 'updated_at'])
+        folded += sum(1 for row in rows if row[0] <= last_id)
+    return folded
+
+
+def run_summary(user_id, client):
+    """Сжатие с замком на пользователя: параллельные задачи для него пропускаются."""
+    cache = get_cache()
+    lock_key = f'chat_summary:lock:{user_id}'
+    if not cache.add(lock_key, 1, timeout=SUMMARY_LOCK_TIMEOUT):
+        return
+    try:
+        folded = summarize_history(user_id, client)
+        logger.info("Chat history of user %s: %d messages folded into summary", user_id, folded)
+    except Exception:
+        # Не удалось — попробуем после следующего сообщения
+        logger.warning("Could not summarize chat history of user %s", user_id, exc_info=True)
+    finally:
+        cache.delete(lock_key)
+
+
+def run_summary_in_thread(user_id, client):
+    try:
+        run_summary(user_id, client)
+    finally:
+        # Поток пула не проходит через обработку запроса — соединение закрываем сами
+        connection.close()
+
+
+def schedule_summary(user_id, client):
+    """Запускает сжатие истории в фоне (или сразу, если CHAT_SUMMARY_IN_BACKGROUND=False)."""
+    global _executor
+    if not get_setting('CHAT_SUMMARY_IN_BACKGROUND', True):
+        run_summary(user_id, client)
+        return
+    # Пул создается при первом вызове: потоки не переживают fork воркера
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chat-summary')
+    _executor.submit(run_summary_in_thread, user_id, client)
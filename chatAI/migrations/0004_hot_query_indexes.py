@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-19 02:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatAI', '0003_rename_user_id_chathistory_user_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chathistory',
+            index=models.Index(fields=['user', 'sender_type'], name='chat_user_sender_idx'),
+        ),
+    ]
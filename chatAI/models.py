@@ -7,3 +7,18 @@ class ChatHistory(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)  # Связь с пользователем
     created_at = models.DateTimeField(auto_now_add=True)
     sender_type = models.CharField(max_length=5, default="user")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'sender_type'], name='chat_user_sender_idx'),
+        ]
+
+
+class ChatSummary(models.Model):
+    """Краткое содержание старых сообщений пользователя (см. chatAI/context.py)"""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+                                related_name='chat_summary')
+    text = models.TextField(blank=True, default='')
+    # Последнее сообщение ChatHistory, вошедшее в summary
+    last_message_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,210 @@
+"""
+Устойчивый вызов LLM (GigaChat).
+
+ResilientLLM оборачивает клиент с методом invoke(messages):
+
+- таймаут: вызов выполняется в отдельном потоке, ответ ждется не дольше
+  timeout секунд. Сам клиент тоже создается с таймаутом сокета, чтобы
+  зависший поток рано или поздно завершился;
+- повторы: временные ошибки (таймаут, сеть, 429 и 5xx) повторяются до
+  retries раз с паузой full jitter — случайной в [0, min(cap, base·2^n)];
+- circuit breaker: после failure_threshold временных ошибок подряд вызовы
+  сразу отклоняются на reset_timeout секунд, затем один пробный запрос
+  (half-open) решает, закрыть цепь или открыть снова. Остальные ошибки
+  (авторизация, 4xx, неверный запрос) breaker не считает: сервис ответил,
+  а ошибки одного клиента не должны закрывать чат всем остальным;
+- bulkhead: в вызове LLM одновременно не больше max_concurrent потоков;
+  слот занят, пока вызов действительно не завершится, даже если ответ уже
+  не ждут.
+
+Состояние breaker и bulkhead хранится в том же кэше, что и у
+chatAI/throttling.py (CHAT_THROTTLE_CACHE, по умолчанию shared). Общим для
+всех воркеров оно будет, только если это общий кэш (Redis при заданном
+REDIS_URL); с кэшем процесса у каждого воркера свой breaker и свой лимит,
+то есть всего до max_concurrent × число воркеров вызовов —
+manage.py check --deploy сообщает об этом ошибкой chatAI.E001.
+Отказ — исключение LLMUnavailable
+(APIException: DRF отвечает 503 с Retry-After), неповторяемая ошибка
+LLM пишется в лог и поднимается как LLMError (502).
+"""
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .throttling import acquire_slot, get_cache, increment
+
+logger = logging.getLogger(__name__)
+
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class LLMUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "AI service is temporarily unavailable, try again later."
+    default_code = 'ai_unavailable'
+
+    def __init__(self, detail=None, wait=None):
+        super().__init__(detail)
+        # DRF добавляет Retry-After по атрибуту wait
+        self.wait = max(1, round(wait)) if wait is not None else None
+
+
+class LLMError(LLMUnavailable):
+    status_code = status.HTTP_502_BAD_GATEWAY
+    default_detail = "AI service returned an error."
+    default_code = 'ai_error'
+
+
+class LLMTimeout(LLMUnavailable):
+    default_detail = "AI service did not respond in time."
+    default_code = 'ai_timeout'
+
+
+class CircuitOpen(LLMUnavailable):
+    default_code = 'ai_circuit_open'
+
+
+class BulkheadFull(LLMUnavailable):
+    default_detail = "Too many requests to the AI service are in progress."
+    default_code = 'ai_busy'
+
+
+def is_transient(exc):
+    """Ошибки, которые имеет смысл повторить."""
+    if isinstance(exc, (LLMTimeout, TimeoutError, ConnectionError)):
+        return True
+    try:
+        import httpx
+    except ImportError:
+        pass
+    else:
+        if isinstance(exc, httpx.TransportError):
+            return True
+    # gigachat.exceptions.ResponseError(url, status_code, content, headers)
+    status_code = getattr(exc, 'status_code', None)
+    if status_code is None and len(getattr(exc, 'args', ())) > 1:
+        status_code = exc.args[1]
+    return status_code in TRANSIENT_STATUS_CODES
+
+
+class CircuitBreaker:
+    """Circuit breaker с состоянием в кэше: closed -> open -> half-open -> closed."""
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.prefix = f'llm_breaker:{name}'
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    def before_call(self):
+        """Поднимает CircuitOpen, если вызывать сейчас нельзя."""
+        cache = get_cache()
+        open_until = cache.get(f'{self.prefix}:open_until')
+        if open_until is None:
+            return
+        now = time.time()
+        if now < open_until:
+            raise CircuitOpen(wait=open_until - now)
+        # Half-open: пробный запрос пропускается только один
+        if not cache.add(f'{self.prefix}:probe', 1, timeout=self.reset_timeout):
+            raise CircuitOpen(wait=self.reset_timeout)
+
+    def record_success(self):
+        get_cache().delete_many([f'{self.prefix}:failures', f'{self.prefix}:open_until', f'{self.prefix}:probe'])
+
+    def record_failure(self):
+        cache = get_cache()
+        half_open = cache.get(f'{self.prefix}:probe') is not None
+        failures = increment(cache, f'{self.prefix}:failures')
+        if half_open or failures >= self.failure_threshold:
+            cache.set(f'{self.prefix}:open_until', time.time() + self.reset_timeout, timeout=None)
+            cache.delete_many([f'{self.prefix}:failures', f'{self.prefix}:probe'])
+            logger.warning("LLM circuit %s opened for %ss after %d failures",
+                           self.prefix, self.reset_timeout, failures)
+
+    def state(self):
+        cache = get_cache()
+        open_until = cache.get(f'{self.prefix}:open_until')
+        if open_until is None:
+            return 'closed'
+        return 'open' if time.time() < open_until else 'half-open'
+
+
+class Bulkhead:
+    """Не больше limit одновременных вызовов (слоты в кэше CHAT_THROTTLE_CACHE, общие при общем кэше)."""
+
+    def __init__(self, name, limit, lease):
+        self.prefix = f'llm_bulkhead:{name}'
+        self.limit = limit
+        self.lease = lease
+
+    def acquire(self):
+        slot = acquire_slot(get_cache(), self.prefix, self.limit, self.lease)
+        if slot is None:
+            raise BulkheadFull(wait=1)
+        return slot
+
+    def release(self, slot):
+        get_cache().delete(slot)
+
+
+class ResilientLLM:
+    """Обертка над LLM-клиентом с тем же методом invoke(messages)."""
+
+    def __init__(self, client, name='gigachat', timeout=20, retries=1, backoff_base=0.5, backoff_cap=4,
+                 failure_threshold=5, reset_timeout=30, max_concurrent=8):
+        self.client = client
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        # Слот освобождается по завершении потока; lease — на случай падения воркера
+        self.bulkhead = Bulkhead(name, max_concurrent, lease=timeout * 3)
+        self.max_concurrent = max_concurrent
+        self._executor = None
+
+    @property
+    def executor(self):
+        # Пул создается при первом вызове: потоки не переживают fork воркера
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix='llm')
+        return self._executor
+
+    def invoke(self, messages, **kwargs):
+        for attempt in range(self.retries + 1):
+            self.breaker.before_call()
+            try:
+                result = self.call_with_timeout(messages, **kwargs)
+            except BulkheadFull:
+                # Перегрузка на нашей стороне — не ошибка LLM
+                raise
+            except Exception as exc:
+                if not is_transient(exc):
+                    # Сервис ответил: цепь не открывается, а пробный запрос ее закрывает
+                    self.breaker.record_success()
+                    logger.exception("LLM call failed with a non-transient error")
+                    raise LLMError() from exc
+                self.breaker.record_failure()
+                if attempt == self.retries:
+                    if isinstance(exc, LLMUnavailable):
+                        raise
+                    raise LLMUnavailable() from exc
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                logger.info("LLM call failed (%r), retry %d in %.2fs", exc, attempt + 1, delay)
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def call_with_timeout(self, messages, **kwargs):
+        slot = self.bulkhead.acquire()
+        future = self.executor.submit(self.client.invoke, messages, **kwargs)
+        future.add_done_callback(lambda _: self.bulkhead.release(slot))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise LLMTimeout()
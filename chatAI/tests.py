@@ -1,15 +1,32 @@
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import override_settings
 from django.utils import timezone
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.test import APITestCase
-from django.core.cache import cache
-from chatAI.models import ChatHistory
+from django.core.cache import caches
+from chatAI.checks import check_throttle_cache
+from chatAI.context import build_context, estimate_tokens, summarize_history
+from chatAI.models import ChatHistory, ChatSummary
+from chatAI.resilience import BulkheadFull, CircuitOpen, LLMError, LLMTimeout, LLMUnavailable, ResilientLLM
+from chatAI.throttling import get_throttle_metrics
+from chatAI.views import ChatHistoryViewSet
 from users.models import CustomUser
 
 
+def clear_caches():
+    # Троттлинг и breaker живут в кэше shared, остальное — в default
+    for cache in caches.all():
+        cache.clear()
+
+
 class ChatHistoryAPITests(APITestCase):
     def setUp(self):
-        cache.clear()
+        clear_caches()
         self.user = CustomUser.objects.create_user(
             username='test',
             email='test@example.com',
@@ -46,7 +63,7 @@ class ChatHistoryAPITests(APITestCase):
         user_message.save()
 
     def tearDown(self):
-        cache.clear()
+        clear_caches()
 
     def test_get_code_200(self):
         """Тест на получения кода 200"""
@@ -81,7 +98,342 @@ class ChatHistoryAPITests(APITestCase):
 
     def test_clear_history(self):
         """Тест очистки истории чатов"""
-        cache.clear()  # Clear cache before testing
+        clear_caches()  # Clear cache before testing
         response = self.client.get("/api/v1/chat/chat_history/clear_history/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(ChatHistory.objects.count(), 0)
\ No newline at end of file
+        self.assertEqual(ChatHistory.objects.count(), 0)
+
+class FakeAIClient:
+    """
+    Подменяет GigaChat: отвечает через delay секунд, первые failures вызовов
+    завершаются ошибкой error, on_invoke вызывается внутри каждого вызова.
+    """
+
+    def __init__(self, on_invoke=None, delay=0, failures=0, error=ConnectionError):
+        self.on_invoke = on_invoke
+        self.delay = delay
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+        self.requests = []
+
+    def invoke(self, messages):
+        self.calls += 1
+        self.requests.append(messages)
+        if self.on_invoke:
+            self.on_invoke()
+        if self.delay:
+            time.sleep(self.delay)
+        if self.calls <= self.failures:
+            raise self.error("GigaChat is down")
+        return SimpleNamespace(content="Рецепт: омлет")
+
+
+@override_settings(CHAT_RATE_BURST=2, CHAT_RATE_PER_MINUTE=6, CHAT_MAX_CONCURRENT=2,
+                   CHAT_MAX_CONCURRENT_PER_USER=1)
+class ChatThrottlingTests(APITestCase):
+    URL = "/api/v1/chat/chat_history/"
+
+    def setUp(self):
+        clear_caches()
+        self.user = CustomUser.objects.create_user(username='chat_user', password='password1')
+        self.other = CustomUser.objects.create_user(username='chat_other', password='password2')
+        self.admin = CustomUser.objects.create_user(username='chat_admin', password='password3', is_staff=True)
+        self.client.force_authenticate(user=self.user)
+        self.ai_client = FakeAIClient()
+        patcher = patch.object(ChatHistoryViewSet, 'ai_client', self.ai_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        clear_caches()
+
+    def test_deploy_check_requires_shared_cache(self):
+        """Тест: check --deploy требует общий для воркеров кэш троттлинга"""
+        redis = {'BACKEND': 'django_redis.cache.RedisCache', 'LOCATION': 'redis://localhost:6379/1'}
+        locmem = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        with self.settings(CACHES={'default': locmem, 'shared': redis}):
+            self.assertEqual(check_throttle_cache(), [])
+        with self.settings(CACHES={'default': locmem, 'shared': locmem}):
+            self.assertEqual([error.id for error in check_throttle_cache()], ['chatAI.E001'])
+        with self.settings(CACHES={'default': locmem}):
+            self.assertEqual([error.id for error in check_throttle_cache()], ['chatAI.E001'])
+
+    def post(self):
+        return self.client.post(self.URL, {"text": "Хочу ужин", "sender_type": "user"}, format='json')
+
+    def test_token_bucket_allows_burst_then_429(self):
+        """Тест: после burst сообщений — 429 с Retry-After, а не генерация"""
+        self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+
+        response = self.post()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '10')
+        self.assertEqual(self.ai_client.calls, 2)
+        self.assertEqual(ChatHistory.objects.filter(user=self.user).count(), 4)
+
+        # Лимит у каждого пользователя свой
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+
+    def test_bucket_refills_over_time(self):
+        """Тест: через интервал пополнения снова можно отправить сообщение"""
+        now = time.time()
+        with patch('chatAI.throttling.time.time', return_value=now):
+            self.post()
+            self.post()
+            self.assertEqual(self.post().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        with patch('chatAI.throttling.time.time', return_value=now + 10):
+            self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+            self.assertEqual(self.post().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_concurrency_cap_per_user(self):
+        """Тест: второе сообщение во время генерации первого отклоняется, слот освобождается после"""
+        nested = []
+        self.ai_client.on_invoke = lambda: nested.append(self.post()) if not nested else None
+
+        response = self.post()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(nested[0].status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(nested[0]['Retry-After'], '5')
+        self.assertEqual(get_throttle_metrics()['in_flight'], 0)
+
+    @override_settings(CHAT_MAX_CONCURRENT=1, CHAT_RATE_BURST=10)
+    def test_global_concurrency_cap(self):
+        """Тест: общий лимит одновременных генераций действует на всех пользователей"""
+        nested = []
+
+        def post_as_other():
+            if not nested:
+                self.client.force_authenticate(user=self.other)
+                nested.append(self.post())
+                self.client.force_authenticate(user=self.user)
+
+        self.ai_client.on_invoke = post_as_other
+        self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(nested[0].status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_metrics(self):
+        """Тест: метрики пропущенных и отклоненных запросов доступны администратору"""
+        for _ in range(3):
+            self.post()
+        response = self.client.get(self.URL + "throttle_metrics/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(self.URL + "throttle_metrics/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'admitted': 2, 'rate_limited': 1, 'concurrency_limited': 0, 'in_flight': 0})
+
+    def test_list_is_not_throttled(self):
+        """Тест: чтение истории не расходует лимит сообщений"""
+        for _ in range(5):
+            self.assertEqual(self.client.get(self.URL).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+
+
+class ResilientLLMTests(APITestCase):
+    def setUp(self):
+        clear_caches()
+        self.addCleanup(clear_caches)
+
+    def wrap(self, client, **kwargs):
+        options = {'timeout': 0.2, 'retries': 2, 'backoff_base': 0, 'failure_threshold': 3,
+                   'reset_timeout': 30, **kwargs}
+        return ResilientLLM(client, name='test', **options)
+
+    def test_retries_transient_errors_with_jitter(self):
+        """Тест: временные ошибки повторяются с паузой не больше экспоненциальной границы"""
+        client = FakeAIClient(failures=2)
+        with patch('chatAI.resilience.random.uniform', return_value=0) as uniform:
+            response = self.wrap(client, backoff_base=0.5).invoke([])
+        self.assertEqual(response.content, "Рецепт: омлет")
+        self.assertEqual(client.calls, 3)
+        self.assertEqual([call.args for call in uniform.call_args_list], [(0, 0.5), (0, 1.0)])
+
+    def test_gives_up_after_retries(self):
+        """Тест: после исчерпания повторов — LLMUnavailable (503)"""
+        client = FakeAIClient(failures=10)
+        with self.assertRaises(LLMUnavailable):
+            self.wrap(client, failure_threshold=10).invoke([])
+        self.assertEqual(client.calls, 3)
+
+    def test_non_transient_errors_are_not_retried(self):
+        """Тест: ошибки, не связанные с доступностью, не повторяются и отдаются как LLMError (502)"""
+        client = FakeAIClient(failures=1, error=ValueError)
+        with self.assertLogs('chatAI.resilience', 'ERROR'):
+            with self.assertRaises(LLMError) as context:
+                self.wrap(client).invoke([])
+        self.assertEqual(context.exception.status_code, status.HTTP_502_BAD_GATEWAY)
+        self.assertIsInstance(context.exception.__cause__, ValueError)
+        self.assertEqual(client.calls, 1)
+
+    def test_non_transient_errors_do_not_open_circuit(self):
+        """Тест: серия ошибок клиента (4xx, неверный запрос) не открывает цепь для всех"""
+        llm = self.wrap(FakeAIClient(failures=5, error=ValueError), retries=0)
+        with self.assertLogs('chatAI.resilience', 'ERROR'):
+            for _ in range(5):
+                with self.assertRaises(LLMError):
+                    llm.invoke([])
+        self.assertEqual(llm.breaker.state(), 'closed')
+        self.assertEqual(llm.invoke([]).content, "Рецепт: омлет")
+
+    def test_timeout(self):
+        """Тест: медленный ответ прерывается по таймауту"""
+        client = FakeAIClient(delay=0.3)
+        started = time.monotonic()
+        with self.assertRaises(LLMTimeout):
+            self.wrap(client, timeout=0.05, retries=0).invoke([])
+        self.assertLess(time.monotonic() - started, 0.25)
+
+    def test_circuit_breaker_opens_and_half_opens(self):
+        """Тест: после серии ошибок вызовы отклоняются сразу, затем один пробный запрос закрывает цепь"""
+        client = FakeAIClient(failures=3)
+        llm = self.wrap(client, retries=0)
+        for _ in range(3):
+            with self.assertRaises(LLMUnavailable):
+                llm.invoke([])
+        self.assertEqual(llm.breaker.state(), 'open')
+
+        with self.assertRaises(CircuitOpen) as context:
+            llm.invoke([])
+        self.assertEqual(client.calls, 3)
+        self.assertEqual(context.exception.wait, 30)
+
+        with patch('chatAI.resilience.time.time', return_value=time.time() + 31):
+            self.assertEqual(llm.breaker.state(), 'half-open')
+            self.assertEqual(llm.invoke([]).content, "Рецепт: омлет")
+        self.assertEqual(llm.breaker.state(), 'closed')
+
+    def test_breaker_state_is_in_shared_cache(self):
+        """Тест: состояние circuit breaker хранится в общем кэше shared, а не в кэше процесса"""
+        llm = self.wrap(FakeAIClient(failures=3), retries=0)
+        for _ in range(3):
+            with self.assertRaises(LLMUnavailable):
+                llm.invoke([])
+        self.assertIsNotNone(caches['shared'].get(f'{llm.breaker.prefix}:open_until'))
+        self.assertIsNone(caches['default'].get(f'{llm.breaker.prefix}:open_until'))
+
+    def test_failed_probe_reopens_circuit(self):
+        """Тест: ошибка пробного запроса снова открывает цепь"""
+        client = FakeAIClient(failures=4)
+        llm = self.wrap(client, retries=0)
+        for _ in range(3):
+            with self.assertRaises(LLMUnavailable):
+                llm.invoke([])
+        with patch('chatAI.resilience.time.time', return_value=time.time() + 31):
+            with self.assertRaises(LLMUnavailable):
+                llm.invoke([])
+            self.assertEqual(llm.breaker.state(), 'open')
+
+    def test_bulkhead_limits_concurrent_calls(self):
+        """Тест: сверх лимита одновременных вызовов LLM запрос отклоняется сразу"""
+        inside, release = threading.Event(), threading.Event()
+        client = FakeAIClient(on_invoke=lambda: (inside.set(), release.wait(1)))
+        llm = self.wrap(client, max_concurrent=1, timeout=2)
+        worker = threading.Thread(target=llm.invoke, args=([],))
+        worker.start()
+        try:
+            self.assertTrue(inside.wait(1))
+            with self.assertRaises(BulkheadFull):
+                llm.invoke([])
+        finally:
+            release.set()
+            worker.join()
+        self.assertEqual(client.calls, 1)
+        self.assertEqual(llm.breaker.state(), 'closed')
+
+    def test_chat_returns_503_without_saving_messages(self):
+        """Тест: при недоступном GigaChat чат отвечает 503, а история не меняется"""
+        user = CustomUser.objects.create_user(username='chat_down', password='password1')
+        self.client.force_authenticate(user=user)
+        with patch.object(ChatHistoryViewSet, 'ai_client', self.wrap(FakeAIClient(failures=10), retries=1)):
+            response = self.client.post("/api/v1/chat/chat_history/",
+                                        {"text": "Хочу ужин", "sender_type": "user"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(ChatHistory.objects.filter(user=user).exists())
+
+
+@override_settings(CHAT_CONTEXT_TOKENS=300, CHAT_SUMMARY_TRIGGER_TURNS=6, CHAT_SUMMARY_KEEP_TURNS=2,
+                   CHAT_SUMMARY_INPUT_TOKENS=1000, CHAT_SUMMARY_IN_BACKGROUND=False)
+class ChatContextTests(APITestCase):
+    URL = "/api/v1/chat/chat_history/"
+
+    def setUp(self):
+        clear_caches()
+        self.addCleanup(clear_caches)
+        self.user = CustomUser.objects.create_user(username='context_user', password='password1')
+        self.client.force_authenticate(user=self.user)
+        self.ai_client = FakeAIClient()
+        patcher = patch.object(ChatHistoryViewSet, 'ai_client', self.ai_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add_turns(self, count, length=10):
+        ChatHistory.objects.bulk_create([
+            ChatHistory(user=self.user, text=f"{i}:" + "щ" * length, sender_type='user' if i % 2 == 0 else 'AI')
+            for i in range(count)
+        ])
+
+    def test_follow_up_includes_previous_turns(self):
+        """Тест: в запрос к модели попадают предыдущие сообщения в хронологическом порядке"""
+        self.add_turns(2)
+        messages, needs_summary = build_context(self.user, "А без яиц?")
+        self.assertEqual([type(m).__name__ for m in messages],
+                         ['SystemMessage', 'HumanMessage', 'AIMessage', 'HumanMessage'])
+        self.assertTrue(messages[1].content.startswith("0:"))
+        self.assertEqual(messages[-1].content, "А без яиц?")
+        self.assertFalse(needs_summary)
+
+    def test_prompt_stays_within_budget(self):
+        """Тест: размер промпта ограничен бюджетом при любой длине истории"""
+        self.add_turns(5, length=200)
+        messages, needs_summary = build_context(self.user, "Что приготовить?")
+        self.assertLessEqual(sum(estimate_tokens(m.content) for m in messages), 300)
+        # Поместились только самые новые сообщения
+        self.assertTrue(messages[-2].content.startswith("4:"))
+        self.assertTrue(needs_summary)
+
+    def test_summary_replaces_old_turns(self):
+        """Тест: сжатые сообщения заменяются summary в системном промпте"""
+        self.add_turns(4)
+        last = ChatHistory.objects.filter(user=self.user).order_by('id')[1]
+        ChatSummary.objects.create(user=self.user, text="Любит омлеты", last_message_id=last.id)
+        messages, _ = build_context(self.user, "Еще вариант")
+        self.assertIn("Любит омлеты", messages[0].content)
+        self.assertEqual(len(messages), 4)
+        self.assertTrue(messages[1].content.startswith("2:"))
+
+    def test_summarize_keeps_recent_turns(self):
+        """Тест: в summary сворачиваются все сообщения, кроме последних KEEP"""
+        self.add_turns(10)
+        folded = summarize_history(self.user.id, self.ai_client)
+        self.assertEqual(folded, 8)
+        summary = ChatSummary.objects.get(user=self.user)
+        self.assertEqual(summary.text, "Рецепт: омлет")
+        self.assertEqual(ChatHistory.objects.filter(user=self.user, id__gt=summary.last_message_id).count(), 2)
+        self.assertIn("Пользователь: 0:", self.ai_client.requests[0][-1].content)
+
+    def test_chat_summarizes_history_after_threshold(self):
+        """Тест: после порога история сжимается, а следующий запрос использует summary"""
+        self.add_turns(5)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.URL, {"text": "Хочу ужин", "sender_type": "user"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # Ответ на сообщение и сжатие истории
+        self.assertEqual(self.ai_client.calls, 2)
+        summary = ChatSummary.objects.get(user=self.user)
+        self.assertEqual(ChatHistory.objects.filter(user=self.user, id__gt=summary.last_message_id).count(), 2)
+
+        messages, needs_summary = build_context(self.user, "А на завтрак?")
+        self.assertIn("Рецепт: омлет", messages[0].content)
+        self.assertEqual(len(messages), 4)
+        self.assertFalse(needs_summary)
+
+    def test_clear_history_drops_summary(self):
+        """Тест: очистка истории удаляет и summary"""
+        ChatSummary.objects.create(user=self.user, text="Любит омлеты", last_message_id=1)
+        response = self.client.get(self.URL + "clear_history/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(ChatSummary.objects.filter(user=self.user).exists())
@@ -0,0 +1,156 @@
+"""
+Ограничение запросов к чату с ИИ.
+
+Генерация ответа GigaChat занимает воркер на секунды, поэтому создание
+сообщений ограничено двумя способами:
+
+- ChatRateThrottle — token bucket на пользователя: до CHAT_RATE_BURST
+  сообщений подряд, дальше CHAT_RATE_PER_MINUTE в минуту. Реализован как
+  GCRA: в кэше хранится одно число — время, когда ведро снова будет
+  полным, и обновляется под коротким замком на пользователя (cache.add).
+- generation_slot — не больше CHAT_MAX_CONCURRENT генераций одновременно
+  и CHAT_MAX_CONCURRENT_PER_USER на пользователя. Каждый слот — отдельный
+  ключ, который занимается атомарным cache.add и живет не дольше
+  CHAT_GENERATION_LEASE_SECONDS, так что слоты упавших воркеров
+  освобождаются сами.
+
+Отказ — исключение Throttled: DRF отвечает 429 с заголовком Retry-After.
+Счетчики пропущенных и отклоненных запросов — get_throttle_metrics().
+
+Состояние хранится в кэше CHAT_THROTTLE_CACHE (по умолчанию shared).
+Ограничения общие для всех воркеров, только если это общий кэш (Redis при
+заданном REDIS_URL); с кэшем процесса у каждого воркера свои ведра и свой
+лимит генераций — manage.py check --deploy сообщает об этом ошибкой
+chatAI.E001 (см. baseAPI/checks.py).
+"""
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+KEY_PREFIX = 'chat_throttle'
+METRICS = ('admitted', 'rate_limited', 'concurrency_limited')
+LOCK_TIMEOUT = 1
+LOCK_ATTEMPTS = 20
+LOCK_RETRY_DELAY = 0.005
+
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_cache():
+    return caches[get_setting('CHAT_THROTTLE_CACHE', 'shared')]
+
+
+def increment(cache, key, delta=1):
+    """Атомарный счетчик в кэше без срока жизни; incr не создает отсутствующий ключ."""
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key, delta)
+
+
+def record(metric):
+    increment(get_cache(), f'{KEY_PREFIX}:metrics:{metric}')
+
+
+def get_throttle_metrics():
+    """Счетчики запросов и число занятых сейчас слотов генерации."""
+    cache = get_cache()
+    counters = cache.get_many([f'{KEY_PREFIX}:metrics:{metric}' for metric in METRICS])
+    metrics = {metric: counters.get(f'{KEY_PREFIX}:metrics:{metric}', 0) for metric in METRICS}
+    slots = [f'{KEY_PREFIX}:slot:{i}' for i in range(get_setting('CHAT_MAX_CONCURRENT', 8))]
+    metrics['in_flight'] = len(cache.get_many(slots))
+    return metrics
+
+
+@contextmanager
+def cache_lock(cache, key):
+    """Короткий замок на ключ; None вместо входа, если занять его не удалось."""
+    lock_key = f'{key}:lock'
+    for _ in range(LOCK_ATTEMPTS):
+        if cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+            try:
+                yield True
+            finally:
+                cache.delete(lock_key)
+            return
+        time.sleep(LOCK_RETRY_DELAY)
+    yield False
+
+
+class ChatRateThrottle(BaseThrottle):
+    """Token bucket на пользователя для создания сообщений в чате."""
+
+    def allow_request(self, request, view):
+        if not request.user.is_authenticated:
+            return True
+        per_minute = get_setting('CHAT_RATE_PER_MINUTE', 6)
+        burst = get_setting('CHAT_RATE_BURST', 5)
+        interval = 60 / per_minute
+        tolerance = (burst - 1) * interval
+
+        cache = get_cache()
+        key = f'{KEY_PREFIX}:bucket:{request.user.pk}'
+        with cache_lock(cache, key) as locked:
+            if not locked:
+                # Параллельный запрос того же пользователя держит замок
+                self.wait_seconds = LOCK_TIMEOUT
+                record('rate_limited')
+                return False
+            now = time.time()
+            # Время, к которому ведро станет полным (theoretical arrival time)
+            tat = max(cache.get(key) or now, now)
+            if tat - now > tolerance:
+                self.wait_seconds = tat - now - tolerance
+                record('rate_limited')
+                return False
+            new_tat = tat + interval
+            cache.set(key, new_tat, timeout=int(new_tat - now) + 1)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+def acquire_slot(cache, prefix, count, lease):
+    for i in range(count):
+        key = f'{prefix}:{i}'
+        if cache.add(key, 1, timeout=lease):
+            return key
+    return None
+
+
+@contextmanager
+def generation_slot(user):
+    """
+    Занимает слот генерации на время блока.
+
+    Поднимает Throttled, если у пользователя или у сервиса уже занято
+    максимальное число одновременных генераций.
+    """
+    cache = get_cache()
+    lease = get_setting('CHAT_GENERATION_LEASE_SECONDS', 120)
+    user_slot = acquire_slot(cache, f'{KEY_PREFIX}:user:{user.pk}:slot',
+                             get_setting('CHAT_MAX_CONCURRENT_PER_USER', 1), lease)
+    global_slot = user_slot and acquire_slot(cache, f'{KEY_PREFIX}:slot',
+                                             get_setting('CHAT_MAX_CONCURRENT', 8), lease)
+    if not global_slot:
+        if user_slot:
+            cache.delete(user_slot)
+        record('concurrency_limited')
+        raise Throttled(
+            wait=get_setting('CHAT_CONCURRENCY_RETRY_AFTER', 5),
+            detail="Too many AI replies are being generated, try again later.",
+        )
+
+    record('admitted')
+    try:
+        yield
+    finally:
+        cache.delete_many([user_slot, global_slot])
@@ -8,17 +8,44 @@ API endpoints для работы с историей чатов.
 
 from drf_yasg.utils import swagger_auto_schema
 from langchain_gigachat.chat_models import GigaChat
-from langchain_core.messages import HumanMessage, SystemMessage
 from rest_framework import viewsets, status, mixins
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
 
 from baseAPI.settings import AI_TOKEN
-from .models import ChatHistory
+from .context import build_context, schedule_summary
+from .models import ChatHistory, ChatSummary
+from .resilience import ResilientLLM
 from .serializers import ChatHistorySerializer, MessageCreateSerializer
+from .throttling import ChatRateThrottle, generation_slot, get_throttle_metrics
+
+
+def create_ai_client():
+    """
+    Клиент GigaChat с таймаутом, повторами, circuit breaker и bulkhead
+    (см. chatAI/resilience.py); пересоздается в каждом воркере после fork
+    (см. baseAPI.warmup)
+    """
+    timeout = getattr(settings, 'CHAT_AI_TIMEOUT', 20)
+    return ResilientLLM(
+        GigaChat(
+            credentials=AI_TOKEN,
+            verify_ssl_certs=False,
+            timeout=timeout
+        ),
+        timeout=timeout,
+        retries=getattr(settings, 'CHAT_AI_RETRIES', 1),
+        failure_threshold=getattr(settings, 'CHAT_AI_FAILURE_THRESHOLD', 5),
+        reset_timeout=getattr(settings, 'CHAT_AI_RESET_TIMEOUT', 30),
+        max_concurrent=getattr(settings, 'CHAT_AI_MAX_CONCURRENT', 8),
+    )
 
 
 @method_decorator(never_cache, name='dispatch')
@@ -44,10 +71,13 @@ class ChatHistoryViewSet(
     serializer_class = ChatHistorySerializer
     permission_classes = [IsAuthenticated]
 
-    ai_client = GigaChat(
-        credentials=AI_TOKEN,
-        verify_ssl_certs=False
-    )
+    ai_client = create_ai_client()
+
+    def get_throttles(self):
+        """Ограничение частоты только для создания сообщений (генерации ответа ИИ)"""
+        if self.action == 'create':
+            return [ChatRateThrottle()]
+        return super().get_throttles()
 
     def get_queryset(self):
         """
@@ -67,7 +97,9 @@ class ChatHistoryViewSet(
         responses={
             201: "Запись успешно создана",
             400: "Неверные входные данные",
-            403: "Доступ запрещен"
+            403: "Доступ запрещен",
+            429: "Слишком много сообщений или одновременных генераций, см. Retry-After",
+            503: "GigaChat недоступен или не ответил вовремя"
         },
         request_body=MessageCreateSerializer
     )
@@ -85,35 +117,46 @@ class ChatHistoryViewSet(
         })
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        with generation_slot(request.user):
+            text = self.generate_reply(serializer)
+
+        return Response(
+            {
+                "message": text,
+                "data": serializer.data
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+    def generate_reply(self, serializer):
+        """
+        Получает ответ ИИ и сохраняет его вместе с сообщением пользователя.
+
+        Сообщения сохраняются только после ответа: если GigaChat недоступен,
+        в истории не остается вопроса без ответа, а транзакция не держится
+        открытой на время вызова.
 
-        messages = [
-            SystemMessage(
-                content="Ты бот, который придумывает рецепты. На любой запрос придумай рецепт"
-            ),
-            HumanMessage(
-                content=serializer.data["text"]
-            )
-        ]
+        В запрос попадают summary старых сообщений и последние сообщения
+        в пределах бюджета токенов (см. chatAI/context.py); когда несжатая
+        история растет, после сохранения запускается ее сжатие в фоне.
+        """
+        messages, needs_summary = build_context(self.request.user, serializer.validated_data["text"])
 
         response = self.ai_client.invoke(messages)
         text = response.content
 
         serializer_ai = self.get_serializer(data={
             "text": text,
-            "user": request.user.id,
+            "user": self.request.user.id,
             "sender_type": "AI"
         })
         serializer_ai.is_valid(raise_exception=True)
-        self.perform_create(serializer_ai)
-
-        return Response(
-            {
-                "message": text,
-                "data": serializer.data
-            },
-            status=status.HTTP_201_CREATED
-        )
+        with transaction.atomic():
+            self.perform_create(serializer)
+            self.perform_create(serializer_ai)
+            if needs_summary:
+                transaction.on_commit(partial(schedule_summary, self.request.user.id, self.ai_client))
+        return text
 
     @swagger_auto_schema(
         operation_description="Получение истории чатов пользователя",
@@ -138,6 +181,8 @@ class ChatHistoryViewSet(
             Response: Сообщение о количестве удаленных записей
         """
         count, _ = self.get_queryset().delete()
+        # Summary описывает удаленные сообщения
+        ChatSummary.objects.filter(user=request.user).delete()
         return Response(
             {"message": f"Deleted {count} chat history records"},
             status=status.HTTP_200_OK
@@ -151,4 +196,13 @@ class ChatHistoryViewSet(
         """
         ai_messages = self.get_queryset().filter(sender_type='AI')
         serializer = self.get_serializer(ai_messages, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def throttle_metrics(self, request):
+        """
+        Счетчики ограничения генераций: пропущенные (admitted), отклоненные
+        по частоте (rate_limited) и по числу одновременных генераций
+        (concurrency_limited), а также число генераций в работе (in_flight).
+        """
+        return Response(get_throttle_metrics())
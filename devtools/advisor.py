@@ -0,0 +1,221 @@
+"""
+Анализ планов запросов и подбор составных индексов.
+
+Для каждой формы SELECT-запроса выполняется EXPLAIN на активном бэкенде,
+из плана извлекаются полные сканирования таблиц и сортировки без индекса
+(filesort / temp b-tree), а по условиям WHERE и ORDER BY предлагается
+составной индекс: сначала колонки равенства, затем колонка диапазона или
+колонки сортировки.
+"""
+import re
+
+from django.apps import apps
+
+FULL_SCAN = 'full scan'
+FILESORT = 'filesort'
+
+_ALIAS_RE = re.compile(r'(?:FROM|JOIN) "(\w+)"(?: AS)? "?([A-Z]\d+)"?(?=[\s)]|$)')
+_COLUMN = r'"?(\w+)"?\."(\w+)"'
+_EQUALITY_RE = re.compile(_COLUMN + r' (?:= %s|IN \(|IS NULL)')
+_BOOLEAN_RE = re.compile(r'(?:WHERE|AND|\() ' + _COLUMN + r'(?= AND| ORDER| LIMIT| GROUP|\)|$)')
+_RANGE_RE = re.compile(_COLUMN + r' (?:<|>|<=|>=) %s')
+_ORDER_COLUMN_RE = re.compile(_COLUMN + r'( DESC)?')
+
+_SQLITE_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?(.*)$')
+_POSTGRES_SEQ_SCAN_RE = re.compile(r'Seq Scan on (\w+)')
+
+
+class Finding:
+    """Проблема в плане запроса и предлагаемый индекс."""
+
+    def __init__(self, query, kind, table, suggestion=None):
+        self.query = query
+        self.kind = kind
+        self.table = table
+        self.suggestion = suggestion
+
+    def __repr__(self):
+        return f'<Finding {self.kind} {self.table} {self.suggestion}>'
+
+
+def get_alias_map(sql):
+    """Сопоставляет алиасы подзапросов и self-join'ов (U0, T3) с таблицами."""
+    return {alias: table for table, alias in _ALIAS_RE.findall(sql)}
+
+
+def get_main_table(sql):
+    """Таблица из FROM верхнего уровня (вне подзапросов)."""
+    depth = 0
+    for index, char in enumerate(sql):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0 and sql.startswith('FROM "', index):
+            return sql[index + 6:sql.index('"', index + 6)]
+    return None
+
+
+def get_top_level_clause(sql, keyword, stop_keywords):
+    """Текст раздела верхнего уровня (WHERE, ORDER BY) без вложенных подзапросов."""
+    depth = 0
+    start = None
+    for index, char in enumerate(sql):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0:
+            if start is None and sql.startswith(keyword, index):
+                start = index + len(keyword)
+            elif start is not None and any(sql.startswith(stop, index) for stop in stop_keywords):
+                return sql[start:index]
+    return sql[start:] if start is not None else ''
+
+
+def get_model_for_table(table):
+    for model in apps.get_models():
+        if model._meta.db_table == table:
+            return model
+    return None
+
+
+def get_field_name(model, column):
+    for field in model._meta.concrete_fields:
+        if field.column == column:
+            return field.name
+    return column
+
+
+def explain(connection, sql, params):
+    """Выполняет EXPLAIN и возвращает строки плана в виде словарей."""
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def parse_plan(vendor, plan, sql):
+    """Возвращает список (вид проблемы, таблица) из плана запроса."""
+    aliases = get_alias_map(sql)
+    main_table = get_main_table(sql)
+    problems = []
+    for row in plan:
+        if vendor == 'sqlite':
+            detail = row.get('detail', '')
+            match = _SQLITE_SCAN_RE.match(detail)
+            # SCAN ... USING COVERING INDEX — обход индекса, а не таблицы
+            if match and 'COVERING INDEX' not in match.group(3):
+                table = match.group(1)
+                problems.append((FULL_SCAN, aliases.get(table, table)))
+            elif 'USE TEMP B-TREE FOR ORDER BY' in detail:
+                problems.append((FILESORT, main_table))
+        elif vendor == 'mysql':
+            table = row.get('table')
+            table = aliases.get(table, table)
+            if row.get('type') == 'ALL':
+                problems.append((FULL_SCAN, table))
+            if 'Using filesort' in (row.get('Extra') or ''):
+                problems.append((FILESORT, table))
+        else:
+            line = next(iter(row.values()), '') or ''
+            match = _POSTGRES_SEQ_SCAN_RE.search(line)
+            if match:
+                problems.append((FULL_SCAN, match.group(1)))
+            elif line.strip().startswith('Sort') or '->  Sort' in line:
+                problems.append((FILESORT, main_table))
+    return problems
+
+
+def suggest_index(sql, table):
+    """
+    Предлагает составной индекс для таблицы по условиям запроса.
+
+    Возвращает (модель, список полей) или None, если подходящих колонок нет.
+    """
+    model = get_model_for_table(table)
+    if model is None:
+        return None
+    aliases = get_alias_map(sql)
+
+    def columns(regex, text):
+        result = []
+        for match in regex.finditer(text):
+            owner, column = match.group(1), match.group(2)
+            if aliases.get(owner, owner) == table and column not in [col for col, _ in result]:
+                result.append((column, match.groups()[2:]))
+        return result
+
+    where = get_top_level_clause(sql, ' WHERE ', (' GROUP BY ', ' ORDER BY ', ' LIMIT '))
+    equality = [col for col, _ in columns(_EQUALITY_RE, where)]
+    equality += [col for col, _ in columns(_BOOLEAN_RE, ' WHERE ' + where) if col not in equality]
+    ranges = [col for col, _ in columns(_RANGE_RE, where) if col not in equality]
+
+    ordering = []
+    order_by = get_top_level_clause(sql, ' ORDER BY ', (' LIMIT ', ' OFFSET '))
+    for col, extra in columns(_ORDER_COLUMN_RE, order_by):
+        if col not in equality:
+            ordering.append(('-' if extra and extra[0] else '') + col)
+
+    pk_column = model._meta.pk.column
+    fields = [col for col in equality if col != pk_column]
+    if ordering:
+        fields += ordering
+    elif ranges:
+        fields.append(ranges[0])
+    if not fields or fields[0].lstrip('-') == pk_column:
+        return None
+
+    def to_field_name(column):
+        desc = column.startswith('-')
+        name = get_field_name(model, column.lstrip('-'))
+        return '-' + name if desc else name
+
+    fields = [to_field_name(col) for col in fields]
+    if is_covered(model, fields):
+        return None
+    return model, fields
+
+
+def get_existing_indexes(model):
+    """Списки полей существующих индексов модели (без направления сортировки)."""
+    opts = model._meta
+    indexes = [[f.lstrip('-') for f in index.fields] for index in opts.indexes]
+    indexes += [list(fields) for fields in opts.unique_together]
+    indexes += [list(constraint.fields) for constraint in opts.constraints
+                if getattr(constraint, 'fields', None)]
+    indexes += [[field.name] for field in opts.concrete_fields
+                if field.db_index or field.unique or field.primary_key]
+    return indexes
+
+
+def is_covered(model, fields):
+    """Покрывает ли уже существующий индекс предложенный набор полей."""
+    names = [f.lstrip('-') for f in fields]
+    return any(index[:len(names)] == names for index in get_existing_indexes(model))
+
+
+def analyze(connection, shapes):
+    """Выполняет EXPLAIN для каждой формы SELECT и возвращает найденные проблемы."""
+    findings = []
+    for query in shapes:
+        if not query.is_select or 'sqlite_master' in query.sql:
+            continue
+        try:
+            plan = explain(connection, query.sql, query.params)
+        except Exception:
+            # Запрос мог ссылаться на уже удаленные временные объекты
+            continue
+        for kind, table in parse_plan(connection.vendor, plan, query.sql):
+            if table is None:
+                continue
+            findings.append(Finding(query, kind, table, suggest_index(query.sql, table)))
+    return findings
+
+
+def format_index(model, fields):
+    name_parts = [model._meta.model_name] + [f.lstrip('-') for f in fields] + ['idx']
+    name = '_'.join(name_parts)[:30]
+    return (f"{model._meta.label}: models.Index(fields={fields!r}, "
+            f"name={name!r})")
@@ -0,0 +1,465 @@
+"""
+Синтетический набор данных production-масштаба для бенчмарков.
+
+Все значения выводятся из seed: у каждой таблицы свой генератор
+random.Random(f'{seed}:{таблица}'), поэтому на пустой базе один и тот же
+seed и --until дают одинаковые данные.
+
+Распределения близки к реальным: активность пользователей, популярность
+авторов, рецептов и ингредиентов подчиняются степенному закону (ранг r
+выбирается с весом 1 / r^s, ранги перемешаны, чтобы популярные объекты
+не шли подряд по id). Даты разбросаны по последним years годам, лайки и
+комментарии всегда позже рецепта.
+
+Строки пишутся через cursor.executemany пачками по batch_size, минуя
+создание моделей, bulk_create и сигналы: это в разы быстрее, и
+auto_now_add не затирает сгенерированные даты. id назначаются явно
+начиная с текущего максимума таблицы, как в recipe/importer.py, поэтому
+id не нужно дочитывать (MySQL не возвращает их из вставки пачкой).
+Денормализованные счетчики (likes_count, followers_count,
+following_count) и AuthorStats пересчитываются в конце по диапазонам id.
+Ленты подписок (FeedEntry), похожие рецепты и рекомендации не заполняются:
+для них есть свои команды пересборки.
+"""
+import random
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connections, router, transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from chatAI.models import ChatHistory
+from profiles.stats import refresh_author_stats
+from recipe.canonical import normalize_name
+from recipe.models import Comment, Ingredient, Like, Recipe, RecipeIngredient, SearchHistory
+from users.models import Followers
+
+PRESETS = {
+    'tiny': {
+        'users': 50, 'ingredients': 100, 'recipes': 200, 'likes': 2_000, 'follows': 300,
+        'comments': 300, 'searches': 500, 'chat_messages': 400, 'years': 1,
+    },
+    'small': {
+        'users': 2_000, 'ingredients': 500, 'recipes': 10_000, 'likes': 200_000, 'follows': 20_000,
+        'comments': 20_000, 'searches': 50_000, 'chat_messages': 40_000, 'years': 2,
+    },
+    'medium': {
+        'users': 20_000, 'ingredients': 2_000, 'recipes': 100_000, 'likes': 2_000_000, 'follows': 200_000,
+        'comments': 200_000, 'searches': 500_000, 'chat_messages': 400_000, 'years': 3,
+    },
+    'large': {
+        'users': 100_000, 'ingredients': 5_000, 'recipes': 500_000, 'likes': 10_000_000, 'follows': 1_000_000,
+        'comments': 1_000_000, 'searches': 3_000_000, 'chat_messages': 2_000_000, 'years': 5,
+    },
+}
+TABLES = ('users', 'ingredients', 'recipes', 'likes', 'follows', 'comments', 'searches', 'chat_messages')
+
+# Показатели степенного закона: чем больше, тем сильнее выделяются лидеры
+ACTIVITY_EXPONENT = 1.0
+POPULARITY_EXPONENT = 1.1
+INGREDIENT_EXPONENT = 0.9
+RECIPE_INGREDIENTS = (3, 12)
+PRIVATE_SHARE = 0.05
+INACTIVE_SHARE = 0.02
+RECOUNT_CHUNK = 10_000
+PASSWORD = 'password'
+
+BASE_INGREDIENTS = [
+    'Мука', 'Яйцо', 'Молоко', 'Сахар', 'Соль', 'Масло сливочное', 'Масло подсолнечное', 'Картофель',
+    'Морковь', 'Лук репчатый', 'Чеснок', 'Помидор', 'Огурец', 'Капуста белокочанная', 'Свекла',
+    'Перец болгарский', 'Перец черный молотый', 'Говядина', 'Свинина', 'Курица', 'Фарш мясной',
+    'Лосось', 'Треска', 'Креветки', 'Рис', 'Гречка', 'Овсяные хлопья', 'Макароны', 'Сыр твердый',
+    'Творог', 'Сметана', 'Сливки', 'Кефир', 'Майонез', 'Укроп', 'Петрушка', 'Базилик', 'Лавровый лист',
+    'Грибы шампиньоны', 'Кабачок', 'Баклажан', 'Тыква', 'Яблоко', 'Банан', 'Лимон', 'Апельсин',
+    'Клубника', 'Малина', 'Изюм', 'Грецкий орех', 'Мед', 'Какао', 'Шоколад', 'Ванилин', 'Корица',
+    'Разрыхлитель', 'Дрожжи', 'Томатная паста', 'Горчица', 'Соевый соус', 'Фасоль', 'Горох', 'Кукуруза',
+]
+VARIETIES = [
+    'фермерский', 'домашний', 'органический', 'замороженный', 'охлажденный', 'местный', 'импортный',
+    'высший сорт', 'первый сорт', 'отборный', 'молодой', 'крупный', 'мелкий', 'сушеный', 'консервированный',
+]
+UNITS = ['г', 'г', 'г', 'мл', 'шт', 'ст. л.', 'ч. л.', 'стакан', 'по вкусу']
+DISHES = [
+    'Борщ', 'Суп', 'Салат', 'Пирог', 'Омлет', 'Плов', 'Рагу', 'Запеканка', 'Котлеты', 'Блины', 'Паста',
+    'Каша', 'Пельмени', 'Вареники', 'Жаркое', 'Шарлотка', 'Сырники', 'Оладьи', 'Гуляш', 'Солянка',
+    'Щи', 'Окрошка', 'Голубцы', 'Драники', 'Манник', 'Кекс', 'Торт', 'Рулет', 'Пицца', 'Лазанья',
+]
+QUALIFIERS = [
+    'по-домашнему', 'по-деревенски', 'на скорую руку', 'для всей семьи', 'с секретом', 'по-грузински',
+    'в духовке', 'на сковороде', 'в мультиварке', 'по бабушкиному рецепту', 'на праздник', 'на завтрак',
+    'без глютена', 'постный вариант', 'как в детстве', 'по-итальянски', 'по-французски', 'на ужин',
+]
+DESCRIPTIONS = [
+    'Простое блюдо, которое готовится из доступных продуктов.',
+    'Любимый рецепт нашей семьи, проверенный годами.',
+    'Получается нежным и ароматным, понравится даже детям.',
+    'Отличный вариант для быстрого ужина после работы.',
+    'Праздничное блюдо, которое украсит любой стол.',
+    'Сытно, полезно и совсем не сложно.',
+    'Готовлю по выходным, гости всегда просят добавки.',
+]
+STEPS = [
+    'Подготовьте {ingredient}: промойте и нарежьте.',
+    'Разогрейте сковороду и обжарьте {ingredient} до золотистого цвета.',
+    'Смешайте {ingredient} с остальными ингредиентами.',
+    'Добавьте {ingredient}, посолите и поперчите по вкусу.',
+    'Тушите на медленном огне {minutes} минут, периодически помешивая.',
+    'Выпекайте в разогретой до 180 градусов духовке {minutes} минут.',
+    'Доведите до кипения и варите {minutes} минут.',
+    'Дайте блюду настояться {minutes} минут и подавайте к столу.',
+]
+SEARCH_TERMS = [
+    'борщ', 'пирог с яблоками', 'быстрый ужин', 'салат', 'курица в духовке', 'постное', 'десерт',
+    'блины на молоке', 'суп', 'завтрак', 'паста', 'без сахара', 'шарлотка', 'котлеты', 'плов',
+]
+CHAT_QUESTIONS = [
+    'Что приготовить на ужин из {ingredient}?',
+    'Придумай рецепт с {ingredient} на скорую руку',
+    'Хочу что-нибудь легкое на завтрак',
+    'Какой десерт можно сделать без духовки?',
+    'Есть {ingredient} и немного времени, что посоветуешь?',
+    'Нужен постный рецепт на обед',
+]
+COMMENTS = [
+    'Очень вкусно, спасибо за рецепт!', 'Готовила вчера, всем понравилось.', 'Добавил больше чеснока — отлично.',
+    'Получилось суховато, в следующий раз уменьшу время.', 'Лучший рецепт, что я пробовал!',
+    'А можно заменить {ingredient}?', 'Сделала с {ingredient}, вышло еще вкуснее.',
+]
+
+
+class PowerLaw:
+    """Выбор индексов 0..n-1 с вероятностью, убывающей как 1 / ранг^exponent."""
+
+    def __init__(self, n, exponent, rng):
+        self.n = n
+        self.cum_weights = list(accumulate(1 / (rank + 1) ** exponent for rank in range(n)))
+        self.total = self.cum_weights[-1] if n else 0
+        # Популярные ранги разбросаны по случайным индексам
+        self.order = list(range(n))
+        rng.shuffle(self.order)
+
+    def sample(self, rng, k=1):
+        order, cum_weights, total = self.order, self.cum_weights, self.total
+        return [order[bisect_left(cum_weights, rng.random() * total)] for _ in range(k)]
+
+    def sample_distinct(self, rng, k, exclude=None):
+        """k разных индексов (меньше, если столько не набирается)."""
+        k = min(k, self.n - (exclude is not None))
+        chosen = set()
+        attempts = 0
+        while len(chosen) < k and attempts < 20:
+            chosen.update(self.sample(rng, k - len(chosen)))
+            chosen.discard(exclude)
+            attempts += 1
+        return sorted(chosen)
+
+    def allocate(self, rng, total, cap=None):
+        """
+        Делит total между индексами пропорционально весам: сколько приходится
+        на каждый. Доля сверх cap перераспределяется между следующими рангами.
+        """
+        counts = [0] * self.n
+        remaining = total
+        previous = 0
+        for rank, index in enumerate(self.order):
+            weight = self.cum_weights[rank] - previous
+            expected = remaining * weight / (self.total - previous)
+            if cap is not None:
+                expected = min(expected, cap)
+            counts[index] = int(expected) + (rng.random() < expected - int(expected))
+            remaining = max(0, remaining - counts[index])
+            previous = self.cum_weights[rank]
+        return counts
+
+
+class TableWriter:
+    """
+    Вставка строк модели пачками через executemany; отсутствующие поля берут default.
+
+    parent — writer таблицы, на которую ссылаются строки: его пачка
+    записывается первой, чтобы внешние ключи указывали на вставленные строки.
+    """
+
+    def __init__(self, model, using, batch_size, parent=None):
+        self.connection = connections[using]
+        self.batch_size = batch_size
+        self.parent = parent
+        self.fields = model._meta.concrete_fields
+        self.positions = {field.attname: position for position, field in enumerate(self.fields)}
+        self.defaults = [None if field.null and not field.has_default() else field.get_default()
+                         for field in self.fields]
+        quote = self.connection.ops.quote_name
+        self.sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(model._meta.db_table),
+            ', '.join(quote(field.column) for field in self.fields),
+            ', '.join(['%s'] * len(self.fields)),
+        )
+        # Даты приводятся к формату бэкенда (UTC-строка для SQLite, naive для MySQL)
+        self.adapters = [(position, field) for position, field in enumerate(self.fields)
+                         if field.get_internal_type() in ('DateTimeField', 'DateField')]
+        self.rows = []
+        self.count = 0
+
+    def add(self, **values):
+        row = list(self.defaults)
+        for name, value in values.items():
+            row[self.positions[name]] = value
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.parent is not None:
+            self.parent.flush()
+        for position, field in self.adapters:
+            for row in self.rows:
+                row[position] = field.get_db_prep_save(row[position], self.connection)
+        with transaction.atomic(using=self.connection.alias), self.connection.cursor() as cursor:
+            cursor.executemany(self.sql, self.rows)
+        self.count += len(self.rows)
+        self.rows = []
+
+
+class DatasetGenerator:
+    def __init__(self, counts, seed=0, until=None, batch_size=5000, using=None, progress=None):
+        self.counts = counts
+        self.seed = seed
+        self.using = using or router.db_for_write(Recipe)
+        self.batch_size = batch_size
+        self.progress = progress or (lambda message: None)
+        self.end = until or datetime.now(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.span = timedelta(days=365 * counts['years']).total_seconds()
+        self.start = self.end - timedelta(seconds=self.span)
+
+    def rng(self, table):
+        return random.Random(f'{self.seed}:{table}')
+
+    def writer(self, model, parent=None):
+        return TableWriter(model, self.using, self.batch_size, parent)
+
+    def next_id(self, model):
+        return (model.objects.using(self.using).aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+
+    def moment(self, rng, after=None):
+        """Случайный момент между after (или началом периода) и концом периода."""
+        low = 0 if after is None else after
+        return low + rng.random() * (self.span - low)
+
+    def at(self, offset):
+        return self.start + timedelta(seconds=offset)
+
+    def generate(self):
+        stats = {}
+        for table in TABLES:
+            started = time.perf_counter()
+            stats[table] = getattr(self, f'generate_{table}')()
+            self.progress(f"{table}: {stats[table]} rows in {time.perf_counter() - started:.1f}s")
+        started = time.perf_counter()
+        self.refresh_counters()
+        self.progress(f"counters refreshed in {time.perf_counter() - started:.1f}s")
+        return stats
+
+    def generate_users(self):
+        rng = self.rng('users')
+        User = get_user_model()
+        self.first_user_id = self.next_id(User)
+        # Хэш пароля считается один раз: PBKDF2 на каждого пользователя занял бы минуты
+        password = make_password(PASSWORD)
+        self.user_joined = []
+        writer = self.writer(User)
+        for index in range(self.counts['users']):
+            user_id = self.first_user_id + index
+            # Пользователи регистрируются в первой половине периода, чтобы успеть поактивничать
+            joined = self.moment(rng) / 2
+            self.user_joined.append(joined)
+            writer.add(id=user_id, username=f'cook{user_id}', email=f'cook{user_id}@example.com',
+                       password=password, date_joined=self.at(joined), registered_on=self.at(joined),
+                       bio=rng.choice(DESCRIPTIONS) if rng.random() < 0.3 else '')
+        writer.flush()
+        self.activity = PowerLaw(self.counts['users'], ACTIVITY_EXPONENT, rng)
+        self.author_popularity = PowerLaw(self.counts['users'], POPULARITY_EXPONENT, rng)
+        return writer.count
+
+    def generate_ingredients(self):
+        rng = self.rng('ingredients')
+        existing = dict(Ingredient.objects.using(self.using).values_list('normalized_name', 'id'))
+        names = list(BASE_INGREDIENTS)
+        names += [f'{base} {variety}' for variety in VARIETIES for base in BASE_INGREDIENTS]
+        number = 2
+        while len(names) < self.counts['ingredients']:
+            names += [f'{base} сорт {number}' for base in BASE_INGREDIENTS]
+            number += 1
+        names = names[:self.counts['ingredients']]
+
+        next_id = self.next_id(Ingredient)
+        self.ingredient_ids, self.ingredient_names = [], []
+        writer = self.writer(Ingredient)
+        for name in names:
+            key = normalize_name(name)
+            ingredient_id = existing.get(key)
+            if ingredient_id is None:
+                ingredient_id = next_id
+                next_id += 1
+                writer.add(id=ingredient_id, name=name, normalized_name=key)
+            self.ingredient_ids.append(ingredient_id)
+            self.ingredient_names.append(name)
+        writer.flush()
+        self.ingredient_popularity = PowerLaw(len(names), INGREDIENT_EXPONENT, rng)
+        return writer.count
+
+    def generate_recipes(self):
+        rng = self.rng('recipes')
+        self.first_recipe_id = self.next_id(Recipe)
+        self.recipe_created = []
+        recipes = self.writer(Recipe)
+        links = self.writer(RecipeIngredient, parent=recipes)
+        next_link_id = self.next_id(RecipeIngredient)
+        per_author = self.author_popularity.allocate(rng, self.counts['recipes'])
+        authors = [index for index, count in enumerate(per_author) for _ in range(count)]
+        rng.shuffle(authors)
+        for index in range(self.counts['recipes']):
+            # allocate дает примерно нужное число — недостающих авторов добираем по популярности
+            author = authors[index] if index < len(authors) else self.author_popularity.sample(rng)[0]
+            created = self.moment(rng, after=self.user_joined[author])
+            self.recipe_created.append(created)
+            ingredients = self.ingredient_popularity.sample_distinct(rng, rng.randint(*RECIPE_INGREDIENTS))
+            names = [self.ingredient_names[i] for i in ingredients]
+            cooking_time = rng.choice((10, 15, 20, 30, 40, 45, 60, 90, 120, 180))
+            recipe_id = self.first_recipe_id + index
+            recipes.add(
+                id=recipe_id, author_id=self.first_user_id + author,
+                title=f'{rng.choice(DISHES)} {rng.choice(QUALIFIERS)}',
+                description=' '.join(rng.sample(DESCRIPTIONS, 2)),
+                instructions='\n'.join(
+                    rng.choice(STEPS).format(ingredient=rng.choice(names).lower(), minutes=rng.randint(5, 40))
+                    for _ in range(rng.randint(4, 10))
+                ),
+                cooking_time_minutes=cooking_time, servings=rng.randint(1, 8),
+                created_at=self.at(created), updated_at=self.at(created),
+                is_private=rng.random() < PRIVATE_SHARE, is_active=rng.random() >= INACTIVE_SHARE,
+            )
+            for ingredient in ingredients:
+                unit = rng.choice(UNITS)
+                links.add(id=next_link_id, recipe_id=recipe_id, ingredient_id=self.ingredient_ids[ingredient],
+                          count=0 if unit == 'по вкусу' else rng.choice((1, 2, 3, 50, 100, 200, 250, 500)),
+                          visible_type_of_count=unit)
+                next_link_id += 1
+        links.flush()
+        recipes.flush()
+        self.recipe_popularity = PowerLaw(self.counts['recipes'], POPULARITY_EXPONENT, rng)
+        return recipes.count
+
+    def generate_likes(self):
+        """Лайки по пользователям: число — по активности, рецепты — по популярности, без повторов."""
+        rng = self.rng('likes')
+        writer = self.writer(Like)
+        next_id = self.next_id(Like)
+        per_user = self.activity.allocate(rng, self.counts['likes'], cap=max(1, self.counts['recipes'] // 4))
+        for user, count in enumerate(per_user):
+            for recipe in self.recipe_popularity.sample_distinct(rng, count):
+                created = self.moment(rng, after=max(self.recipe_created[recipe], self.user_joined[user]))
+                writer.add(id=next_id, user_id=self.first_user_id + user,
+                           recipe_id=self.first_recipe_id + recipe, created_at=self.at(created))
+                next_id += 1
+        writer.flush()
+        return writer.count
+
+    def generate_follows(self):
+        """Подписки: сколько — по активности пользователя, на кого — по популярности автора."""
+        rng = self.rng('follows')
+        writer = self.writer(Followers)
+        next_id = self.next_id(Followers)
+        per_user = self.activity.allocate(rng, self.counts['follows'], cap=max(1, self.counts['users'] // 4))
+        for user, count in enumerate(per_user):
+            for author in self.author_popularity.sample_distinct(rng, count, exclude=user):
+                created = self.moment(rng, after=max(self.user_joined[user], self.user_joined[author]))
+                writer.add(id=next_id, user_id_id=self.first_user_id + user,
+                           author_id_id=self.first_user_id + author, created_at=self.at(created))
+                next_id += 1
+        writer.flush()
+        return writer.count
+
+    def generate_comments(self):
+        rng = self.rng('comments')
+        writer = self.writer(Comment)
+        next_id = self.next_id(Comment)
+        authors = self.activity.sample(rng, self.counts['comments'])
+        recipes = self.recipe_popularity.sample(rng, self.counts['comments'])
+        for index, (author, recipe) in enumerate(zip(authors, recipes)):
+            created = self.moment(rng, after=max(self.recipe_created[recipe], self.user_joined[author]))
+            writer.add(id=next_id + index, recipe_id=self.first_recipe_id + recipe,
+                       author_id=self.first_user_id + author, created_at=self.at(created),
+                       comment_text=rng.choice(COMMENTS).format(ingredient=rng.choice(self.ingredient_names).lower()))
+        writer.flush()
+        return writer.count
+
+    def generate_searches(self):
+        rng = self.rng('searches')
+        writer = self.writer(SearchHistory)
+        next_id = self.next_id(SearchHistory)
+        for index, user in enumerate(self.activity.sample(rng, self.counts['searches'])):
+            text = rng.choice(SEARCH_TERMS) if rng.random() < 0.7 else rng.choice(self.ingredient_names).lower()
+            writer.add(id=next_id + index, user_id=self.first_user_id + user, text=text,
+                       created_at=self.at(self.moment(rng, after=self.user_joined[user])))
+        writer.flush()
+        return writer.count
+
+    def generate_chat_messages(self):
+        """Разговоры из нескольких пар «вопрос пользователя — ответ ИИ» подряд."""
+        rng = self.rng('chat_messages')
+        writer = self.writer(ChatHistory)
+        next_id = self.next_id(ChatHistory)
+        remaining = self.counts['chat_messages']
+        while remaining > 0:
+            user = self.activity.sample(rng)[0]
+            moment = self.moment(rng, after=self.user_joined[user])
+            for _ in range(min(rng.randint(1, 6), (remaining + 1) // 2)):
+                ingredient = rng.choice(self.ingredient_names).lower()
+                question = rng.choice(CHAT_QUESTIONS).format(ingredient=ingredient)
+                answer = f"Рецепт: {rng.choice(DISHES).lower()} {rng.choice(QUALIFIERS)}. " + ' '.join(
+                    rng.choice(STEPS).format(ingredient=ingredient, minutes=rng.randint(5, 40))
+                    for _ in range(rng.randint(3, 8))
+                )
+                for sender_type, text in (('user', question), ('AI', answer)):
+                    if remaining <= 0:
+                        break
+                    moment = min(moment + rng.uniform(5, 120), self.span)
+                    writer.add(id=next_id, user_id=self.first_user_id + user, text=text,
+                               sender_type=sender_type, created_at=self.at(moment))
+                    next_id += 1
+                    remaining -= 1
+        writer.flush()
+        return writer.count
+
+    def refresh_counters(self):
+        """Пересчитывает денормализованные счетчики по сгенерированным диапазонам id."""
+        User = get_user_model()
+        likes_count = (Like.objects.filter(recipe=OuterRef('pk')).values('recipe')
+                       .annotate(total=Count('id')).values('total')[:1])
+        followers_count = (Followers.objects.filter(author_id=OuterRef('pk')).values('author_id')
+                           .annotate(total=Count('id')).values('total')[:1])
+        following_count = (Followers.objects.filter(user_id=OuterRef('pk')).values('user_id')
+                           .annotate(total=Count('id')).values('total')[:1])
+        ranges = (
+            (Recipe, self.first_recipe_id, self.counts['recipes'],
+             {'likes_count': Coalesce(Subquery(likes_count), 0)}),
+            (User, self.first_user_id, self.counts['users'],
+             {'followers_count': Coalesce(Subquery(followers_count), 0),
+              'following_count': Coalesce(Subquery(following_count), 0)}),
+        )
+        for model, first_id, count, updates in ranges:
+            for low in range(first_id, first_id + count, RECOUNT_CHUNK):
+                high = min(low + RECOUNT_CHUNK, first_id + count) - 1
+                model.objects.using(self.using).filter(pk__range=(low, high)).update(**updates)
+        # Статистика авторов считается после likes_count, из которого берется likes_received
+        for low in range(self.first_user_id, self.first_user_id + self.counts['users'], RECOUNT_CHUNK):
+            high = min(low + RECOUNT_CHUNK, self.first_user_id + self.counts['users'])
+            with transaction.atomic(using=self.using):
+                refresh_author_stats(range(low, high), using=self.using)
@@ -0,0 +1,72 @@
+"""
+manage.py benchmark_connections — сравнивает подключение к MySQL с пулом и без.
+
+Каждый «запрос» повторяет то, что делает Django при CONN_MAX_AGE=0:
+открыть соединение, выполнить SELECT 1 и закрыть соединение. Для обычного
+бэкенда это каждый раз TCP, аутентификация и init_command, для пула —
+выдача уже открытого соединения (с ping при PRE_PING).
+
+Пример:
+    python manage.py benchmark_connections --requests 500
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.db.utils import load_backend
+
+from baseAPI.db_pool import get_pool_stats
+
+PLAIN_ENGINE = 'django.db.backends.mysql'
+POOLED_ENGINE = 'baseAPI.mysql_pool'
+
+
+class Command(BaseCommand):
+    help = "Measures per-request connection overhead with and without the connection pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help="How many simulated requests to run for each engine")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        settings_dict = connections[options['database']].settings_dict
+        if connections[options['database']].vendor != 'mysql':
+            raise CommandError("Connection benchmark requires a MySQL database")
+
+        results = {}
+        for engine in (PLAIN_ENGINE, POOLED_ENGINE):
+            timings = self.run(engine, settings_dict, options['requests'])
+            results[engine] = timings
+            self.stdout.write(
+                f"{engine:<28} mean {statistics.mean(timings):7.2f} ms  "
+                f"p95 {self.percentile(timings, 95):7.2f} ms  "
+                f"max {max(timings):7.2f} ms"
+            )
+
+        saved = statistics.mean(results[PLAIN_ENGINE]) - statistics.mean(results[POOLED_ENGINE])
+        self.stdout.write(self.style.SUCCESS(f"Pool saves {saved:.2f} ms per request"))
+        for alias, stats in get_pool_stats().items():
+            self.stdout.write(f"pool {alias}: {stats}")
+
+    def run(self, engine, settings_dict, count):
+        backend = load_backend(engine)
+        wrapper = backend.DatabaseWrapper({**settings_dict, 'ENGINE': engine}, alias='benchmark')
+        timings = []
+        try:
+            for _ in range(count):
+                start = time.perf_counter()
+                with wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                wrapper.close()
+                timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            wrapper.close()
+        return timings
+
+    @staticmethod
+    def percentile(values, percent):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
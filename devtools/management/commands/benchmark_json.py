@@ -0,0 +1,110 @@
+"""
+manage.py benchmark_json — сравнивает JSONRenderer/JSONParser из DRF
+с ORJSONRenderer/ORJSONParser на выводе RecipeSerializer.
+
+По умолчанию сериализуется страница синтетических рецептов с авторами,
+ингредиентами и кириллическим текстом (без обращения к БД); с --from-db
+берутся реальные рецепты из базы.
+
+Пример:
+    python manage.py benchmark_json --recipes 50 --iterations 2000
+"""
+import time
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from baseAPI.renderers import ORJSONParser, ORJSONRenderer
+from profiles.models import AuthorStats
+from recipe.models import Ingredient, Recipe, RecipeIngredient
+from recipe.serializers import RecipeSerializer
+
+INGREDIENT_NAMES = ['Мука', 'Яйцо', 'Молоко', 'Сахар', 'Соль', 'Масло сливочное', 'Картофель', 'Морковь']
+
+
+def build_synthetic_recipes(count):
+    """Несохраненные рецепты с заранее заполненным prefetch-кэшем ингредиентов."""
+    now = timezone.now()
+    authors = [get_user_model()(id=i, username=f'повар_{i}', email=f'cook{i}@example.com',
+                                bio='Люблю готовить борщ и пельмени') for i in range(1, 11)]
+    for author in authors:
+        author.stats = AuthorStats(user=author, recipes_count=12, likes_received=340, comments_received=56)
+    ingredients = [Ingredient(id=i, name=name) for i, name in enumerate(INGREDIENT_NAMES, start=1)]
+    recipes = []
+    for i in range(1, count + 1):
+        author = authors[i % len(authors)]
+        recipe = Recipe(
+            id=i, author=author, author_id=author.id,
+            title=f'Рецепт домашнего пирога №{i}',
+            description='Нежный пирог с яблоками и корицей, как у бабушки. ' * 3,
+            instructions='Смешайте муку с яйцами, добавьте молоко и выпекайте 40 минут. ' * 10,
+            cooking_time_minutes=40, servings=4, likes_count=i * 3,
+            created_at=now - timedelta(minutes=i), updated_at=now,
+        )
+        recipe.is_liked = i % 2 == 0
+        recipe._prefetched_objects_cache = {'recipeingredient_set': [
+            RecipeIngredient(id=i * 10 + j, recipe=recipe, ingredient=ingredient,
+                             count=100 + j, visible_type_of_count='г')
+            for j, ingredient in enumerate(ingredients[:6])
+        ]}
+        recipes.append(recipe)
+    return recipes
+
+
+class Command(BaseCommand):
+    help = "Compares DRF's JSON renderer/parser with the orjson-based ones on RecipeSerializer output"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=50, help="Recipes per payload (page size)")
+        parser.add_argument('--iterations', type=int, default=1000)
+        parser.add_argument('--from-db', action='store_true',
+                            help="Serialize real recipes from the database instead of synthetic ones")
+
+    def handle(self, *args, **options):
+        if options['from_db']:
+            recipes = list(Recipe.objects
+                           .select_related('author__stats')
+                           .prefetch_related('recipeingredient_set__ingredient')
+                           .order_by('-id')[:options['recipes']])
+            if not recipes:
+                raise CommandError("No recipes in the database")
+        else:
+            recipes = build_synthetic_recipes(options['recipes'])
+        data = RecipeSerializer(recipes, many=True, context={}).data
+
+        iterations = options['iterations']
+        results = []
+        for name, renderer, parser in (('drf json', JSONRenderer(), JSONParser()),
+                                       ('orjson', ORJSONRenderer(), ORJSONParser())):
+            render_time, body = self.time_render(renderer, data, iterations)
+            parse_time = self.time_parse(parser, body, iterations)
+            results.append((name, render_time, parse_time, len(body)))
+
+        self.stdout.write(f"{len(recipes)} recipes per payload, {iterations} iterations")
+        self.stdout.write(f"{'':<10} {'render us':>10} {'parse us':>10} {'bytes':>9}")
+        for name, render_time, parse_time, size in results:
+            self.stdout.write(f"{name:<10} {render_time:>10.1f} {parse_time:>10.1f} {size:>9}")
+        (_, base_render, base_parse, _), (_, fast_render, fast_parse, _) = results
+        self.stdout.write(self.style.SUCCESS(
+            f"render x{base_render / fast_render:.1f} faster, parse x{base_parse / fast_parse:.1f} faster"
+        ))
+
+    @staticmethod
+    def time_render(renderer, data, iterations):
+        body = renderer.render(data)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            renderer.render(data)
+        return (time.perf_counter() - started) / iterations * 1e6, body
+
+    @staticmethod
+    def time_parse(parser, body, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            parser.parse(BytesIO(body), parser_context={})
+        return (time.perf_counter() - started) / iterations * 1e6
@@ -0,0 +1,104 @@
+"""
+manage.py benchmark_servers — сравнивает пропускную способность серверов
+при большом числе одновременных клиентов.
+
+Серверы запускаются отдельно, например синхронные view под WSGI и
+асинхронные под ASGI с одинаковым числом процессов:
+
+    gunicorn baseAPI.wsgi -w 4 -b :8000
+    uvicorn baseAPI.asgi:application --workers 4 --port 8001
+
+    python manage.py benchmark_servers \\
+        --target wsgi=http://localhost:8000/api/v1/recipe/recipe/ \\
+        --target asgi=http://localhost:8001/api/v1/async/recipe/recipe/ \\
+        --concurrency 500 --requests 10000
+
+Для каждой цели печатаются запросы в секунду, перцентили задержки и
+число ошибок (таймауты, отказы в соединении, ответы не 2xx).
+"""
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Runs a concurrent GET load against several servers and compares throughput side by side"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', dest='targets', default=[],
+                            help="NAME=URL of a running server endpoint (can be repeated)")
+        parser.add_argument('--concurrency', type=int, default=200,
+                            help="Number of simultaneous client connections")
+        parser.add_argument('--requests', type=int, default=2000,
+                            help="Total number of requests per target")
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--token', help="JWT access token sent as 'Authorization: Bearer'")
+
+    def handle(self, *args, **options):
+        try:
+            import httpx
+        except ImportError:
+            raise CommandError("benchmark_servers requires httpx")
+
+        targets = []
+        for target in options['targets']:
+            name, sep, url = target.partition('=')
+            if not sep or not url:
+                raise CommandError(f"Invalid --target {target!r}, expected NAME=URL")
+            targets.append((name, url))
+        if not targets:
+            raise CommandError("At least one --target is required")
+
+        headers = {'Authorization': f"Bearer {options['token']}"} if options['token'] else {}
+        self.stdout.write(f"{'target':<10} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for name, url in targets:
+            result = asyncio.run(self.run_load(httpx, url, headers, options))
+            self.stdout.write(
+                f"{name:<10} {result['rps']:>9.1f} {result['p50']:>9.1f} {result['p95']:>9.1f} "
+                f"{result['p99']:>9.1f} {result['errors']:>7}"
+            )
+
+    async def run_load(self, httpx, url, headers, options):
+        concurrency = options['concurrency']
+        remaining = options['requests']
+        latencies = []
+        errors = 0
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+        async with httpx.AsyncClient(limits=limits, timeout=options['timeout'], headers=headers) as client:
+            async def worker():
+                nonlocal remaining, errors
+                while remaining > 0:
+                    remaining -= 1
+                    start = time.perf_counter()
+                    try:
+                        response = await client.get(url)
+                        if not response.is_success:
+                            errors += 1
+                            continue
+                    except httpx.HTTPError:
+                        errors += 1
+                        continue
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+        return {
+            'rps': len(latencies) / elapsed if elapsed else 0.0,
+            'p50': self.percentile(latencies, 50),
+            'p95': self.percentile(latencies, 95),
+            'p99': self.percentile(latencies, 99),
+            'errors': errors,
+        }
+
+    @staticmethod
+    def percentile(values, percent):
+        if not values:
+            return 0.0
+        if len(values) == 1:
+            return values[0]
+        return statistics.quantiles(values, n=100)[percent - 1]
@@ -0,0 +1,61 @@
+"""
+manage.py generate_dataset — заполняет базу синтетическими данными
+production-масштаба для бенчмарков и подбора индексов.
+
+Размеры задаются пресетом (--preset) и переопределяются по отдельности;
+данные детерминированы по --seed (и --until), см. devtools/dataset.py.
+Пароль всех сгенерированных пользователей — «password».
+
+Пример:
+    python manage.py generate_dataset --preset medium --seed 42
+    python manage.py generate_dataset --preset small --likes 1000000 --until 2026-01-01
+"""
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from devtools.dataset import PRESETS, TABLES, DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = "Generates a deterministic synthetic dataset (users, recipes, likes, follows, history)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--preset', choices=list(PRESETS), default='small')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--until', help="End of the generated period, YYYY-MM-DD (default: today)")
+        parser.add_argument('--years', type=int, help="Length of the generated period")
+        for table in TABLES:
+            parser.add_argument(f"--{table.replace('_', '-')}", type=int, dest=table,
+                                help=f"Number of {table.replace('_', ' ')} (overrides the preset)")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per INSERT batch")
+        parser.add_argument('--database', help="Database alias (default: router choice)")
+
+    def handle(self, *args, **options):
+        counts = dict(PRESETS[options['preset']])
+        for name in (*TABLES, 'years'):
+            if options[name] is not None:
+                counts[name] = options[name]
+        if any(value < 0 for value in counts.values()) or options['batch_size'] < 1:
+            raise CommandError("Sizes must not be negative and --batch-size must be positive")
+        if counts['years'] < 1 or (counts['users'] < 2 and counts['recipes']):
+            raise CommandError("Recipes need at least 2 users and a period of at least one year")
+
+        until = None
+        if options['until']:
+            try:
+                until = datetime.strptime(options['until'], '%Y-%m-%d').replace(tzinfo=dt_timezone.utc)
+            except ValueError:
+                raise CommandError("--until must be a date in YYYY-MM-DD format")
+
+        generator = DatasetGenerator(counts, seed=options['seed'], until=until,
+                                     batch_size=options['batch_size'], using=options['database'],
+                                     progress=self.stdout.write)
+        started = time.perf_counter()
+        stats = generator.generate()
+        elapsed = time.perf_counter() - started
+        total = sum(stats.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {total} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
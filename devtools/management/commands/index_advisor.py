@@ -0,0 +1,131 @@
+"""
+manage.py index_advisor — находит запросы без подходящих индексов.
+
+Запускает нагрузку (тесты проекта или набор GET-запросов к API) с перехватом
+всех SQL-запросов, группирует их по форме, выполняет EXPLAIN для каждой
+формы на активном бэкенде и печатает полные сканирования и сортировки без
+индекса вместе с предлагаемыми составными индексами.
+
+Примеры:
+    python manage.py index_advisor
+    python manage.py index_advisor recipe.tests
+    python manage.py index_advisor --workload requests --user admin
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.test.runner import DiscoverRunner
+from django.test.utils import get_runner
+from django.conf import settings
+
+from devtools.advisor import analyze, format_index
+from devtools.queries import QueryCollector, capture_queries
+
+DEFAULT_URLS = [
+    '/api/v1/recipe/recipe/',
+    '/api/v1/recipe/recipe/?search=суп',
+    '/api/v1/recipe/recipe/feed/',
+    '/api/v1/recipe/recipe/liked/',
+    '/api/v1/recipe/likes/',
+    '/api/v1/recipe/comments/',
+    '/api/v1/recipe/search_history/',
+    '/api/v1/recipe/cart/aggregated/',
+    '/api/v1/chat/chat_history/',
+    '/api/v1/chat/chat_history/ai_messages/',
+    '/api/v1/profiles/me/',
+]
+
+
+def get_capturing_runner_class(collector, on_finish, using):
+    """Тест-раннер проекта, который перехватывает запросы между созданием и удалением тестовой БД."""
+    base = get_runner(settings)
+    if not issubclass(base, DiscoverRunner):
+        base = DiscoverRunner
+
+    class CapturingRunner(base):
+        def setup_databases(self, **kwargs):
+            old_config = super().setup_databases(**kwargs)
+            # Запросы миграций тестовой БД в отчет не попадают
+            connections[using].execute_wrappers.append(collector)
+            return old_config
+
+        def teardown_databases(self, old_config, **kwargs):
+            connections[using].execute_wrappers.remove(collector)
+            on_finish()
+            super().teardown_databases(old_config, **kwargs)
+
+    return CapturingRunner
+
+
+class Command(BaseCommand):
+    help = "Runs a workload with query capture and reports full scans and filesorts with suggested indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('test_labels', nargs='*',
+                            help="Test labels for the 'tests' workload (default: whole suite)")
+        parser.add_argument('--workload', choices=['tests', 'requests'], default='tests',
+                            help="'tests' runs the test suite, 'requests' replays GET requests "
+                                 "against the current database")
+        parser.add_argument('--url', action='append', dest='urls',
+                            help="URL for the 'requests' workload (can be repeated)")
+        parser.add_argument('--user', help="Username to authenticate 'requests' workload as")
+        parser.add_argument('--repeat', type=int, default=1,
+                            help="How many times to replay each URL")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--min-count', type=int, default=1,
+                            help="Ignore query shapes executed fewer times than this")
+
+    def handle(self, *args, **options):
+        self.options = options
+        using = options['database']
+        collector = QueryCollector()
+
+        if options['workload'] == 'tests':
+            runner_class = get_capturing_runner_class(
+                collector, lambda: self.report(collector, using), using
+            )
+            runner = runner_class(verbosity=0, interactive=False)
+            runner.run_tests(options['test_labels'])
+        else:
+            with capture_queries(using, collector):
+                self.replay_requests(options)
+            self.report(collector, using)
+
+    def replay_requests(self, options):
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        if options['user']:
+            user = get_user_model().objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"User {options['user']!r} does not exist")
+            client.force_authenticate(user=user)
+        for url in options['urls'] or DEFAULT_URLS:
+            for _ in range(options['repeat']):
+                client.get(url)
+
+    def report(self, collector, using):
+        connection = connections[using]
+        shapes = [q for q in collector.most_expensive() if q.count >= self.options['min_count']]
+        findings = analyze(connection, shapes)
+
+        self.stdout.write(
+            f"Captured {collector.total_count} queries in {len(collector.shapes)} shapes "
+            f"on {connection.vendor}; {len(findings)} plan problems found\n"
+        )
+        suggestions = {}
+        for finding in findings:
+            query = finding.query
+            self.stdout.write(self.style.WARNING(f"[{finding.kind}] {finding.table}") +
+                              f" x{query.count}, {query.total_time * 1000:.1f} ms total")
+            self.stdout.write(f"    {query.shape[:300]}")
+            if finding.suggestion:
+                model, fields = finding.suggestion
+                line = format_index(model, fields)
+                suggestions[line] = suggestions.get(line, 0) + query.count
+                self.stdout.write(self.style.SUCCESS(f"    suggest: {line}"))
+
+        if suggestions:
+            self.stdout.write("\nSuggested indexes (by number of affected queries):")
+            for line, count in sorted(suggestions.items(), key=lambda item: item[1], reverse=True):
+                self.stdout.write(f"  {count:>6}  {line}")
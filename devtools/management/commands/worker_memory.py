@@ -0,0 +1,43 @@
+"""
+manage.py worker_memory — память мастера Gunicorn и его воркеров.
+
+Печатает RSS, PSS, общую и приватную память каждого процесса. При
+preload_app большая часть памяти воркера остается общей с мастером, и
+суммарный PSS заметно меньше суммы RSS.
+
+Пример:
+    python manage.py worker_memory $(cat /run/gunicorn.pid)
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from devtools.process import get_children, read_memory
+
+
+def format_kb(value):
+    return '-' if value is None else f'{value / 1024:.1f}'
+
+
+class Command(BaseCommand):
+    help = "Reports RSS/PSS/shared/private memory of a Gunicorn master and its workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('pid', type=int, help="PID of the Gunicorn master process")
+
+    def handle(self, *args, **options):
+        master = options['pid']
+        if read_memory(master) is None:
+            raise CommandError(f"Process {master} does not exist")
+
+        self.stdout.write(f"{'process':<16} {'rss MB':>9} {'pss MB':>9} {'shared MB':>10} {'private MB':>11}")
+        total_rss = total_pss = 0
+        for role, pid in [('master', master)] + [('worker', child) for child in get_children(master)]:
+            memory = read_memory(pid)
+            if memory is None:
+                continue
+            total_rss += memory['rss']
+            total_pss += memory['pss'] or 0
+            self.stdout.write(
+                f"{role + ' ' + str(pid):<16} {format_kb(memory['rss']):>9} {format_kb(memory['pss']):>9} "
+                f"{format_kb(memory['shared']):>10} {format_kb(memory['private']):>11}"
+            )
+        self.stdout.write(f"{'total':<16} {format_kb(total_rss):>9} {format_kb(total_pss):>9}")
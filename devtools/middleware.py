@@ -0,0 +1,194 @@
+"""
+Поиск N+1 и медленных запросов во время работы приложения (dev/staging).
+
+QueryInspectorMiddleware собирает все SQL-запросы запроса через
+devtools/queries.py, группирует их по форме и для каждой формы запоминает
+место в коде проекта, откуда она выполнялась. После ответа:
+
+- формы SELECT, повторенные не меньше QUERY_INSPECTOR_N_PLUS_ONE раз,
+  считаются N+1;
+- запросы дольше QUERY_INSPECTOR_SLOW_MS миллисекунд — медленными;
+- если число запросов больше бюджета endpoint (QUERY_BUDGETS по имени
+  маршрута или QUERY_BUDGET_DEFAULT), бюджет считается превышенным.
+
+При найденных проблемах в логгер devtools.queries пишется JSON-отчет
+(он же в record.query_report), число запросов отдается в заголовке
+X-Query-Count. С QUERY_INSPECTOR_RAISE=True превышение бюджета поднимает
+QueryBudgetExceeded — тестовый клиент пробрасывает исключение, и тест
+падает:
+
+    @override_settings(QUERY_INSPECTOR_ENABLED=True, QUERY_INSPECTOR_RAISE=True,
+                       QUERY_BUDGETS={'recipe_viewset-list': 10})
+
+Потоковые ответы (StreamingHttpResponse: выгрузка профиля, SSE) отдают
+тело уже после middleware, и запросы генератора в отчет не попадают.
+Поэтому для них бюджет не проверяется и X-Query-Count не ставится, а в
+отчете stream=True и queries — только запросы до начала тела.
+
+Без QUERY_INSPECTOR_ENABLED middleware отключается при старте и ничего не
+стоит. Обертка выполнения ставится на каждое соединение один раз, а
+коллектор текущего запроса передается через ContextVar, поэтому запросы
+async view, выполняемые в потоках sync_to_async, тоже учитываются.
+"""
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .queries import SKIPPED_FILES, QueryCollector
+
+SKIPPED_FILES.add(__file__)
+
+logger = logging.getLogger('devtools.queries')
+
+_current_collector = ContextVar('query_inspector_collector', default=None)
+
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Endpoint выполнил больше запросов, чем разрешает его бюджет."""
+
+    def __init__(self, report):
+        self.report = report
+        super().__init__(
+            f"{report['method']} {report['path']} ({report['endpoint']}) executed "
+            f"{report['queries']} queries, budget is {report['budget']}"
+        )
+
+
+class RequestQueryCollector(QueryCollector):
+    """QueryCollector с местами вызова и отдельным списком медленных запросов."""
+
+    def __init__(self, slow_seconds):
+        super().__init__(track_origins=True)
+        self.slow_seconds = slow_seconds
+        self.slow = []
+
+    def record(self, sql, params, duration, origin=None):
+        query = super().record(sql, params, duration, origin)
+        if duration >= self.slow_seconds:
+            self.slow.append({'sql': sql, 'time_ms': round(duration * 1000, 2), 'origin': origin})
+        return query
+
+
+def dispatch_to_collector(execute, sql, params, many, context):
+    """execute_wrapper всех соединений: передает запрос коллектору текущего HTTP-запроса, если он есть."""
+    collector = _current_collector.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    return collector(execute, sql, params, many, context)
+
+
+def install_wrapper(connection, **kwargs):
+    if dispatch_to_collector not in connection.execute_wrappers:
+        connection.execute_wrappers.append(dispatch_to_collector)
+
+
+def install_wrappers():
+    """Ставит обертку на соединения текущего потока, открытые до подключения сигнала."""
+    for connection in connections.all(initialized_only=True):
+        install_wrapper(connection)
+
+
+def get_budget(endpoint):
+    budgets = get_setting('QUERY_BUDGETS', {})
+    return budgets.get(endpoint, get_setting('QUERY_BUDGET_DEFAULT', None))
+
+
+def build_report(request, response, collector, elapsed):
+    match = getattr(request, 'resolver_match', None)
+    endpoint = match.view_name if match else None
+    threshold = get_setting('QUERY_INSPECTOR_N_PLUS_ONE', 5)
+    budget = get_budget(endpoint)
+    stream = response.streaming
+    return {
+        'method': request.method,
+        'path': request.path,
+        'endpoint': endpoint,
+        'status': response.status_code,
+        'queries': collector.total_count,
+        'db_time_ms': round(sum(query.total_time for query in collector.shapes.values()) * 1000, 2),
+        'request_time_ms': round(elapsed * 1000, 2),
+        'stream': stream,
+        'budget': budget,
+        'over_budget': not stream and budget is not None and collector.total_count > budget,
+        'n_plus_one': [
+            {
+                'shape': query.shape,
+                'count': query.count,
+                'time_ms': round(query.total_time * 1000, 2),
+                'origins': [{'origin': origin, 'count': count} for origin, count in query.origins.most_common(3)],
+            }
+            for query in collector.most_expensive()
+            if query.is_select and query.count >= threshold
+        ],
+        'slow': collector.slow,
+    }
+
+
+class QueryInspectorMiddleware:
+    """
+    Отчет о запросах к БД на каждый HTTP-запрос (см. описание модуля).
+
+    Ставится в начало MIDDLEWARE, чтобы учитывать и запросы остальных
+    middleware (сессии, аутентификация).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_setting('QUERY_INSPECTOR_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        connection_created.connect(install_wrapper, dispatch_uid='query_inspector')
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        collector, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_collector.reset(token)
+        return self.finish(request, response, collector, started)
+
+    async def __acall__(self, request):
+        # Асинхронный ORM выполняет запросы в потоке sync_to_async со своими соединениями
+        await sync_to_async(install_wrappers)()
+        collector, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_collector.reset(token)
+        return self.finish(request, response, collector, started)
+
+    def start(self):
+        install_wrappers()
+        collector = RequestQueryCollector(get_setting('QUERY_INSPECTOR_SLOW_MS', 100) / 1000)
+        return collector, _current_collector.set(collector), time.perf_counter()
+
+    def finish(self, request, response, collector, started):
+        report = build_report(request, response, collector, time.perf_counter() - started)
+        if not report['stream']:
+            response['X-Query-Count'] = str(report['queries'])
+        if report['over_budget'] or report['n_plus_one'] or report['slow']:
+            logger.warning("Query report: %s", json.dumps(report, ensure_ascii=False),
+                           extra={'query_report': report})
+            if report['over_budget'] and get_setting('QUERY_INSPECTOR_RAISE', False):
+                raise QueryBudgetExceeded(report)
+        else:
+            logger.debug("Query report: %s", json.dumps(report, ensure_ascii=False),
+                         extra={'query_report': report})
+        return response
@@ -0,0 +1,67 @@
+"""
+Память процессов по данным /proc (Linux).
+
+RSS учитывает общие с мастером страницы в каждом воркере, поэтому для
+оценки выигрыша от preload_app смотрят на PSS (общие страницы делятся
+между процессами) и на Private — память, которую воркер держит сам.
+"""
+import os
+
+_SMAPS_FIELDS = {
+    'Rss': 'rss',
+    'Pss': 'pss',
+    'Shared_Clean': 'shared_clean',
+    'Shared_Dirty': 'shared_dirty',
+    'Private_Clean': 'private_clean',
+    'Private_Dirty': 'private_dirty',
+}
+
+
+def read_memory(pid):
+    """
+    Возвращает словарь с rss, pss, shared и private в килобайтах.
+
+    Если smaps_rollup недоступен, заполняется только rss из /proc/<pid>/status.
+    Для отсутствующего процесса возвращает None.
+    """
+    values = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as smaps:
+            for line in smaps:
+                key, _, rest = line.partition(':')
+                if key in _SMAPS_FIELDS:
+                    values[_SMAPS_FIELDS[key]] = int(rest.split()[0])
+    except FileNotFoundError:
+        if not os.path.exists(f'/proc/{pid}'):
+            return None
+    except PermissionError:
+        pass
+
+    if 'rss' not in values:
+        try:
+            with open(f'/proc/{pid}/status') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        values['rss'] = int(line.split()[1])
+        except FileNotFoundError:
+            return None
+
+    memory = {'rss': values.get('rss', 0), 'pss': values.get('pss')}
+    if 'shared_clean' in values:
+        memory['shared'] = values['shared_clean'] + values.get('shared_dirty', 0)
+        memory['private'] = values.get('private_clean', 0) + values.get('private_dirty', 0)
+    else:
+        memory['shared'] = memory['private'] = None
+    return memory
+
+
+def get_children(pid):
+    """id дочерних процессов (воркеров Gunicorn для pid мастера)."""
+    children = []
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as file:
+                children += [int(child) for child in file.read().split()]
+    except FileNotFoundError:
+        pass
+    return children
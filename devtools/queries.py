@@ -0,0 +1,125 @@
+"""
+Перехват SQL-запросов и группировка их по форме (shape).
+
+Форма запроса — SQL, в котором все литералы и параметры заменены на ?,
+а списки IN (...) свернуты, поэтому запросы, различающиеся только
+значениями (типичный N+1), попадают в одну группу.
+
+С track_origins=True для каждого запроса запоминается место в коде
+проекта, откуда он выполнен (ближайший к запросу кадр стека вне Django и
+сторонних пакетов, например метод сериализатора), — так видно, какой
+to_representation или get_* порождает повторяющиеся запросы.
+"""
+import os
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS
+
+_IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'(?<![\w."])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+_SPACES_RE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Возвращает форму запроса: без литералов, параметров и длины IN-списков."""
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    return _SPACES_RE.sub(' ', sql).strip()
+
+
+# Файлы, которые сами только перехватывают запросы и не могут быть их источником
+SKIPPED_FILES = {__file__}
+
+
+def _is_project_file(filename, root):
+    return filename.startswith(root) and 'site-packages' not in filename and filename not in SKIPPED_FILES
+
+
+def find_origin(depth=1):
+    """Ближайший к месту вызова кадр кода проекта: 'recipe/serializers.py:42 in get_ingredients'."""
+    root = os.path.join(str(settings.BASE_DIR), '')
+    frame = sys._getframe(depth)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if _is_project_file(filename, root):
+            return f'{os.path.relpath(filename, root)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+class QueryShape:
+    """Статистика по одной форме запроса."""
+
+    def __init__(self, shape, sql, params):
+        self.shape = shape
+        # Первый встреченный экземпляр нужен, чтобы выполнить для формы EXPLAIN
+        self.sql = sql
+        self.params = params
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.origins = Counter()
+
+    def add(self, duration, origin=None):
+        self.count += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        if origin is not None:
+            self.origins[origin] += 1
+
+    @property
+    def is_select(self):
+        return self.shape.lstrip('(').upper().startswith('SELECT')
+
+
+class QueryCollector:
+    """
+    execute_wrapper, который копит статистику по формам запросов.
+
+    Используется как контекстный менеджер через capture_queries() или
+    напрямую через connection.execute_wrapper(collector).
+    """
+
+    def __init__(self, track_origins=False):
+        self.shapes = {}
+        self.track_origins = track_origins
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            origin = find_origin() if self.track_origins else None
+            self.record(sql, params, time.perf_counter() - start, origin)
+
+    def record(self, sql, params, duration, origin=None):
+        shape = normalize_sql(sql)
+        query = self.shapes.get(shape)
+        if query is None:
+            query = self.shapes[shape] = QueryShape(shape, sql, params)
+        query.add(duration, origin)
+        return query
+
+    @property
+    def total_count(self):
+        return sum(query.count for query in self.shapes.values())
+
+    def most_expensive(self):
+        return sorted(self.shapes.values(), key=lambda q: q.total_time, reverse=True)
+
+
+@contextmanager
+def capture_queries(using=DEFAULT_DB_ALIAS, collector=None):
+    """Собирает все запросы к базе using внутри блока with."""
+    collector = collector or QueryCollector()
+    with connections[using].execute_wrapper(collector):
+        yield collector
@@ -0,0 +1,210 @@
+import os
+import unittest
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import F, Sum
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from baseAPI.renderers import ORJSONRenderer
+from devtools.advisor import suggest_index, is_covered
+from devtools.management.commands.benchmark_json import build_synthetic_recipes
+from devtools.process import read_memory
+from devtools.middleware import QueryBudgetExceeded, RequestQueryCollector
+from devtools.queries import normalize_sql, capture_queries
+from chatAI.models import ChatHistory
+from profiles.models import AuthorStats
+from recipe.models import Recipe, Comment, Like, Ingredient, RecipeIngredient
+from users.models import Followers
+from recipe.serializers import RecipeSerializer
+
+User = get_user_model()
+
+
+class NormalizeSqlTests(TestCase):
+    def test_literals_and_in_lists_are_collapsed(self):
+        """Тест: запросы, отличающиеся только значениями, имеют одну форму"""
+        first = normalize_sql('SELECT * FROM "t" WHERE "t"."id" IN (%s, %s, %s) AND "t"."name" = \'a\' LIMIT 21')
+        second = normalize_sql('SELECT * FROM "t" WHERE "t"."id" IN (%s) AND "t"."name" = \'bb\' LIMIT 5')
+        self.assertEqual(first, second)
+        self.assertEqual(first, 'SELECT * FROM "t" WHERE "t"."id" IN (...) AND "t"."name" = ? LIMIT ?')
+
+    def test_aliases_are_kept(self):
+        """Тест: алиасы таблиц (U0, T3) не считаются литералами"""
+        self.assertIn('U0."user_id"', normalize_sql('SELECT U0."user_id" FROM "recipe_like" U0'))
+
+    def test_capture_groups_repeated_queries(self):
+        """Тест: повторяющиеся запросы группируются в одну форму"""
+        user = User.objects.create_user(username='n_plus_one', password='password')
+        with capture_queries() as collector:
+            for _ in range(3):
+                list(Recipe.objects.filter(author=user))
+        self.assertEqual(collector.total_count, 3)
+        self.assertEqual(len(collector.shapes), 1)
+
+
+class SuggestIndexTests(TestCase):
+    def test_equality_then_ordering(self):
+        """Тест: индекс строится из колонок равенства, затем сортировки"""
+        sql = str(Comment.objects.filter(author_id=1).order_by('-created_at').query)
+        sql = sql.replace('= 1', '= %s')
+        model, fields = suggest_index(sql, 'recipe_comment')
+        self.assertEqual(model, Comment)
+        self.assertEqual(fields, ['author', '-created_at'])
+
+    def test_existing_index_is_not_suggested(self):
+        """Тест: уже существующий индекс не предлагается повторно"""
+        self.assertTrue(is_covered(Recipe, ['author', '-created_at']))
+        self.assertIsNone(suggest_index(
+            'SELECT * FROM "recipe_recipe" WHERE "recipe_recipe"."author_id" = %s '
+            'ORDER BY "recipe_recipe"."created_at" DESC',
+            'recipe_recipe'
+        ))
+
+
+class IndexAdvisorCommandTests(TestCase):
+    def test_requests_workload_report(self):
+        """Тест: команда прогоняет запросы к API и печатает отчет"""
+        user = User.objects.create_user(username='advisor', password='password')
+        Recipe.objects.create(author=user, title='...', description='...', instructions='...',
+                              cooking_time_minutes=1, servings=1)
+        out = StringIO()
+        call_command('index_advisor', workload='requests', user='advisor', stdout=out)
+        self.assertIn('Captured', out.getvalue())
+        self.assertIn('shapes on', out.getvalue())
+
+
+@unittest.skipUnless(os.path.exists('/proc/self/status'), "requires /proc")
+class ProcessMemoryTests(TestCase):
+    def test_read_memory_of_current_process(self):
+        """Тест: память текущего процесса читается из /proc"""
+        memory = read_memory(os.getpid())
+        self.assertGreater(memory['rss'], 0)
+
+    def test_worker_memory_command(self):
+        """Тест: команда печатает память процесса и итог"""
+        out = StringIO()
+        call_command('worker_memory', os.getpid(), stdout=out)
+        self.assertIn(f'master {os.getpid()}', out.getvalue())
+        self.assertIn('total', out.getvalue())
+
+
+class BenchmarkJsonTests(TestCase):
+    def test_orjson_output_matches_drf(self):
+        """Тест: вывод RecipeSerializer через orjson совпадает с JSONRenderer и не экранирует кириллицу"""
+        data = RecipeSerializer(build_synthetic_recipes(3), many=True, context={}).data
+        body = ORJSONRenderer().render(data)
+        self.assertEqual(body, JSONRenderer().render(data))
+        self.assertIn('Рецепт'.encode(), body)
+
+    def test_command(self):
+        """Тест: микробенчмарк печатает сравнение рендеринга и парсинга"""
+        out = StringIO()
+        call_command('benchmark_json', recipes=5, iterations=3, stdout=out)
+        self.assertIn('faster', out.getvalue())
+
+
+
+class GenerateDatasetTests(TestCase):
+    def generate(self, **options):
+        out = StringIO()
+        call_command('generate_dataset', preset='tiny', seed=7, until='2026-01-01', batch_size=50,
+                     stdout=out, **options)
+        return out.getvalue()
+
+    def test_generates_consistent_dataset(self):
+        """Тест: заданные объемы, точные счетчики и лайки не раньше публикации рецепта"""
+        output = self.generate(users=30, recipes=100, likes=500, follows=80)
+        self.assertIn('Generated', output)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Recipe.objects.count(), 100)
+        self.assertGreater(Like.objects.count(), 400)
+        self.assertEqual(ChatHistory.objects.count(), 400)
+        self.assertTrue(RecipeIngredient.objects.exists())
+        self.assertEqual(Recipe.objects.aggregate(total=Sum('likes_count'))['total'], Like.objects.count())
+        counters = User.objects.aggregate(followers=Sum('followers_count'), following=Sum('following_count'))
+        self.assertEqual(counters, {'followers': Followers.objects.count(), 'following': Followers.objects.count()})
+        self.assertFalse(Like.objects.filter(created_at__lt=F('recipe__created_at')).exists())
+        stats = AuthorStats.objects.aggregate(recipes=Sum('recipes_count'), likes=Sum('likes_received'))
+        self.assertEqual(stats, {'recipes': 100, 'likes': Like.objects.count()})
+        self.assertFalse(Recipe.objects.filter(created_at__year__gte=2026).exists())
+
+    def test_same_seed_gives_same_data(self):
+        """Тест: повторный запуск с тем же seed дает те же рецепты и лайки"""
+        def snapshot(first_recipe_id):
+            recipes = list(Recipe.objects.filter(id__gte=first_recipe_id).order_by('id')
+                           .values_list('title', 'created_at', 'likes_count'))
+            likes = list(Like.objects.filter(recipe_id__gte=first_recipe_id).order_by('id')
+                         .values_list('recipe_id', 'created_at'))
+            return recipes, [(recipe_id - first_recipe_id, created_at) for recipe_id, created_at in likes]
+
+        self.generate(users=20, recipes=30, likes=100)
+        second_start = Recipe.objects.count() + 1
+        first = snapshot(1)
+        self.generate(users=20, recipes=30, likes=100)
+        self.assertEqual(snapshot(second_start), first)
+
+
+@override_settings(QUERY_INSPECTOR_ENABLED=True, QUERY_INSPECTOR_N_PLUS_ONE=3)
+class QueryInspectorTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(username='inspected', password='password')
+        for i in range(4):
+            recipe = Recipe.objects.create(author=author, title=f'Рецепт {i}', description='...',
+                                           instructions='...', cooking_time_minutes=10, servings=1)
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=Ingredient.objects.create(name=f'И{i}'),
+                                            count=1, visible_type_of_count='шт')
+
+    def test_collector_attributes_queries_to_project_code(self):
+        """Тест: повторяющийся запрос приписывается строке проекта, которая его выполнила"""
+        with capture_queries(collector=RequestQueryCollector(slow_seconds=0)) as collector:
+            for recipe in Recipe.objects.all():
+                list(recipe.recipeingredient_set.all())
+        query = max(collector.shapes.values(), key=lambda q: q.count)
+        self.assertEqual(query.count, 4)
+        [(origin, count)] = query.origins.items()
+        self.assertRegex(origin, r'^devtools/tests\.py:\d+ in test_collector_attributes_queries_to_project_code$')
+        self.assertEqual(count, 4)
+        self.assertEqual(len(collector.slow), 5)
+
+    def test_request_report_is_logged(self):
+        """Тест: отчет о запросах пишется в лог, число запросов — в заголовок"""
+        with self.assertLogs('devtools.queries', 'DEBUG') as logs:
+            response = self.client.get('/api/v1/recipe/recipe/')
+        report = logs.records[0].query_report
+        self.assertEqual(report['endpoint'], 'recipe_viewset-list')
+        self.assertEqual(int(response['X-Query-Count']), report['queries'])
+        for problem in report['n_plus_one']:
+            self.assertGreaterEqual(problem['count'], 3)
+            self.assertTrue(problem['origins'])
+
+    @override_settings(QUERY_INSPECTOR_RAISE=True, QUERY_BUDGETS={'recipe_viewset-list': 2})
+    def test_budget_exceeded_fails_request(self):
+        """Тест: превышение бюджета endpoint с QUERY_INSPECTOR_RAISE поднимает исключение"""
+        with self.assertLogs('devtools.queries', 'WARNING'):
+            with self.assertRaises(QueryBudgetExceeded) as context:
+                self.client.get('/api/v1/recipe/recipe/')
+        self.assertTrue(context.exception.report['over_budget'])
+        self.assertEqual(context.exception.report['budget'], 2)
+
+    @override_settings(QUERY_INSPECTOR_RAISE=True, QUERY_BUDGETS={'profile-export': 0})
+    def test_streaming_response_is_not_budgeted(self):
+        """Тест: у потокового ответа неполное число запросов не проверяется бюджетом и не отдается в заголовке"""
+        token = RefreshToken.for_user(User.objects.get(username='inspected')).access_token
+        with self.assertLogs('devtools.queries', 'DEBUG') as logs:
+            response = self.client.get('/api/v1/profiles/me/export/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        b''.join(response.streaming_content)
+        report = logs.records[0].query_report
+        self.assertTrue(report['stream'])
+        self.assertFalse(report['over_budget'])
+        self.assertNotIn('X-Query-Count', response)
+
+    async def test_async_view_queries_are_counted(self):
+        """Тест: запросы async view из потоков sync_to_async тоже учитываются"""
+        response = await self.async_client.get('/api/v1/async/recipe/recipe/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response['X-Query-Count']), 0)
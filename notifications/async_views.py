@@ -0,0 +1,109 @@
+"""
+SSE-поток уведомлений (только под ASGI).
+
+Соединение не держит поток воркера: генератор ждет asyncio.Event из
+notifications/hub.py и после сигнала дочитывает из БД уведомления с id
+больше последнего отправленного. id уведомления передается как id
+события, поэтому при переподключении клиент (EventSource) присылает
+Last-Event-ID и получает пропущенное. Без него поток начинается с
+текущего момента; вместо заголовка можно передать ?last_id=.
+
+Раз в NOTIFICATIONS_KEEPALIVE секунд отправляется комментарий, чтобы
+прокси не закрывали соединение, через NOTIFICATIONS_STREAM_TIMEOUT секунд
+поток закрывается и клиент переподключается сам (retry).
+
+Под WSGI (gunicorn -c python:baseAPI.gunicorn_config) асинхронный view
+выполняется через async_to_sync и держал бы поток воркера все время
+соединения, поэтому там поток отвечает 501. Для SSE нужен ASGI-сервер
+(baseAPI.asgi:application), например uvicorn за тем же nginx.
+"""
+import asyncio
+import time
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+
+from baseAPI.async_api import (
+    aauthenticate, api_response, authentication_failed_response, not_authenticated_response,
+)
+from baseAPI.renderers import dumps
+from .hub import hub
+from .models import Notification
+from .serializers import NotificationSerializer
+
+BATCH_SIZE = 100
+RETRY_MS = 3000
+
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def parse_last_id(request):
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_id')
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def format_event(notification):
+    data = dumps(NotificationSerializer(notification).data).decode()
+    return f'id: {notification.id}\nevent: notification\ndata: {data}\n\n'
+
+
+async def stream_notifications(user, last_id):
+    keepalive = get_setting('NOTIFICATIONS_KEEPALIVE', 15)
+    deadline = time.monotonic() + get_setting('NOTIFICATIONS_STREAM_TIMEOUT', 300)
+    yield f'retry: {RETRY_MS}\n\n'
+    async with hub.subscribe(user.id) as event:
+        if last_id is None:
+            # Подписка уже оформлена, поэтому уведомления после этого запроса не потеряются
+            last_id = await (Notification.objects.filter(recipient=user).order_by('-id')
+                             .values_list('id', flat=True).afirst()) or 0
+        while True:
+            event.clear()
+            while True:
+                batch = [
+                    notification async for notification in
+                    Notification.objects.filter(recipient=user, id__gt=last_id)
+                    .select_related('actor').order_by('id')[:BATCH_SIZE]
+                ]
+                for notification in batch:
+                    yield format_event(notification)
+                    last_id = notification.id
+                if len(batch) < BATCH_SIZE:
+                    break
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(keepalive, remaining))
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+
+
+@never_cache
+@require_GET
+async def notification_stream(request):
+    """Поток новых уведомлений текущего пользователя (text/event-stream)"""
+    if not isinstance(request, ASGIRequest):
+        return api_response({"detail": "Notification stream requires an ASGI server."}, status=501)
+    try:
+        user = await aauthenticate(request)
+    except AuthenticationFailed as exc:
+        return authentication_failed_response(exc)
+    if not user.is_authenticated:
+        return not_authenticated_response()
+
+    response = StreamingHttpResponse(stream_notifications(user, parse_last_id(request)),
+                                     content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,6 @@
+from baseAPI.checks import check_shared_cache
+
+
+def check_notifications_cache(app_configs=None, **kwargs):
+    """Сигналы уведомлений (notifications/hub.py) должны доходить до всех воркеров."""
+    return check_shared_cache('NOTIFICATIONS_CACHE', 'shared', 'notifications.E001')
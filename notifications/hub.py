@@ -0,0 +1,122 @@
+"""
+Доставка уведомлений подключенным клиентам (fan-out между воркерами).
+
+Само уведомление хранится в БД, через pub/sub передается только сигнал
+«у пользователя есть новое»: SSE-соединение (notifications/async_views.py)
+после сигнала дочитывает из БД уведомления с id больше последнего
+отправленного. Потерянный сигнал поэтому не теряет уведомлений — они
+уйдут со следующим сигналом или после переподключения по Last-Event-ID.
+
+Сигналы идут через счетчики в общем кэше NOTIFICATIONS_CACHE (по
+умолчанию shared — Redis через django-redis при заданном REDIS_URL):
+
+- publish() атомарно увеличивает счетчик пользователя в кэше и сразу будит
+  соединения этого пользователя в текущем процессе;
+- в каждом воркере одна задача раз в NOTIFICATIONS_POLL_INTERVAL секунд
+  читает счетчики всех подключенных к нему пользователей одним get_many
+  и будит соединения тех, у кого счетчик изменился.
+
+Так публикация в одном воркере доходит до соединений в остальных с
+задержкой не больше интервала опроса, а нагрузка на кэш не зависит от
+числа соединений пользователя. С кэшем процесса публикации из других
+воркеров не доходят — manage.py check --deploy сообщает об этом ошибкой
+notifications.E001 (см. baseAPI/checks.py).
+"""
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django_redis.cache import RedisCache
+
+KEY_PREFIX = 'notifications:seq'
+
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_cache():
+    return caches[get_setting('NOTIFICATIONS_CACHE', 'shared')]
+
+
+def increment(cache, key):
+    """Атомарно увеличивает счетчик без срока жизни, создавая отсутствующий."""
+    if isinstance(cache, RedisCache):
+        # Один INCRBY: отсутствующий ключ считается нулем
+        return cache.incr(key, ignore_key_check=True)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, timeout=None):
+            return 1
+        # Ключ создал параллельный publish
+        return cache.incr(key)
+
+
+def sequence_key(user_id):
+    return f'{KEY_PREFIX}:{user_id}'
+
+
+class NotificationHub:
+    def __init__(self):
+        # user_id -> события asyncio открытых соединений пользователя
+        self.waiters = defaultdict(set)
+        self.sequences = {}
+        self.loop = None
+        self.poller = None
+
+    def publish(self, user_ids):
+        """Сообщает о новых уведомлениях пользователей; можно вызывать из синхронного кода."""
+        cache = get_cache()
+        for user_id in set(user_ids):
+            increment(cache, sequence_key(user_id))
+        self.wake(user_ids)
+
+    def wake(self, user_ids):
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        for user_id in set(user_ids):
+            for event in list(self.waiters.get(user_id, ())):
+                # publish вызывается из потоков синхронных view
+                loop.call_soon_threadsafe(event.set)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id):
+        """asyncio.Event, который выставляется при новых уведомлениях пользователя."""
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # Новый цикл событий (перезапуск сервера, тесты): старый опрос не работает
+            self.loop, self.poller = loop, None
+        event = asyncio.Event()
+        if user_id not in self.waiters:
+            self.sequences[user_id] = await get_cache().aget(sequence_key(user_id))
+        self.waiters[user_id].add(event)
+        if self.poller is None or self.poller.done():
+            self.poller = loop.create_task(self.poll())
+        try:
+            yield event
+        finally:
+            self.waiters[user_id].discard(event)
+            if not self.waiters[user_id]:
+                del self.waiters[user_id]
+                self.sequences.pop(user_id, None)
+
+    async def poll(self):
+        """Следит за счетчиками подключенных пользователей, пока есть соединения."""
+        interval = get_setting('NOTIFICATIONS_POLL_INTERVAL', 1)
+        while self.waiters:
+            await asyncio.sleep(interval)
+            keys = {sequence_key(user_id): user_id for user_id in list(self.waiters)}
+            values = await get_cache().aget_many(keys)
+            for key, user_id in keys.items():
+                value = values.get(key)
+                if user_id in self.waiters and value != self.sequences.get(user_id):
+                    self.sequences[user_id] = value
+                    for event in self.waiters[user_id]:
+                        event.set()
+
+
+hub = NotificationHub()
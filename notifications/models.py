@@ -0,0 +1,31 @@
+from django.db import models
+
+from baseAPI import settings
+
+
+class Notification(models.Model):
+    """
+    Уведомление о лайке, комментарии или подписке (см. notifications/notify.py).
+
+    dedupe_key не дает повторить уведомление о том же лайке или подписке
+    (снять и снова поставить лайк); у комментариев он пустой (NULL).
+    """
+    LIKE = 'like'
+    COMMENT = 'comment'
+    FOLLOW = 'follow'
+    VERBS = ((LIKE, 'like'), (COMMENT, 'comment'), (FOLLOW, 'follow'))
+
+    recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    verb = models.CharField(max_length=10, choices=VERBS)
+    recipe = models.ForeignKey('recipe.Recipe', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    comment = models.ForeignKey('recipe.Comment', on_delete=models.CASCADE, null=True, blank=True,
+                                related_name='+')
+    dedupe_key = models.CharField(max_length=64, null=True, blank=True, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    is_read = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', 'is_read', '-id'], name='notification_unread_idx'),
+        ]
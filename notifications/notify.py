@@ -0,0 +1,59 @@
+"""
+Создание уведомлений о лайках, комментариях и подписках.
+
+Вызывается из тех же мест, где меняются лайки (recipe/likes.py,
+LikesSerializer), комментарии (CommentsViewSet) и подписки (users/follows.py).
+Уведомления одного действия пишутся одним bulk_create; повторы лайков и
+подписок отсекаются уникальным dedupe_key (ignore_conflicts). О себе
+уведомления не создаются. Сигнал подключенным клиентам отправляется
+после коммита транзакции (см. notifications/hub.py).
+"""
+from django.db import transaction
+
+from recipe.models import Recipe
+from .hub import hub
+from .models import Notification
+
+
+def create_notifications(notifications):
+    if not notifications:
+        return
+    Notification.objects.bulk_create(notifications, ignore_conflicts=True)
+    recipient_ids = {notification.recipient_id for notification in notifications}
+    transaction.on_commit(lambda: hub.publish(recipient_ids))
+
+
+def notify_likes(actor, recipe_ids):
+    """Уведомляет авторов рецептов recipe_ids о лайке actor (один SELECT и один INSERT)."""
+    if not recipe_ids:
+        return
+    authors = (Recipe.objects
+               .filter(pk__in=set(recipe_ids))
+               .exclude(author_id=actor.id)
+               .values_list('id', 'author_id'))
+    create_notifications([
+        Notification(recipient_id=author_id, actor=actor, verb=Notification.LIKE, recipe_id=recipe_id,
+                     dedupe_key=f'like:{actor.id}:{recipe_id}')
+        for recipe_id, author_id in authors
+    ])
+
+
+def notify_comment(comment):
+    """Уведомляет автора рецепта о новом комментарии."""
+    author_id = Recipe.objects.filter(pk=comment.recipe_id).values_list('author_id', flat=True).first()
+    if author_id is None or author_id == comment.author_id:
+        return
+    create_notifications([
+        Notification(recipient_id=author_id, actor_id=comment.author_id, verb=Notification.COMMENT,
+                     recipe_id=comment.recipe_id, comment=comment)
+    ])
+
+
+def notify_follow(actor, author):
+    """Уведомляет автора о новом подписчике."""
+    if actor.id == author.id:
+        return
+    create_notifications([
+        Notification(recipient_id=author.id, actor=actor, verb=Notification.FOLLOW,
+                     dedupe_key=f'follow:{actor.id}:{author.id}')
+    ])
@@ -0,0 +1,29 @@
+from rest_framework import serializers
+
+from .models import Notification
+
+
+class NotificationActorSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    username = serializers.CharField()
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    """Уведомление для списка и SSE-потока; actor загружается через select_related."""
+    actor = NotificationActorSerializer(read_only=True)
+
+    class Meta:
+        model = Notification
+        fields = ('id', 'verb', 'actor', 'recipe', 'comment', 'created_at', 'is_read')
+        read_only_fields = fields
+
+
+class MarkReadSerializer(serializers.Serializer):
+    """Отметить прочитанными уведомления до up_to включительно или из списка ids."""
+    up_to = serializers.IntegerField(required=False)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    def validate(self, attrs):
+        if 'up_to' not in attrs and not attrs.get('ids'):
+            raise serializers.ValidationError("Either up_to or ids is required")
+        return attrs
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from notifications.checks import check_notifications_cache
+from notifications.hub import NotificationHub, get_cache, increment, sequence_key
+from notifications.models import Notification
+from recipe.likes import like_recipes, unlike_recipes
+from recipe.models import Comment, Recipe
+from users.follows import follow
+
+User = get_user_model()
+
+NOTIFICATIONS_URL = reverse('notifications_viewset-list')
+READ_URL = reverse('notifications_viewset-read')
+STREAM_URL = reverse('async-notification-stream')
+
+
+def create_recipe(author, title='Борщ'):
+    return Recipe.objects.create(author=author, title=title, description='...', instructions='...',
+                                 cooking_time_minutes=30, servings=2)
+
+
+class NotificationTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='password1')
+        self.fan = User.objects.create_user(username='fan', password='password1')
+        self.recipe = create_recipe(self.author)
+        self.client.force_authenticate(self.author)
+        get_cache().clear()
+
+    def test_like_notifies_author_once(self):
+        """Тест: лайк создает уведомление автору, повторный лайк после снятия — нет"""
+        with self.captureOnCommitCallbacks(execute=True):
+            like_recipes(self.fan, [self.recipe.id])
+        unlike_recipes(self.fan, [self.recipe.id])
+        like_recipes(self.fan, [self.recipe.id])
+
+        notification = Notification.objects.get()
+        self.assertEqual((notification.recipient, notification.actor, notification.verb, notification.recipe),
+                         (self.author, self.fan, Notification.LIKE, self.recipe))
+        self.assertEqual(get_cache().get(sequence_key(self.author.id)), 1)
+
+    def test_like_endpoint_notifies_author(self):
+        """Тест: лайк через API тоже создает уведомление"""
+        self.client.force_authenticate(self.fan)
+        response = self.client.post(reverse('likes_viewset-list'), {'recipe': self.recipe.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Notification.objects.filter(recipient=self.author, verb=Notification.LIKE).exists())
+
+    def test_no_notification_about_own_actions(self):
+        """Тест: свой лайк и свой комментарий уведомлений не создают"""
+        like_recipes(self.author, [self.recipe.id])
+        response = self.client.post(reverse('comments_viewset-list'),
+                                    {'recipe': self.recipe.id, 'comment_text': 'Мой'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_comment_and_follow_notify(self):
+        """Тест: комментарий и подписка создают уведомления автору"""
+        self.client.force_authenticate(self.fan)
+        response = self.client.post(reverse('comments_viewset-list'),
+                                    {'recipe': self.recipe.id, 'comment_text': 'Вкусно'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        follow(self.fan, self.author)
+        follow(self.fan, self.author)
+
+        verbs = list(Notification.objects.filter(recipient=self.author).order_by('id').values_list('verb', flat=True))
+        self.assertEqual(verbs, [Notification.COMMENT, Notification.FOLLOW])
+        self.assertEqual(Notification.objects.get(verb=Notification.COMMENT).comment, Comment.objects.get())
+
+    def test_list_unread_and_mark_read(self):
+        """Тест: список непрочитанных, отметка прочитанными до up_to и по ids"""
+        other = create_recipe(self.author, 'Щи')
+        third = create_recipe(self.author, 'Уха')
+        like_recipes(self.fan, [self.recipe.id, other.id, third.id])
+        ids = list(Notification.objects.order_by('id').values_list('id', flat=True))
+
+        response = self.client.get(NOTIFICATIONS_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['results']], ids[::-1])
+        self.assertEqual(response.data['results'][0]['actor'], {'id': self.fan.id, 'username': 'fan'})
+
+        response = self.client.post(READ_URL, {'up_to': ids[1]}, format='json')
+        self.assertEqual(response.data, {'updated': 2})
+        response = self.client.post(READ_URL, {'ids': [ids[2]]}, format='json')
+        self.assertEqual(response.data, {'updated': 1})
+
+        self.assertEqual(self.client.get(NOTIFICATIONS_URL).data['results'], [])
+        self.assertEqual(len(self.client.get(NOTIFICATIONS_URL, {'all': 1}).data['results']), 3)
+
+    def test_mark_read_requires_ids_and_own_notifications(self):
+        """Тест: без up_to и ids — 400, чужие уведомления не отмечаются"""
+        like_recipes(self.fan, [self.recipe.id])
+        self.assertEqual(self.client.post(READ_URL, {}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(self.fan)
+        response = self.client.post(READ_URL, {'up_to': 10 ** 9}, format='json')
+        self.assertEqual(response.data, {'updated': 0})
+
+
+class NotificationHubTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+
+    def test_increment_creates_missing_counter(self):
+        """Тест: счетчик создается первым увеличением и не теряет следующих"""
+        cache = get_cache()
+        self.assertEqual(increment(cache, 'notifications:test'), 1)
+        self.assertEqual(increment(cache, 'notifications:test'), 2)
+
+    def test_deploy_check_requires_shared_cache(self):
+        """Тест: check --deploy требует общий для воркеров кэш уведомлений"""
+        redis = {'BACKEND': 'django_redis.cache.RedisCache', 'LOCATION': 'redis://localhost:6379/1'}
+        locmem = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        with self.settings(CACHES={'default': locmem, 'shared': redis}):
+            self.assertEqual(check_notifications_cache(), [])
+        with self.settings(CACHES={'default': locmem, 'shared': locmem}):
+            self.assertEqual([error.id for error in check_notifications_cache()], ['notifications.E001'])
+
+    async def test_publish_wakes_subscriber(self):
+        """Тест: publish из другого потока будит соединение пользователя, но не чужое"""
+        hub = NotificationHub()
+        async with hub.subscribe(1) as event, hub.subscribe(2) as other:
+            thread = threading.Thread(target=hub.publish, args=([1],))
+            thread.start()
+            await asyncio.wait_for(event.wait(), timeout=1)
+            thread.join()
+            self.assertFalse(other.is_set())
+        self.assertEqual(dict(hub.waiters), {})
+
+    @override_settings(NOTIFICATIONS_POLL_INTERVAL=0.01)
+    async def test_poll_picks_up_other_workers(self):
+        """Тест: изменение счетчика в кэше другим воркером будит соединение через опрос"""
+        hub = NotificationHub()
+        async with hub.subscribe(3) as event:
+            # Другой воркер: свой hub, без подключенных соединений
+            await sync_to_async(NotificationHub().publish)([3])
+            await asyncio.wait_for(event.wait(), timeout=1)
+
+
+@override_settings(NOTIFICATIONS_KEEPALIVE=0.05, NOTIFICATIONS_STREAM_TIMEOUT=0.2)
+class NotificationStreamTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='password1')
+        self.fan = User.objects.create_user(username='fan', password='password1')
+        self.recipe = create_recipe(self.author)
+        like_recipes(self.fan, [self.recipe.id])
+        self.notification = Notification.objects.get()
+        self.token = str(RefreshToken.for_user(self.author).access_token)
+
+    async def read_stream(self, **headers):
+        response = await self.async_client.get(STREAM_URL, headers={'Authorization': f'Bearer {self.token}',
+                                                                    **headers})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return ''.join([chunk.decode() async for chunk in response.streaming_content])
+
+    async def test_stream_replays_after_last_event_id(self):
+        """Тест: поток отдает уведомления после Last-Event-ID, keepalive и закрывается по таймауту"""
+        body = await self.read_stream(**{'Last-Event-ID': '0'})
+        self.assertTrue(body.startswith('retry: '))
+        event = body.split('\n\n')[1].split('\n')
+        self.assertEqual(event[:2], [f'id: {self.notification.id}', 'event: notification'])
+        self.assertEqual(json.loads(event[2].removeprefix('data: '))['verb'], 'like')
+        self.assertIn(': keepalive', body)
+
+    async def test_stream_starts_from_now_without_last_event_id(self):
+        """Тест: без Last-Event-ID старые уведомления не повторяются"""
+        body = await self.read_stream()
+        self.assertNotIn('event: notification', body)
+
+    def test_stream_requires_asgi(self):
+        """Тест: под WSGI поток не держит воркер, а отвечает 501"""
+        response = self.client.get(STREAM_URL, headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    async def test_stream_requires_authentication(self):
+        """Тест: без токена поток недоступен"""
+        response = await self.async_client.get(STREAM_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
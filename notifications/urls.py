@@ -0,0 +1,13 @@
+from django.urls import path
+from rest_framework.routers import DefaultRouter
+
+from notifications import async_views, views
+
+router = DefaultRouter()
+
+router.register('notifications', views.NotificationViewSet, basename='notifications_viewset')
+
+# SSE-поток работает только под ASGI
+async_urlpatterns = [
+    path('stream/', async_views.notification_stream, name='async-notification-stream'),
+]
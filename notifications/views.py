@@ -0,0 +1,57 @@
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import never_cache
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .models import Notification
+from .serializers import MarkReadSerializer, NotificationSerializer
+
+
+class NotificationPagination(CursorPagination):
+    page_size = 20
+    ordering = '-id'
+
+
+@method_decorator(never_cache, name='dispatch')
+class NotificationViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Уведомления текущего пользователя.
+
+    По умолчанию возвращает только непрочитанные (индекс
+    notification_unread_idx), с ?all=1 — все. Новые уведомления в реальном
+    времени отдает SSE-поток notifications/async_views.py.
+    """
+    permission_classes = (IsAuthenticated,)
+    serializer_class = NotificationSerializer
+    pagination_class = NotificationPagination
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(recipient=self.request.user).select_related('actor')
+        if self.request.query_params.get('all') not in ('1', 'true'):
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+    @swagger_auto_schema(manual_parameters=[
+        openapi.Parameter('all', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN,
+                          description="Включать прочитанные уведомления")
+    ])
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @swagger_auto_schema(request_body=MarkReadSerializer)
+    @action(detail=False, methods=['post'])
+    def read(self, request):
+        """Отмечает уведомления прочитанными одним UPDATE, возвращает их число"""
+        serializer = MarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        queryset = Notification.objects.filter(recipient=request.user, is_read=False)
+        if 'up_to' in serializer.validated_data:
+            queryset = queryset.filter(id__lte=serializer.validated_data['up_to'])
+        else:
+            queryset = queryset.filter(id__in=serializer.validated_data['ids'])
+        return Response({"updated": queryset.update(is_read=True)}, status=status.HTTP_200_OK)
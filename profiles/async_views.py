@@ -0,0 +1,57 @@
+"""
+Асинхронные endpoints чтения профилей (для запуска под ASGI).
+
+Отдают то же, что ProfileView (GET) и ProfileByUsernameView: рецепты
+профиля вместе с ингредиентами загружаются заранее через prefetch_related,
+статистика автора — через select_related, поэтому ProfileSerializer не
+обращается к БД.
+"""
+from django.contrib.auth import get_user_model
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+
+from baseAPI.async_api import (
+    aauthenticate,
+    api_response,
+    authentication_failed_response,
+    not_authenticated_response,
+)
+from .serializers import ProfileSerializer
+
+
+def get_profile_queryset():
+    return (get_user_model().objects
+            .select_related('stats')
+            .prefetch_related('recipes__recipeingredient_set__ingredient'))
+
+
+@never_cache
+@require_GET
+async def profile_me(request):
+    """Профиль текущего пользователя"""
+    try:
+        user = await aauthenticate(request)
+    except AuthenticationFailed as exc:
+        return authentication_failed_response(exc)
+    if not user.is_authenticated:
+        return not_authenticated_response()
+
+    profile = await get_profile_queryset().aget(pk=user.pk)
+    return api_response(ProfileSerializer(profile, context={'request': request}).data)
+
+
+@never_cache
+@require_GET
+async def profile_by_username(request, username):
+    """Профиль пользователя по username"""
+    try:
+        await aauthenticate(request)
+    except AuthenticationFailed as exc:
+        return authentication_failed_response(exc)
+
+    try:
+        profile = await get_profile_queryset().aget(username=username)
+    except get_user_model().DoesNotExist:
+        return api_response({"detail": "No CustomUser matches the given query."}, status=404)
+    return api_response(ProfileSerializer(profile, context={'request': request}).data)
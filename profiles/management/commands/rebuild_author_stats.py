@@ -0,0 +1,40 @@
+"""
+manage.py rebuild_author_stats — пересчитывает AuthorStats всех пользователей.
+
+Нужна после массовых загрузок в обход сигналов (import_recipes,
+generate_dataset) и для сверки инкрементальных счетчиков; см.
+profiles/stats.py. Пользователи обрабатываются пачками по id, каждая
+пачка — три запроса в своей транзакции.
+
+Пример:
+    python manage.py rebuild_author_stats --batch-size 2000
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from profiles.stats import refresh_author_stats
+from recipe.export import iter_batches
+
+
+class Command(BaseCommand):
+    help = "Recomputes materialized author statistics (recipes, likes and comments received)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Users recomputed per transaction")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        started = time.perf_counter()
+        users = 0
+        for batch in iter_batches(get_user_model().objects.values('id'), options['batch_size']):
+            with transaction.atomic():
+                refresh_author_stats([row['id'] for row in batch])
+            users += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt stats for {users} users in {time.perf_counter() - started:.1f}s"
+        ))
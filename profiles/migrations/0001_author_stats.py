@@ -0,0 +1,42 @@
+# Generated by Django 5.1.15 on 2026-10-19 03:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_author_stats(apps, schema_editor):
+    AuthorStats = apps.get_model('profiles', 'AuthorStats')
+    Recipe = apps.get_model('recipe', 'Recipe')
+    Comment = apps.get_model('recipe', 'Comment')
+    stats = {}
+    for row in Recipe.objects.order_by().values('author_id').annotate(recipes=Count('id'), likes=Sum('likes_count')):
+        stats[row['author_id']] = AuthorStats(user_id=row['author_id'], recipes_count=row['recipes'],
+                                              likes_received=row['likes'] or 0)
+    for row in Comment.objects.order_by().values('recipe__author_id').annotate(total=Count('id')):
+        stats[row['recipe__author_id']].comments_received = row['total']
+    AuthorStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('recipe', '0013_recommendation'),
+        ('users', '0002_follow_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipes_count', models.PositiveIntegerField(default=0)),
+                ('likes_received', models.PositiveIntegerField(default=0)),
+                ('comments_received', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_author_stats, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,18 @@
 from django.db import models
 
-# Create your models here.
+from baseAPI import settings
+
+
+class AuthorStats(models.Model):
+    """
+    Материализованная статистика автора для профиля (см. profiles/stats.py).
+
+    Обновляется инкрементально сигналами и пересчетом лайков; полностью
+    пересобирается командой rebuild_author_stats. Число подписчиков уже
+    хранится в CustomUser.followers_count.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+                                related_name='stats')
+    recipes_count = models.PositiveIntegerField(default=0)
+    likes_received = models.PositiveIntegerField(default=0)
+    comments_received = models.PositiveIntegerField(default=0)
@@ -3,6 +3,7 @@ from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 
 from recipe.serializers import RecipeWithoutAuthorSerializer
+from .stats import get_author_stats
 
 
 class PasswordChangeSerializer(serializers.Serializer):
@@ -22,12 +23,17 @@ class PasswordChangeSerializer(serializers.Serializer):
 
 class ProfileSerializer(serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField()
+    # Из AuthorStats: профиль загружается с select_related('stats')
+    stats = serializers.SerializerMethodField()
 
     class Meta:
         model = get_user_model()
-        fields = ('id', 'username', 'email', 'bio', 'profile_picture', 'recipes')
-        read_only_fields = ('id', 'username', 'recipes')
+        fields = ('id', 'username', 'email', 'bio', 'profile_picture', 'recipes', 'stats')
+        read_only_fields = ('id', 'username', 'recipes', 'stats')
 
     def get_recipes(self, obj):
         recipes = obj.recipes.all()
         return RecipeWithoutAuthorSerializer(recipes, many=True).data
+
+    def get_stats(self, obj) -> dict:
+        return get_author_stats(obj)
@@ -0,0 +1,49 @@
+"""
+Инкрементальное обновление AuthorStats (см. profiles/stats.py).
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from recipe.likes import refresh_like_counts
+from recipe.models import Comment, Like, Recipe
+from .stats import decrement, increment, update_likes_received
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        increment(instance.author_id, recipes_count=1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    decrement(instance.author_id, recipes_count=1)
+    # Лайки рецепта удаляются каскадом без сигналов, а likes_count в instance
+    # может быть устаревшим — сумма пересчитывается по оставшимся рецептам
+    update_likes_received([instance.author_id])
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        author_id = Recipe.objects.filter(pk=instance.recipe_id).values_list('author_id', flat=True).first()
+        increment(author_id, comments_received=1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    author_id = Recipe.objects.filter(pk=instance.recipe_id).values_list('author_id', flat=True).first()
+    if author_id is not None:
+        decrement(author_id, comments_received=1)
+
+
+@receiver(pre_delete, sender=get_user_model())
+def remember_liked_recipes(sender, instance, **kwargs):
+    # Лайки пользователя удалятся каскадом — счетчики их рецептов пересчитываются после удаления
+    instance._liked_recipe_ids = list(Like.objects.filter(user=instance).values_list('recipe_id', flat=True))
+
+
+@receiver(post_delete, sender=get_user_model())
+def refresh_liked_recipes(sender, instance, **kwargs):
+    refresh_like_counts(getattr(instance, '_liked_recipe_ids', []))
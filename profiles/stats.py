@@ -0,0 +1,101 @@
+"""
+Статистика авторов для профилей (AuthorStats).
+
+Профиль показывает число рецептов автора, полученных лайков и комментариев
+и подписчиков. Считать их агрегатами по Recipe, Like и Comment на каждый
+просмотр дорого, поэтому значения хранятся в AuthorStats и читаются вместе
+с пользователем через select_related('stats') (для авторов рецептов —
+select_related('author__stats')).
+
+- recipes_count и comments_received меняются сигналами (profiles/signals.py)
+  через F-выражения;
+- likes_received пересчитывается вместе с Recipe.likes_count в
+  recipe.likes.refresh_like_counts: все лайки ставятся и снимаются через
+  него, а сигналов на Like нет, чтобы удаление рецепта не загружало все его
+  лайки ради сигналов;
+- строка создается при первом изменении пересчетом по исходным таблицам,
+  уменьшение счетчиков строк не создает;
+- refresh_author_stats пересчитывает статистику точно — им пользуется
+  команда rebuild_author_stats.
+"""
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from recipe.models import Comment, Recipe
+from .models import AuthorStats
+
+STAT_FIELDS = ('recipes_count', 'likes_received', 'comments_received')
+
+
+def refresh_author_stats(user_ids, using=None):
+    """Пересчитывает статистику пользователей по исходным таблицам (три запроса)."""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+    recipes = {
+        row['author_id']: row
+        for row in (Recipe.objects.using(using).filter(author_id__in=user_ids).order_by()
+                    .values('author_id').annotate(recipes=Count('id'), likes=Sum('likes_count')))
+    }
+    comments = dict(
+        Comment.objects.using(using).filter(recipe__author_id__in=user_ids).order_by()
+        .values('recipe__author_id').annotate(total=Count('id')).values_list('recipe__author_id', 'total')
+    )
+    AuthorStats.objects.using(using).bulk_create(
+        [
+            AuthorStats(
+                user_id=user_id,
+                recipes_count=recipes.get(user_id, {}).get('recipes', 0),
+                likes_received=recipes.get(user_id, {}).get('likes') or 0,
+                comments_received=comments.get(user_id, 0),
+            )
+            for user_id in user_ids
+        ],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=list(STAT_FIELDS),
+    )
+
+
+def increment(user_id, **deltas):
+    """Увеличивает счетчики автора; если строки еще нет, она создается пересчетом."""
+    updated = AuthorStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if not updated:
+        # Пересчет уже учитывает только что сохраненный объект
+        refresh_author_stats([user_id])
+
+
+def decrement(user_id, **deltas):
+    """Уменьшает счетчики автора, не опуская их ниже нуля."""
+    AuthorStats.objects.filter(user_id=user_id).update(
+        **{field: Greatest(F(field) - delta, Value(0)) for field, delta in deltas.items()}
+    )
+
+
+def update_likes_received(author_ids):
+    """Пересчитывает likes_received по Recipe.likes_count в существующих строках; возвращает их число."""
+    likes = (Recipe.objects.filter(author_id=OuterRef('user_id')).order_by().values('author_id')
+             .annotate(total=Sum('likes_count')).values('total')[:1])
+    return AuthorStats.objects.filter(user_id__in=author_ids).update(likes_received=Coalesce(Subquery(likes), 0))
+
+
+def refresh_likes_received(recipe_ids):
+    """Пересчитывает likes_received авторов рецептов по их Recipe.likes_count."""
+    author_ids = set(Recipe.objects.filter(pk__in=recipe_ids).values_list('author_id', flat=True))
+    if not author_ids:
+        return
+    updated = update_likes_received(author_ids)
+    if updated < len(author_ids):
+        missing = author_ids - set(AuthorStats.objects.filter(user_id__in=author_ids)
+                                   .values_list('user_id', flat=True))
+        refresh_author_stats(missing)
+
+
+def get_author_stats(user):
+    """Статистика для сериализаторов; без строки AuthorStats — нули."""
+    stats = getattr(user, 'stats', None)
+    data = {field: getattr(stats, field, 0) for field in STAT_FIELDS}
+    data['followers_count'] = user.followers_count
+    return data
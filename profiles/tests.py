@@ -1,3 +1,176 @@
-from django.test import TestCase
+import json
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from chatAI.models import ChatHistory
+from profiles.models import AuthorStats
+from recipe.likes import like_recipes, unlike_recipes
+from recipe.models import Recipe, Ingredient, RecipeIngredient, Like, Cart, Comment
+
+User = get_user_model()
+
+ASYNC_PROFILE_ME_URL = reverse('async-profile-me')
+
+PROFILE_EXPORT_URL = reverse('profile-export')
+
+def async_profile_url(username):
+    return reverse('async-profile-by-username', args=[username])
+
+
+class AsyncProfileReadTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='cook', password='password1', bio='Повар')
+        recipe = Recipe.objects.create(
+            author=self.user, title='Борщ', description='...', instructions='...',
+            cooking_time_minutes=90, servings=6
+        )
+        RecipeIngredient.objects.create(recipe=recipe, ingredient=Ingredient.objects.create(name='Свекла'),
+                                        count=1, visible_type_of_count='шт')
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    async def test_profile_me(self):
+        """Тест: асинхронный профиль текущего пользователя с рецептами"""
+        response = await self.async_client.get(ASYNC_PROFILE_ME_URL,
+                                               headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['username'], 'cook')
+        self.assertEqual(data['recipes'][0]['ingredients'][0]['name'], 'Свекла')
+
+    async def test_profile_me_requires_authentication(self):
+        """Тест: без токена профиль текущего пользователя недоступен"""
+        response = await self.async_client.get(ASYNC_PROFILE_ME_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_profile_by_username(self):
+        """Тест: асинхронный профиль по username и 404 для неизвестного"""
+        response = await self.async_client.get(async_profile_url('cook'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['recipes'][0]['title'], 'Борщ')
+
+        response = await self.async_client.get(async_profile_url('nobody'))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ProfileExportTests(APITestCase):
+    def test_export_own_data(self):
+        """Тест: выгрузка содержит свои рецепты, лайки, покупки и историю чата"""
+        user = User.objects.create_user(username='exporter', password='password1')
+        other = User.objects.create_user(username='other', password='password2')
+        recipe = Recipe.objects.create(author=user, title='Каша', description='...', instructions='...',
+                                       cooking_time_minutes=15, servings=1)
+        Recipe.objects.create(author=other, title='Чужой', description='...', instructions='...',
+                              cooking_time_minutes=15, servings=1)
+        Like.objects.create(user=user, recipe=recipe)
+        Cart.objects.create(user=user, text_recipe_ingredient='1л Молоко')
+        ChatHistory.objects.create(user=user, text='Что приготовить?')
+        self.client.force_authenticate(user=user)
+
+        response = self.client.get(PROFILE_EXPORT_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['type'] for row in rows], ['recipe', 'like', 'cart', 'chat_message'])
+        self.assertEqual(rows[0]['title'], 'Каша')
+
+    def test_export_requires_authentication(self):
+        """Тест: без аутентификации выгрузка недоступна"""
+        response = self.client.get(PROFILE_EXPORT_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AuthorStatsTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='stats_author', password='password1')
+        self.reader = User.objects.create_user(username='stats_reader', password='password2')
+        self.other = User.objects.create_user(username='stats_other', password='password3')
+
+    def create_recipe(self, title='Борщ'):
+        return Recipe.objects.create(author=self.author, title=title, description='...', instructions='...',
+                                     cooking_time_minutes=30, servings=2)
+
+    def stats(self, user=None):
+        stats = AuthorStats.objects.get(user=user or self.author)
+        return stats.recipes_count, stats.likes_received, stats.comments_received
+
+    def test_counters_follow_recipes_likes_and_comments(self):
+        """Тест: рецепты, лайки и комментарии меняют статистику автора"""
+        first, second = self.create_recipe(), self.create_recipe('Щи')
+        like_recipes(self.reader, [first.id, second.id])
+        like_recipes(self.other, [first.id])
+        comment = Comment.objects.create(recipe=first, author=self.reader, comment_text='Вкусно')
+        Comment.objects.create(recipe=second, author=self.other, comment_text='Отлично')
+        self.assertEqual(self.stats(), (2, 3, 2))
+
+        unlike_recipes(self.other, [first.id])
+        comment.delete()
+        self.assertEqual(self.stats(), (2, 2, 1))
+
+        second.delete()
+        self.assertEqual(self.stats(), (1, 1, 0))
+
+    def test_deleting_user_updates_liked_authors(self):
+        """Тест: лайки удаленного пользователя вычитаются из статистики авторов"""
+        recipe = self.create_recipe()
+        like_recipes(self.reader, [recipe.id])
+        self.reader.delete()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.likes_count, 0)
+        self.assertEqual(self.stats(), (1, 0, 0))
+
+    def test_rebuild_command(self):
+        """Тест: команда пересчитывает статистику после изменений в обход сигналов"""
+        recipe = self.create_recipe()
+        Like.objects.bulk_create([Like(recipe=recipe, user=self.reader), Like(recipe=recipe, user=self.other)])
+        Recipe.objects.filter(pk=recipe.pk).update(likes_count=2)
+        AuthorStats.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_author_stats', batch_size=2, stdout=out)
+        self.assertIn('Rebuilt stats for 3 users', out.getvalue())
+        self.assertEqual(self.stats(), (1, 2, 0))
+        self.assertEqual(self.stats(self.reader), (0, 0, 0))
+
+    def test_profile_includes_stats_without_extra_queries(self):
+        """Тест: профиль и авторы в списке рецептов отдают статистику без запросов на строку"""
+        for title in ('Борщ', 'Щи', 'Уха'):
+            like_recipes(self.reader, [self.create_recipe(title).id])
+        self.author.followers_count = 5
+        self.author.save(update_fields=['followers_count'])
+
+        self.client.force_authenticate(user=self.reader)
+        response = self.client.get(reverse('profile-by-username', args=[self.author.username]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['stats'], {'recipes_count': 3, 'likes_received': 3,
+                                                  'comments_received': 0, 'followers_count': 5})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/recipe/recipe/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Статистика приходит JOIN'ом вместе с автором, отдельных запросов нет
+        self.assertFalse([q for q in queries.captured_queries if 'FROM "profiles_authorstats"' in q['sql']])
+        for recipe in response.data['results']:
+            self.assertEqual(recipe['author']['stats']['recipes_count'], 3)
+
+    def test_own_profile_loads_stats_with_user(self):
+        """Тест: свой профиль читает статистику JOIN'ом вместе с пользователем"""
+        self.create_recipe()
+        self.client.force_authenticate(user=self.author)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('profile-me'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['stats']['recipes_count'], 1)
+        self.assertFalse([q for q in queries.captured_queries if 'FROM "profiles_authorstats"' in q['sql']])
+
+    def test_user_without_stats_row(self):
+        """Тест: у пользователя без рецептов статистика нулевая"""
+        self.client.force_authenticate(user=self.reader)
+        response = self.client.get(reverse('profile-by-username', args=[self.other.username]))
+        self.assertEqual(response.data['stats'], {'recipes_count': 0, 'likes_received': 0,
+                                                  'comments_received': 0, 'followers_count': 0})
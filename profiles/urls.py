@@ -1,6 +1,6 @@
 from django.urls import path
 
-from profiles import views
+from profiles import async_views, views
 
 # urlpatterns = [
 #     path('me/', cache_page(settings.CACHE_MIDDLEWARE_SECONDS)(views.ProfileView.as_view()), name='profile-me'),
@@ -9,5 +9,12 @@ from profiles import views
 
 urlpatterns = [
     path('me/', views.ProfileView.as_view(), name='profile-me'),
+    path('me/export/', views.ProfileExportView.as_view(), name='profile-export'),
     path('<str:username>/', views.ProfileByUsernameView.as_view(), name='profile-by-username'),
-]
\ No newline at end of file
+]
+
+# Асинхронные endpoints чтения для запуска под ASGI
+async_urlpatterns = [
+    path('me/', async_views.profile_me, name='async-profile-me'),
+    path('<str:username>/', async_views.profile_by_username, name='async-profile-by-username'),
+]
@@ -5,7 +5,10 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
+from rest_framework.views import APIView
 
+from baseAPI.renderers import ORJSONRenderer, NDJSONRenderer
+from recipe.export import export_user_data_response
 from .serializers import ProfileSerializer, PasswordChangeSerializer
 
 
@@ -18,11 +21,12 @@ class ProfileView(RetrieveUpdateAPIView):
     """
     permission_classes = [IsAuthenticated]
     serializer_class = ProfileSerializer
-    queryset = get_user_model().objects.all()
+    queryset = get_user_model().objects.select_related('stats')
     lookup_field = 'username'
 
     def get_object(self):
-        return self.request.user
+        # request.user загружен аутентификацией без stats — перечитываем вместе со статистикой
+        return self.get_queryset().get(pk=self.request.user.pk)
 
     def patch(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -49,5 +53,19 @@ class ProfileByUsernameView(RetrieveAPIView):
     GET: Returns user profile with their recipes
     """
     serializer_class = ProfileSerializer
-    queryset = get_user_model().objects.all()
+    queryset = get_user_model().objects.select_related('stats')
     lookup_field = 'username'
+
+
+@method_decorator(never_cache, name='dispatch')
+class ProfileExportView(APIView):
+    """
+    View for exporting the current user's data.
+    GET: Streams own recipes, likes, cart and chat history as NDJSON
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [ORJSONRenderer, NDJSONRenderer]
+
+    def get(self, request, *args, **kwargs):
+        return export_user_data_response(request.user)
+
@@ -0,0 +1,94 @@
+"""
+Асинхронные endpoints чтения рецептов (для запуска под ASGI).
+
+Повторяют ответы RecipeViewSet.list / retrieve, но не занимают поток
+на время ожидания БД и медленного клиента: один процесс под ASGI держит
+много одновременных соединений. Все связи, нужные RecipeSerializer
+(автор, ингредиенты, is_liked, статус подписки), загружаются заранее
+асинхронным ORM, сама сериализация к БД не обращается.
+"""
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+
+from baseAPI.async_api import (
+    AsyncPageNumberPagination,
+    aauthenticate,
+    api_response,
+    authentication_failed_response,
+    invalid_page_response,
+)
+from users.follows import aget_following_ids
+from .facets import aget_facets, wants_facets
+from .filters import RecipeFilter
+from .models import Recipe, SearchHistory
+from .serializers import RecipeSerializer
+
+
+def get_recipe_queryset(user):
+    return (Recipe.objects
+            .with_is_liked(user)
+            .select_related('author__stats')
+            .prefetch_related('recipeingredient_set__ingredient')
+            .order_by('id'))
+
+
+async def get_serializer_context(request, recipes):
+    """Контекст сериализатора с заранее загруженным статусом подписки на авторов страницы."""
+    author_ids = {recipe.author_id for recipe in recipes}
+    return {
+        'request': request,
+        'following_ids': await aget_following_ids(request.user, author_ids),
+        'follow_status_checked_ids': author_ids,
+    }
+
+
+async def save_search(user, text):
+    """Сохраняет поисковый запрос так же, как RecipeViewSet.list."""
+    last_search = await SearchHistory.objects.filter(user__id=user.id).alast()
+    if last_search is None or last_search.text != text:
+        await SearchHistory.objects.acreate(text=text, user=user)
+
+
+@never_cache
+@require_GET
+async def recipe_list(request):
+    """Список рецептов с фильтрами RecipeFilter, постраничной выдачей и фасетами по ?facets=1"""
+    try:
+        user = await aauthenticate(request)
+    except AuthenticationFailed as exc:
+        return authentication_failed_response(exc)
+
+    if user.is_authenticated and (text := request.GET.get('search')):
+        await save_search(user, text)
+
+    filterset = RecipeFilter(request.GET, queryset=get_recipe_queryset(user), request=request)
+    if not filterset.is_valid():
+        return api_response(filterset.errors, status=400)
+
+    paginator = AsyncPageNumberPagination()
+    recipes = await paginator.paginate_queryset(filterset.qs, request)
+    if recipes is None:
+        return invalid_page_response()
+    context = await get_serializer_context(request, recipes)
+    data = RecipeSerializer(recipes, many=True, context=context).data
+    if wants_facets(request.GET):
+        return paginator.get_paginated_response(data, facets=await aget_facets(filterset.qs))
+    return paginator.get_paginated_response(data)
+
+
+@never_cache
+@require_GET
+async def recipe_detail(request, pk):
+    """Один рецепт по id"""
+    try:
+        user = await aauthenticate(request)
+    except AuthenticationFailed as exc:
+        return authentication_failed_response(exc)
+
+    try:
+        recipe = await get_recipe_queryset(user).aget(pk=pk)
+    except Recipe.DoesNotExist:
+        return api_response({"detail": "No Recipe matches the given query."}, status=404)
+    context = await get_serializer_context(request, [recipe])
+    return api_response(RecipeSerializer(recipe, context=context).data)
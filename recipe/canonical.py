@@ -0,0 +1,165 @@
+"""
+Канонический словарь ингредиентов.
+
+У каждого ингредиента есть нормализованный ключ (normalized_name):
+регистр, «ё», пунктуация и лишние пробелы не различаются. При создании
+ингредиента по имени сначала ищется существующий с тем же ключом.
+
+Близкие, но не совпадающие по ключу имена («помидор» / «помидоры»)
+находит TrigramIndex: для каждого имени кандидаты берутся из инвертированного
+индекса по триграммам, а не сравнением со всеми остальными именами, так что
+поиск дубликатов стоит O(n·k), где k — число кандидатов на имя.
+merge_ingredients переносит связи дубликатов на канонический ингредиент.
+"""
+import re
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from .models import Cart, Ingredient, RecipeIngredient
+
+DEFAULT_SIMILARITY = 0.8
+MAX_CANDIDATES = 20
+# Триграммы, которые встречаются почти во всех именах («  с», «ый »), не
+# помогают отличить кандидатов и раздувают их список
+MAX_POSTING_SIZE = 1000
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_name(name):
+    """Ключ для сравнения имен: «  Помидор,  спелый » -> «помидор спелый»."""
+    name = str(name).casefold().replace('ё', 'е')
+    name = _PUNCTUATION_RE.sub(' ', name)
+    return _WHITESPACE_RE.sub(' ', name).strip()
+
+
+def trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """Коэффициент Дайса по множествам триграмм: 1.0 — одинаковые ключи."""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+class TrigramIndex:
+    """Инвертированный индекс триграмма -> ключи для поиска похожих имен."""
+
+    def __init__(self, keys=()):
+        self.trigrams = {}
+        self.postings = defaultdict(list)
+        for key in keys:
+            self.add(key)
+
+    def add(self, key):
+        if key in self.trigrams:
+            return
+        grams = trigrams(key)
+        self.trigrams[key] = grams
+        for gram in grams:
+            self.postings[gram].append(key)
+
+    def similar(self, key, threshold=DEFAULT_SIMILARITY, limit=MAX_CANDIDATES):
+        """Ключи из индекса (кроме самого key) с похожестью не ниже threshold, лучшие первыми."""
+        grams = self.trigrams.get(key) or trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            posting = self.postings.get(gram, ())
+            if len(posting) <= MAX_POSTING_SIZE:
+                shared.update(posting)
+        shared.pop(key, None)
+
+        matches = []
+        for candidate, _ in shared.most_common(limit):
+            score = similarity(grams, self.trigrams[candidate])
+            if score >= threshold:
+                matches.append((candidate, score))
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+
+def get_or_create_ingredient(name):
+    """
+    Возвращает (ингредиент, created): существующий ингредиент с тем же
+    нормализованным ключом или новый.
+
+    Если ключ уже занят несколькими ингредиентами (до слияния дубликатов),
+    берется самый старый.
+    """
+    key = normalize_name(name)
+    ingredient = Ingredient.objects.filter(normalized_name=key).order_by('id').first()
+    if ingredient is not None:
+        return ingredient, False
+    return Ingredient.objects.create(name=str(name).strip()), True
+
+
+def find_duplicate_groups(ingredients, threshold=DEFAULT_SIMILARITY):
+    """
+    Группирует ингредиенты-дубликаты.
+
+    ingredients — пары (id, normalized_name). Возвращает список групп id,
+    отсортированных по возрастанию: первый (самый старый) ингредиент группы
+    считается каноническим. В группу входят ингредиенты с тем же ключом и
+    с ключами, похожими на ключ канонического не меньше чем на threshold.
+    Цепочки не объединяются: из «A похож на B» и «B похож на C» не следует,
+    что C — дубликат A, а слияние необратимо.
+    """
+    ids_by_key = defaultdict(list)
+    for ingredient_id, key in ingredients:
+        ids_by_key[key].append(ingredient_id)
+
+    index = TrigramIndex(ids_by_key)
+    grouped = set()
+    groups = []
+    # Канонические ключи берутся от самых старых ингредиентов
+    for key in sorted(ids_by_key, key=lambda key: min(ids_by_key[key])):
+        if key in grouped:
+            continue
+        grouped.add(key)
+        ids = list(ids_by_key[key])
+        for candidate, _ in index.similar(key, threshold):
+            if candidate not in grouped:
+                grouped.add(candidate)
+                ids.extend(ids_by_key[candidate])
+        if len(ids) > 1:
+            groups.append(sorted(ids))
+    return sorted(groups, key=lambda ids: ids[0])
+
+
+def merge_ingredients(canonical_id, duplicate_ids):
+    """
+    Переносит связи дубликатов на канонический ингредиент и удаляет дубликаты.
+
+    Если в рецепте уже есть канонический ингредиент (или несколько
+    дубликатов сразу), остается одна связь: уникальность (recipe, ingredient)
+    иначе была бы нарушена. Возвращает число перенесенных связей.
+    """
+    duplicate_ids = [ingredient_id for ingredient_id in duplicate_ids if ingredient_id != canonical_id]
+    if not duplicate_ids:
+        return 0
+    with transaction.atomic():
+        links = (RecipeIngredient.objects
+                 .filter(ingredient_id__in=[canonical_id, *duplicate_ids])
+                 .order_by('recipe_id', 'ingredient_id')
+                 .values_list('id', 'recipe_id', 'ingredient_id'))
+        kept = {}
+        redundant = []
+        for link_id, recipe_id, ingredient_id in links:
+            if recipe_id not in kept:
+                kept[recipe_id] = (link_id, ingredient_id)
+            elif ingredient_id == canonical_id:
+                # Связь с каноническим ингредиентом важнее связи с дубликатом
+                redundant.append(kept[recipe_id][0])
+                kept[recipe_id] = (link_id, ingredient_id)
+            else:
+                redundant.append(link_id)
+        RecipeIngredient.objects.filter(id__in=redundant).delete()
+        moved = RecipeIngredient.objects.filter(ingredient_id__in=duplicate_ids).update(ingredient_id=canonical_id)
+        Cart.objects.filter(ingredient_id__in=duplicate_ids).update(ingredient_id=canonical_id)
+        Ingredient.objects.filter(id__in=duplicate_ids).delete()
+    return moved
@@ -0,0 +1,130 @@
+"""
+Список покупок: добавление рецепта в корзину и агрегация по ингредиентам.
+
+Единицы измерения нормализуются при записи (normalize_unit), а при чтении
+приводятся к базовой единице (г, мл, шт) выражением CASE прямо в SQL,
+поэтому сводная корзина считается одним GROUP BY независимо от числа строк.
+"""
+from django.db.models import Case, CharField, F, FloatField, Sum, Value, When
+
+from .models import Cart, RecipeIngredient
+
+# Единица -> (базовая единица, множитель)
+UNITS = {
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+    'шт': ('шт', 1),
+}
+
+UNIT_ALIASES = {
+    'гр': 'г',
+    'грамм': 'г',
+    'граммов': 'г',
+    'g': 'г',
+    'kg': 'кг',
+    'килограмм': 'кг',
+    'ml': 'мл',
+    'миллилитр': 'мл',
+    'l': 'л',
+    'литр': 'л',
+    'литра': 'л',
+    'штук': 'шт',
+    'штуки': 'шт',
+    'штука': 'шт',
+    'pcs': 'шт',
+}
+
+# Если сумма в базовой единице достигает порога, показываем в крупной единице
+DISPLAY_UNITS = {
+    'г': ('кг', 1000),
+    'мл': ('л', 1000),
+}
+
+
+def normalize_unit(unit):
+    """Приводит запись единицы измерения к каноническому виду ('Гр.' -> 'г')."""
+    unit = (unit or '').strip().lower().rstrip('.')
+    return UNIT_ALIASES.get(unit, unit)
+
+
+def format_quantity(quantity):
+    return f'{quantity:g}'
+
+
+def add_recipe_to_cart(user, recipe, servings=None):
+    """
+    Добавляет в корзину все ингредиенты рецепта одним bulk_create.
+
+    Если передано servings, количества пересчитываются на нужное число порций.
+    """
+    scale = 1
+    if servings and recipe.servings:
+        scale = servings / recipe.servings
+
+    lines = []
+    recipe_ingredients = (RecipeIngredient.objects
+                          .filter(recipe=recipe)
+                          .select_related('ingredient'))
+    for ri in recipe_ingredients:
+        quantity = ri.count * scale
+        unit = normalize_unit(ri.visible_type_of_count)
+        lines.append(Cart(
+            user=user,
+            recipe=recipe,
+            ingredient=ri.ingredient,
+            quantity=quantity,
+            unit=unit,
+            text_recipe_ingredient=f'{format_quantity(quantity)}{unit} {ri.ingredient.name}',
+        ))
+    return Cart.objects.bulk_create(lines)
+
+
+def get_aggregated_cart(user):
+    """
+    Сводный список покупок: строки с одинаковым ингредиентом и совместимой
+    единицей измерения суммируются в одном сгруппированном запросе.
+
+    Строки без ингредиента (свободный текст) не группируются и идут после
+    сгруппированных как есть, с ingredient = None и текстом строки в name.
+    """
+    base_unit = Case(
+        *[When(unit=unit, then=Value(base)) for unit, (base, _) in UNITS.items()],
+        default=F('unit'),
+        output_field=CharField(),
+    )
+    factor = Case(
+        *[When(unit=unit, then=Value(multiplier)) for unit, (_, multiplier) in UNITS.items()],
+        default=Value(1),
+        output_field=FloatField(),
+    )
+    rows = (Cart.objects
+            .filter(user=user, ingredient__isnull=False)
+            .annotate(base_unit=base_unit)
+            .values('ingredient_id', 'ingredient__name', 'base_unit')
+            .annotate(total=Sum(F('quantity') * factor, output_field=FloatField()))
+            .order_by('ingredient__name', 'base_unit'))
+
+    result = []
+    for row in rows:
+        total, unit = row['total'], row['base_unit']
+        display_unit, threshold = DISPLAY_UNITS.get(unit, (unit, None))
+        if threshold and total >= threshold:
+            total, unit = total / threshold, display_unit
+        result.append({
+            'ingredient': row['ingredient_id'],
+            'name': row['ingredient__name'],
+            'quantity': round(total, 3),
+            'unit': unit,
+        })
+
+    free_text = (Cart.objects
+                 .filter(user=user, ingredient__isnull=True)
+                 .values_list('text_recipe_ingredient', 'quantity', 'unit')
+                 .order_by('id'))
+    result.extend(
+        {'ingredient': None, 'name': text, 'quantity': quantity, 'unit': unit}
+        for text, quantity, unit in free_text
+    )
+    return result
@@ -0,0 +1,115 @@
+"""
+Потоковая выгрузка в NDJSON (одна JSON-строка на объект).
+
+Выборки читаются пачками по первичному ключу (id > последнего выгруженного)
+через values(), связанные ингредиенты подгружаются одним запросом на пачку,
+а готовые строки сразу отдаются в StreamingHttpResponse. Память не зависит
+от размера выгрузки — в ней держится только текущая пачка.
+
+QuerySet.iterator(chunk_size=...) здесь не подходит: драйвер MySQL не
+умеет серверные курсоры и загружает весь результат в память клиента.
+Модели тоже не создаются: prefetch_related строит отдельный QuerySet на
+каждый объект и на больших выгрузках занимает половину времени.
+"""
+from collections import defaultdict
+
+from django.http import StreamingHttpResponse
+
+from baseAPI.renderers import dumps
+from chatAI.models import ChatHistory
+from .models import Recipe, RecipeIngredient, Like, Cart
+
+EXPORT_CHUNK_SIZE = 2000
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+
+RECIPE_FIELDS = (
+    'id', 'author_id', 'author__username', 'title', 'description', 'instructions',
+    'cooking_time_minutes', 'servings', 'image', 'created_at', 'updated_at',
+    'is_active', 'is_private', 'likes_count',
+)
+
+
+def iter_batches(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Обходит values()-queryset пачками по возрастанию id.
+
+    Каждая пачка — отдельный запрос с условием id > последнего выгруженного,
+    поэтому запрос не замедляется к концу выгрузки, как OFFSET.
+    """
+    queryset = queryset.order_by('id')
+    last_id = None
+    while True:
+        page = queryset if last_id is None else queryset.filter(id__gt=last_id)
+        batch = list(page[:chunk_size])
+        if batch:
+            yield batch
+        if len(batch) < chunk_size:
+            return
+        last_id = batch[-1]['id']
+
+
+def attach_ingredients(batch):
+    """Добавляет к пачке рецептов ингредиенты одним запросом и собирает строки выгрузки."""
+    ingredients = defaultdict(list)
+    for ri in (RecipeIngredient.objects
+               .filter(recipe_id__in=[row['id'] for row in batch])
+               .order_by('id')
+               .values('recipe_id', 'ingredient_id', 'ingredient__name', 'count', 'visible_type_of_count')):
+        ingredients[ri['recipe_id']].append({
+            'ingredient': ri['ingredient_id'],
+            'name': ri['ingredient__name'],
+            'count': ri['count'],
+            'visible_type_of_count': ri['visible_type_of_count'],
+        })
+
+    storage = Recipe._meta.get_field('image').storage
+    for row in batch:
+        row['author'] = {'id': row.pop('author_id'), 'username': row.pop('author__username')}
+        row['image'] = storage.url(row['image']) if row['image'] else None
+        row['ingredients'] = ingredients.get(row['id'], [])
+    return batch
+
+
+def iter_ndjson(sections, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Генерирует строки NDJSON для секций (type, values-queryset, обработка пачки).
+
+    Если type не None, он добавляется в каждую строку, чтобы в одной
+    выгрузке можно было различать объекты разных видов.
+    """
+    for type_, queryset, process_batch in sections:
+        for batch in iter_batches(queryset, chunk_size):
+            if process_batch is not None:
+                batch = process_batch(batch)
+            if type_ is not None:
+                batch = [{'type': type_, **row} for row in batch]
+            yield b''.join(dumps(row) + b'\n' for row in batch)
+
+
+def ndjson_response(sections, filename, chunk_size=EXPORT_CHUNK_SIZE):
+    # База выбирается сейчас, пока роутеру доступен контекст запроса:
+    # сами строки читаются уже после выхода из view
+    sections = [(type_, queryset.using(queryset.db), to_dict) for type_, queryset, to_dict in sections]
+    response = StreamingHttpResponse(iter_ndjson(sections, chunk_size), content_type=NDJSON_CONTENT_TYPE)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def export_catalog_response(chunk_size=EXPORT_CHUNK_SIZE):
+    """Все публичные активные рецепты."""
+    queryset = Recipe.objects.filter(is_active=True, is_private=False).values(*RECIPE_FIELDS)
+    return ndjson_response([(None, queryset, attach_ingredients)], 'recipes.ndjson', chunk_size)
+
+
+def export_user_data_response(user, chunk_size=EXPORT_CHUNK_SIZE):
+    """Данные пользователя: свои рецепты, лайки, список покупок и история чата."""
+    sections = [
+        ('recipe', Recipe.objects.filter(author=user).values(*RECIPE_FIELDS), attach_ingredients),
+        ('like', Like.objects.filter(user=user).values('id', 'recipe_id', 'created_at'), None),
+        ('cart', Cart.objects.filter(user=user).values(
+            'id', 'text_recipe_ingredient', 'ingredient_id', 'recipe_id', 'quantity', 'unit'), None),
+        ('chat_message', ChatHistory.objects.filter(user_id=user).values(
+            'id', 'text', 'sender_type', 'created_at'), None),
+    ]
+    return ndjson_response(sections, f'{user.username}.ndjson', chunk_size)
@@ -0,0 +1,82 @@
+"""
+Фасеты для списка рецептов: сколько рецептов текущей выборки попадает
+в каждый диапазон времени приготовления и числа порций и какие
+ингредиенты в ней встречаются чаще всего.
+
+Все диапазоны считаются одним запросом (COUNT ... FILTER по каждому
+диапазону за один проход по выборке), ингредиенты — одним GROUP BY.
+Границы диапазонов совпадают с параметрами фильтров RecipeFilter
+(cooking_time_min/max, servings_min/max), чтобы клиент мог сразу
+применить выбранный фасет.
+"""
+from django.db.models import Count, Q
+
+from .models import RecipeIngredient
+
+# (от, до) включительно, None — без границы
+COOKING_TIME_BUCKETS = ((None, 15), (16, 30), (31, 60), (61, 120), (121, None))
+SERVINGS_BUCKETS = ((None, 2), (3, 4), (5, 6), (7, None))
+TOP_INGREDIENTS = 10
+
+FACET_FAMILIES = (
+    ('cooking_time', 'cooking_time_minutes', COOKING_TIME_BUCKETS),
+    ('servings', 'servings', SERVINGS_BUCKETS),
+)
+
+
+def bucket_filter(field, low, high):
+    condition = Q()
+    if low is not None:
+        condition &= Q(**{f'{field}__gte': low})
+    if high is not None:
+        condition &= Q(**{f'{field}__lte': high})
+    return condition
+
+
+def bucket_aggregates():
+    return {
+        f'{family}_{index}': Count('id', filter=bucket_filter(field, low, high))
+        for family, field, buckets in FACET_FAMILIES
+        for index, (low, high) in enumerate(buckets)
+    }
+
+
+def ingredient_counts(queryset):
+    """Самые частые ингредиенты выборки одним GROUP BY."""
+    return (RecipeIngredient.objects
+            .filter(recipe__in=queryset.values('pk'))
+            .values('ingredient_id', 'ingredient__name')
+            .annotate(count=Count('recipe_id'))
+            .order_by('-count', 'ingredient_id')[:TOP_INGREDIENTS])
+
+
+def build_facets(counts, ingredients):
+    facets = {
+        family: [
+            {'min': low, 'max': high, 'count': counts[f'{family}_{index}']}
+            for index, (low, high) in enumerate(buckets)
+        ]
+        for family, _, buckets in FACET_FAMILIES
+    }
+    facets['ingredients'] = [
+        {'id': row['ingredient_id'], 'name': row['ingredient__name'], 'count': row['count']}
+        for row in ingredients
+    ]
+    return facets
+
+
+def get_facets(queryset):
+    """Фасеты для отфильтрованного QuerySet рецептов (без пагинации)."""
+    queryset = queryset.order_by()
+    counts = queryset.aggregate(**bucket_aggregates())
+    return build_facets(counts, list(ingredient_counts(queryset)))
+
+
+async def aget_facets(queryset):
+    queryset = queryset.order_by()
+    counts = await queryset.aaggregate(**bucket_aggregates())
+    return build_facets(counts, [row async for row in ingredient_counts(queryset)])
+
+
+def wants_facets(query_params):
+    return query_params.get('facets', '').lower() in ('1', 'true', 'yes')
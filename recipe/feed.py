@@ -0,0 +1,179 @@
+"""
+Лента рецептов от авторов, на которых подписан пользователь.
+
+Лента строится по схеме fan-out on write: при публикации рецепта для каждого
+подписчика автора создается запись FeedEntry. Для авторов с очень большим
+числом подписчиков (больше FEED_FANOUT_MAX_FOLLOWERS) запись не размножается,
+а их рецепты подмешиваются в ленту при чтении (fan-out on read).
+
+Чтение ленты — keyset-выборка FeedEntry по индексу (user, created_at) с
+рецептом через select_related; рецепты авторов fan-out on read читаются
+отдельной выборкой с тем же ключом (created_at, recipe_id) и сливаются с
+ней. Рецепт попадает в ленты при публикации, при переходе из приватных
+или неактивных в опубликованные и при импорте (import_recipes).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef, Q, prefetch_related_objects
+
+from users.models import Followers
+from .models import FeedEntry, Like, Recipe
+
+FANOUT_BATCH_SIZE = 1000
+
+
+def get_fanout_max_followers():
+    return getattr(settings, 'FEED_FANOUT_MAX_FOLLOWERS', 5000)
+
+
+def get_backfill_size():
+    return getattr(settings, 'FEED_BACKFILL_SIZE', 50)
+
+
+def is_fanout_author(author_id):
+    """Рассылаются ли рецепты автора по лентам подписчиков при записи."""
+    followers_count = (get_user_model().objects
+                       .filter(pk=author_id)
+                       .values_list('followers_count', flat=True)
+                       .first())
+    return (followers_count or 0) <= get_fanout_max_followers()
+
+
+def fan_out_recipe(recipe):
+    """Добавляет опубликованный рецепт в ленты всех подписчиков автора."""
+    if not is_published(recipe):
+        return 0
+    if not is_fanout_author(recipe.author_id):
+        return 0
+
+    follower_ids = (Followers.objects
+                    .filter(author_id=recipe.author_id)
+                    .values_list('user_id', flat=True))
+    created = 0
+    batch = []
+    for follower_id in follower_ids.iterator(chunk_size=FANOUT_BATCH_SIZE):
+        batch.append(FeedEntry(
+            user_id=follower_id,
+            recipe_id=recipe.id,
+            author_id=recipe.author_id,
+            created_at=recipe.created_at,
+        ))
+        if len(batch) >= FANOUT_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            created += len(batch)
+            batch = []
+    if batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        created += len(batch)
+    return created
+
+
+def backfill_author(user, author):
+    """Заполняет ленту последними рецептами автора после подписки на него."""
+    if not is_fanout_author(author.id):
+        return 0
+    recipes = (Recipe.objects
+               .filter(author=author, is_active=True, is_private=False)
+               .order_by('-created_at')
+               .values_list('id', 'created_at')[:get_backfill_size()])
+    entries = [
+        FeedEntry(user_id=user.id, recipe_id=recipe_id, author_id=author.id, created_at=created_at)
+        for recipe_id, created_at in recipes
+    ]
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    return len(entries)
+
+
+def remove_author(user, author):
+    """Убирает рецепты автора из ленты после отписки."""
+    deleted, _ = FeedEntry.objects.filter(user=user, author=author).delete()
+    return deleted
+
+
+def get_fanout_on_read_authors(user):
+    """Авторы из подписок пользователя, чьи рецепты не рассылаются по лентам."""
+    return list(
+        get_user_model().objects
+        .filter(followers__user_id=user, followers_count__gt=get_fanout_max_followers())
+        .values_list('id', flat=True)
+    )
+
+
+def is_published(recipe):
+    return recipe.is_active and not recipe.is_private
+
+
+def fan_out_recipes(recipes, using=None):
+    """
+    Рассылает по лентам пачку рецептов, добавленных в обход API (импорт).
+
+    Подписчики каждого автора читаются один раз на пачку.
+    """
+    by_author = {}
+    for recipe in recipes:
+        if is_published(recipe):
+            by_author.setdefault(recipe.author_id, []).append(recipe)
+    if not by_author:
+        return 0
+    fanout_authors = (get_user_model().objects.using(using)
+                      .filter(pk__in=by_author, followers_count__lte=get_fanout_max_followers())
+                      .values_list('id', flat=True))
+    created = 0
+    for author_id in fanout_authors:
+        follower_ids = list(Followers.objects.using(using).filter(author_id=author_id)
+                            .values_list('user_id', flat=True))
+        entries = [
+            FeedEntry(user_id=follower_id, recipe_id=recipe.id, author_id=author_id, created_at=recipe.created_at)
+            for recipe in by_author[author_id]
+            for follower_id in follower_ids
+        ]
+        FeedEntry.objects.using(using).bulk_create(entries, batch_size=FANOUT_BATCH_SIZE, ignore_conflicts=True)
+        created += len(entries)
+    return created
+
+
+def before_key(created_at_field, id_field, key):
+    """Условие «строго после курсора» для сортировки (-created_at, -id)."""
+    created_at, recipe_id = key
+    return (Q(**{f'{created_at_field}__lt': created_at})
+            | Q(**{created_at_field: created_at, f'{id_field}__lt': recipe_id}))
+
+
+def get_feed_page(user, key=None, limit=10):
+    """
+    Страница ленты: рецепты после ключа key = (created_at, recipe_id), новые первыми.
+
+    Возвращает (рецепты, ключ следующей страницы или None). Материализованная
+    часть читается из FeedEntry по индексу (user, created_at), рецепты
+    авторов fan-out on read — отдельным запросом; обе выборки ограничены
+    limit + 1 строкой и сливаются по ключу.
+    """
+    entries = (FeedEntry.objects
+               .filter(user=user, recipe__is_active=True, recipe__is_private=False)
+               .select_related('recipe__author__stats')
+               .annotate(is_liked=Exists(Like.objects.filter(recipe=OuterRef('recipe_id'), user=user)))
+               .order_by('-created_at', '-recipe_id'))
+    if key is not None:
+        entries = entries.filter(before_key('created_at', 'recipe_id', key))
+    recipes = []
+    for entry in entries[:limit + 1]:
+        entry.recipe.is_liked = entry.is_liked
+        recipes.append(entry.recipe)
+
+    pull_authors = get_fanout_on_read_authors(user)
+    if pull_authors:
+        pulled = (Recipe.objects
+                  .filter(author_id__in=pull_authors, is_active=True, is_private=False)
+                  .with_is_liked(user)
+                  .select_related('author__stats')
+                  .order_by('-created_at', '-id'))
+        if key is not None:
+            pulled = pulled.filter(before_key('created_at', 'id', key))
+        seen = {recipe.id for recipe in recipes}
+        recipes.extend(recipe for recipe in pulled[:limit + 1] if recipe.id not in seen)
+        recipes.sort(key=lambda recipe: (recipe.created_at, recipe.id), reverse=True)
+
+    page = recipes[:limit]
+    prefetch_related_objects(page, 'recipeingredient_set__ingredient')
+    next_key = (page[-1].created_at, page[-1].id) if len(recipes) > limit else None
+    return page, next_key
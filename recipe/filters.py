@@ -1,16 +1,52 @@
 import django_filters
-from django.db.models import Q
+from django import forms
+from django.db.models import Exists, OuterRef, Q
 
-from .models import Recipe
+from .models import Recipe, RecipeIngredient
+
+MAX_FILTER_INGREDIENTS = 10
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    """Список чисел через запятую: ?ingredients=1,2,3"""
+
+
+class RecipeFilterForm(forms.Form):
+    def clean(self):
+        cleaned_data = super().clean()
+        for name in ('ingredients', 'exclude_ingredients'):
+            if len(cleaned_data.get(name) or ()) > MAX_FILTER_INGREDIENTS:
+                self.add_error(name, f"No more than {MAX_FILTER_INGREDIENTS} ingredients")
+        return cleaned_data
+
+
+class StableOrderingFilter(django_filters.OrderingFilter):
+    """Сортировка с id последним ключом, чтобы страницы не перемешивались при равных значениях."""
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        return qs.order_by(*(self.get_ordering_value(param) for param in value), '-id')
 
 
 class RecipeFilter(django_filters.FilterSet):
     search = django_filters.CharFilter(method='filter_search')
     author = django_filters.NumberFilter(method='filter_author')
+    cooking_time_min = django_filters.NumberFilter(field_name='cooking_time_minutes', lookup_expr='gte')
+    cooking_time_max = django_filters.NumberFilter(field_name='cooking_time_minutes', lookup_expr='lte')
+    servings_min = django_filters.NumberFilter(field_name='servings', lookup_expr='gte')
+    servings_max = django_filters.NumberFilter(field_name='servings', lookup_expr='lte')
+    # Рецепты, в которых есть все перечисленные ингредиенты
+    ingredients = NumberInFilter(method='filter_ingredients')
+    # Рецепты без единого из перечисленных ингредиентов
+    exclude_ingredients = NumberInFilter(method='filter_exclude_ingredients')
+    # ?ordering=-created_at (новые) или ?ordering=-likes_count (популярные)
+    ordering = StableOrderingFilter(fields=('created_at', 'likes_count'))
 
     class Meta:
         model = Recipe
         fields = []
+        form = RecipeFilterForm
 
     def filter_search(self, queryset, name, value):
         terms = value.split()
@@ -25,3 +61,15 @@ class RecipeFilter(django_filters.FilterSet):
 
     def filter_author(self, queryset, name, value):
         return queryset.filter(author__id=value)
+
+    def filter_ingredients(self, queryset, name, value):
+        for ingredient_id in set(value):
+            queryset = queryset.filter(Exists(
+                RecipeIngredient.objects.filter(recipe=OuterRef('pk'), ingredient_id=ingredient_id)
+            ))
+        return queryset
+
+    def filter_exclude_ingredients(self, queryset, name, value):
+        return queryset.exclude(Exists(
+            RecipeIngredient.objects.filter(recipe=OuterRef('pk'), ingredient_id__in=value)
+        ))
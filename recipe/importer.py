@@ -0,0 +1,250 @@
+"""
+Массовый импорт рецептов из JSONL или CSV.
+
+Строки читаются потоком и обрабатываются пачками: для каждой пачки
+недостающие ингредиенты и рецепты вставляются через bulk_create, связи
+RecipeIngredient — одним bulk_create, всё в одной транзакции. Имена
+ингредиентов сопоставляются с id по нормализованному ключу (см.
+recipe/canonical.py) через словарь в памяти, который загружается один раз
+и пополняется новыми ингредиентами.
+
+Формат строки (JSONL — объект, CSV — колонки с теми же именами, ingredients
+в CSV — JSON-список):
+
+    {"title": "...", "description": "...", "instructions": "...",
+     "cooking_time_minutes": 30, "servings": 4, "author": "username",
+     "ingredients": [{"name": "Мука", "count": 200, "visible_type_of_count": "г"}]}
+
+bulk_create не вызывает сигналы, поэтому статистика авторов пачки
+(AuthorStats) пересчитывается, а рецепты рассылаются по лентам подписчиков
+(recipe/feed.py) в той же транзакции.
+"""
+import csv
+import json
+import os
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Max
+
+from profiles.stats import refresh_author_stats
+from .canonical import normalize_name
+from .feed import fan_out_recipes
+from .models import Ingredient, Recipe, RecipeIngredient
+
+REQUIRED_FIELDS = ('title', 'instructions', 'cooking_time_minutes', 'servings')
+
+
+class ImportRowError(ValueError):
+    """Строка файла не может быть импортирована."""
+
+
+def read_jsonl(stream):
+    """Строки JSONL как есть: разбор в parse_row, чтобы битая строка не прерывала чтение."""
+    for line in stream:
+        yield line.strip()
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+def parse_row(row):
+    """Проверяет строку и приводит значения к типам модели."""
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError:
+            raise ImportRowError("invalid JSON")
+    if not isinstance(row, dict):
+        raise ImportRowError("row must be an object")
+    missing = [field for field in REQUIRED_FIELDS if row.get(field) in (None, '')]
+    if missing:
+        raise ImportRowError(f"missing fields: {', '.join(missing)}")
+    title = str(row['title']).strip()
+    if len(title) > Recipe._meta.get_field('title').max_length:
+        raise ImportRowError("title is too long")
+    description = str(row.get('description') or '')
+    if len(description) > Recipe._meta.get_field('description').max_length:
+        raise ImportRowError("description is too long")
+    try:
+        cooking_time = int(row['cooking_time_minutes'])
+        servings = int(row['servings'])
+    except (TypeError, ValueError):
+        raise ImportRowError("cooking_time_minutes and servings must be integers")
+
+    items = row.get('ingredients') or []
+    if isinstance(items, str):
+        # В CSV список ингредиентов записан JSON-строкой
+        try:
+            items = json.loads(items)
+        except ValueError:
+            raise ImportRowError("ingredients must be a JSON list")
+    if not isinstance(items, list):
+        raise ImportRowError("ingredients must be a list")
+    ingredients = []
+    for item in items:
+        name = str(item.get('name') or '').strip() if isinstance(item, dict) else ''
+        if not name:
+            raise ImportRowError("ingredient without name")
+        try:
+            count = float(item.get('count') or 0)
+        except (TypeError, ValueError):
+            raise ImportRowError(f"invalid count for ingredient {name!r}")
+        if not normalize_name(name) or len(name) > Ingredient._meta.get_field('name').max_length:
+            raise ImportRowError(f"invalid ingredient name {name!r}")
+        ingredients.append((name, count, str(item.get('visible_type_of_count') or '')))
+
+    return {
+        'title': title,
+        'description': description,
+        'instructions': str(row['instructions']),
+        'cooking_time_minutes': cooking_time,
+        'servings': servings,
+        'author': row.get('author'),
+        'ingredients': ingredients,
+    }
+
+
+class Checkpoint:
+    """Номер последней импортированной строки файла; пишется атомарно после каждой пачки."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path) as file:
+            return json.load(file)['rows']
+
+    def save(self, rows):
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump({'rows': rows}, file)
+        os.replace(tmp_path, self.path)
+
+
+class RecipeImporter:
+    def __init__(self, default_author=None, using=None):
+        self.using = using or router.db_for_write(Recipe)
+        self.default_author = default_author
+        self.authors = {}
+        # При дублях ключа остается ингредиент с меньшим id, как в get_or_create_ingredient
+        self.ingredient_ids = dict(
+            Ingredient.objects.using(self.using).order_by('-id').values_list('normalized_name', 'id')
+        )
+        self.recipes_created = 0
+        self.ingredients_created = 0
+
+    def resolve_authors(self, rows):
+        usernames = {row['author'] for row in rows if row['author']} - set(self.authors)
+        if usernames:
+            self.authors.update(
+                get_user_model().objects.using(self.using)
+                .filter(username__in=usernames).values_list('username', 'id')
+            )
+
+    def get_author_id(self, row):
+        if row['author']:
+            author_id = self.authors.get(row['author'])
+            if author_id is None:
+                raise ImportRowError(f"unknown author {row['author']!r}")
+            return author_id
+        if self.default_author is None:
+            raise ImportRowError("author is not set")
+        return self.default_author.id
+
+    def create_missing_ingredients(self, rows):
+        """Создает недостающие ингредиенты и возвращает словарь {ключ: id} только для новых."""
+        missing = {}
+        for row in rows:
+            for name, _, _ in row['ingredients']:
+                key = normalize_name(name)
+                if key not in self.ingredient_ids:
+                    # Имя в словаре — первое встреченное написание
+                    missing.setdefault(key, name)
+        if not missing:
+            return {}
+        # bulk_create не вызывает save(), поэтому ключ заполняется явно
+        Ingredient.objects.using(self.using).bulk_create(
+            Ingredient(name=name, normalized_name=key) for key, name in missing.items()
+        )
+        # MySQL не возвращает id из bulk_create, поэтому id дочитываются по ключам
+        return dict(
+            Ingredient.objects.using(self.using).filter(normalized_name__in=missing)
+            .order_by('-id').values_list('normalized_name', 'id')
+        )
+
+    def create_recipes(self, recipes):
+        """bulk_create рецептов с заполнением id у каждого объекта."""
+        if connections[self.using].features.can_return_rows_from_bulk_insert:
+            return Recipe.objects.using(self.using).bulk_create(recipes)
+        # Бэкенд не возвращает id вставленных строк (MySQL): id назначаются
+        # явно, начиная с текущего максимума. Если параллельная вставка заняла
+        # тот же id, транзакция пачки откатывается и повторяется.
+        start = (Recipe.objects.using(self.using).aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+        for offset, recipe in enumerate(recipes):
+            recipe.id = start + offset
+        return Recipe.objects.using(self.using).bulk_create(recipes)
+
+    def write_batch(self, rows, author_ids):
+        with transaction.atomic(using=self.using):
+            new_ingredients = self.create_missing_ingredients(rows)
+            ingredient_ids = {**self.ingredient_ids, **new_ingredients}
+            recipes = self.create_recipes([
+                Recipe(
+                    author_id=author_id,
+                    title=row['title'],
+                    description=row['description'],
+                    instructions=row['instructions'],
+                    cooking_time_minutes=row['cooking_time_minutes'],
+                    servings=row['servings'],
+                )
+                for row, author_id in zip(rows, author_ids)
+            ])
+            links = {}
+            for recipe, row in zip(recipes, rows):
+                for name, count, unit in row['ingredients']:
+                    # Повтор ингредиента в рецепте нарушил бы unique_together
+                    links[recipe.id, ingredient_ids[normalize_name(name)]] = (count, unit)
+            RecipeIngredient.objects.using(self.using).bulk_create(
+                RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient_id,
+                                 count=count, visible_type_of_count=unit)
+                for (recipe_id, ingredient_id), (count, unit) in links.items()
+            )
+            refresh_author_stats(author_ids, using=self.using)
+            fan_out_recipes(recipes, using=self.using)
+        return new_ingredients
+
+    def import_batch(self, rows):
+        """
+        Импортирует пачку разобранных строк.
+
+        Возвращает список (номер строки в пачке, ошибка) для строк,
+        которые пришлось пропустить.
+        """
+        self.resolve_authors(rows)
+        valid_rows, author_ids, errors = [], [], []
+        for index, row in enumerate(rows):
+            try:
+                author_ids.append(self.get_author_id(row))
+            except ImportRowError as exc:
+                errors.append((index, str(exc)))
+                continue
+            valid_rows.append(row)
+        if not valid_rows:
+            return errors
+
+        try:
+            new_ingredients = self.write_batch(valid_rows, author_ids)
+        except IntegrityError:
+            # Параллельная вставка заняла зарезервированные id — пробуем еще раз
+            new_ingredients = self.write_batch(valid_rows, author_ids)
+        # Словарь пополняется только после коммита, чтобы не запомнить id откаченных строк
+        self.ingredient_ids.update(new_ingredients)
+        self.ingredients_created += len(new_ingredients)
+        self.recipes_created += len(valid_rows)
+        return errors
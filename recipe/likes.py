@@ -0,0 +1,66 @@
+"""
+Лайки рецептов без предварительных проверок.
+
+Повторный лайк отсекается ограничением unique_together на Like
+(INSERT IGNORE через bulk_create(ignore_conflicts=True)), снятие лайков —
+один DELETE. Счетчик Recipe.likes_count после этого пересчитывается одним
+UPDATE по затронутым рецептам, поэтому остается точным при гонках и повторах.
+Вслед за ним пересчитывается AuthorStats.likes_received авторов этих рецептов,
+а авторам отправляются уведомления (notifications/notify.py).
+"""
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from notifications.notify import notify_likes
+from profiles.stats import refresh_likes_received
+from .models import Like, Recipe
+
+
+def is_likeable(user, recipe):
+    """Лайкнуть можно опубликованный рецепт (публичный и активный) или свой."""
+    return (not recipe.is_private and recipe.is_active) or recipe.author_id == user.id
+
+
+def get_likeable_recipe_ids(user, recipe_ids):
+    """Оставляет из recipe_ids существующие рецепты, доступные пользователю (см. is_likeable)."""
+    return list(
+        Recipe.objects
+        .filter(Q(is_private=False, is_active=True) | Q(author=user), pk__in=set(recipe_ids))
+        .values_list('id', flat=True)
+    )
+
+
+def refresh_like_counts(recipe_ids):
+    """Пересчитывает likes_count для рецептов одним запросом и лайки их авторов."""
+    if not recipe_ids:
+        return
+    likes_count = (Like.objects
+                   .filter(recipe=OuterRef('pk'))
+                   .values('recipe')
+                   .annotate(total=Count('id'))
+                   .values('total')[:1])
+    Recipe.objects.filter(pk__in=recipe_ids).update(likes_count=Coalesce(Subquery(likes_count), 0))
+    refresh_likes_received(recipe_ids)
+
+
+def like_recipes(user, recipe_ids):
+    """Ставит лайки на рецепты; уже существующие лайки игнорируются."""
+    recipe_ids = get_likeable_recipe_ids(user, recipe_ids)
+    with transaction.atomic():
+        Like.objects.bulk_create(
+            [Like(user=user, recipe_id=recipe_id) for recipe_id in recipe_ids],
+            ignore_conflicts=True
+        )
+        refresh_like_counts(recipe_ids)
+        notify_likes(user, recipe_ids)
+    return recipe_ids
+
+
+def unlike_recipes(user, recipe_ids):
+    """Снимает лайки пользователя с рецептов одним DELETE."""
+    recipe_ids = list(set(recipe_ids))
+    with transaction.atomic():
+        Like.objects.filter(user=user, recipe_id__in=recipe_ids).delete()
+        refresh_like_counts(recipe_ids)
+    return recipe_ids
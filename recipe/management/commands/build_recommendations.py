@@ -0,0 +1,36 @@
+"""
+manage.py build_recommendations — пересобирает рекомендации по лайкам.
+
+Запускается периодически (cron); см. recipe/recommendations.py.
+
+Пример:
+    python manage.py build_recommendations --top-n 50
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.recommendations import BLOCK_SIZE, ITEM_NEIGHBOURS, TOP_N, build_recommendations
+
+
+class Command(BaseCommand):
+    help = "Precomputes per-user recipe recommendations from likes (item-item collaborative filtering)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-n', type=int, default=TOP_N, help="Recommendations stored per user")
+        parser.add_argument('--neighbours', type=int, default=ITEM_NEIGHBOURS,
+                            help="Similar recipes kept per recipe")
+        parser.add_argument('--block-size', type=int, default=BLOCK_SIZE,
+                            help="Users written per transaction")
+
+    def handle(self, *args, **options):
+        if min(options['top_n'], options['neighbours'], options['block_size']) < 1:
+            raise CommandError("--top-n, --neighbours and --block-size must be positive")
+
+        started = time.perf_counter()
+        stats = build_recommendations(n=options['top_n'], k=options['neighbours'],
+                                      block_size=options['block_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['rows']} recommendations for {stats['users']} users "
+            f"from {stats['recipes']} liked recipes in {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,43 @@
+"""
+manage.py build_similar_recipes — пересчитывает похожие рецепты.
+
+По умолчанию пересчитываются только рецепты, у которых с прошлого запуска
+изменились ингредиенты или видимость; --full пересобирает все списки
+(и заново считает idf). См. recipe/similarity.py.
+
+Пример (cron):
+    python manage.py build_similar_recipes
+    python manage.py build_similar_recipes --full --top-k 30
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.similarity import BLOCK_SIZE, TOP_K, RecipeVectors, refresh_similar_recipes
+
+
+class Command(BaseCommand):
+    help = "Precomputes top-k similar recipes from ingredient TF-IDF vectors"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recompute every recipe")
+        parser.add_argument('--top-k', type=int, default=TOP_K, help="Neighbours stored per recipe")
+        parser.add_argument('--block-size', type=int, default=BLOCK_SIZE,
+                            help="Recipes computed and written per transaction")
+
+    def handle(self, *args, **options):
+        if options['top_k'] < 1 or options['block_size'] < 1:
+            raise CommandError("--top-k and --block-size must be positive")
+
+        started = time.perf_counter()
+        vectors = RecipeVectors.load()
+        loaded = time.perf_counter()
+        stats = refresh_similar_recipes(full=options['full'], k=options['top_k'],
+                                        block_size=options['block_size'], vectors=vectors)
+        finished = time.perf_counter()
+
+        self.stdout.write(f"Loaded {stats['recipes']} recipes in {loaded - started:.1f}s")
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed {stats['recomputed']}, refreshed {stats['refreshed']}, removed {stats['removed']} "
+            f"in {finished - loaded:.1f}s"
+        ))
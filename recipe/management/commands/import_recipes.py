@@ -0,0 +1,111 @@
+"""
+manage.py import_recipes — массовый импорт рецептов из JSONL или CSV.
+
+Строки читаются потоком и пишутся пачками по --batch-size в одной
+транзакции на пачку (см. recipe/importer.py). С --checkpoint после каждой
+пачки сохраняется номер последней обработанной строки, и повторный запуск
+продолжает с нее. Некорректные строки пропускаются и выводятся в stderr.
+
+Пример:
+    python manage.py import_recipes recipes.jsonl --author admin --checkpoint import.ckpt
+    zcat recipes.jsonl.gz | python manage.py import_recipes - --format jsonl --author admin
+"""
+import sys
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.importer import Checkpoint, ImportRowError, RecipeImporter, parse_row, read_csv, read_jsonl
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv}
+
+
+class Command(BaseCommand):
+    help = "Bulk-imports recipes from a JSONL or CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, '-' for stdin")
+        parser.add_argument('--format', choices=sorted(READERS),
+                            help="Input format (default: by file extension)")
+        parser.add_argument('--author', help="Username for rows without an author")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--checkpoint', help="File to store progress in and resume from")
+        parser.add_argument('--database', help="Database alias (default: router choice)")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or self.detect_format(path)
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        default_author = None
+        if options['author']:
+            try:
+                default_author = get_user_model().objects.get(username=options['author'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"User {options['author']!r} does not exist")
+
+        checkpoint = Checkpoint(options['checkpoint'])
+        skip = checkpoint.load()
+        if skip:
+            self.stdout.write(f"Resuming after row {skip}")
+
+        importer = RecipeImporter(default_author=default_author, using=options['database'])
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            rows = enumerate(READERS[input_format](stream), start=1)
+            self.run(importer, islice(rows, skip, None), options['batch_size'], checkpoint, skip)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+    @staticmethod
+    def detect_format(path):
+        for input_format in READERS:
+            if path.endswith(f'.{input_format}'):
+                return input_format
+        raise CommandError("Cannot detect input format, pass --format")
+
+    def run(self, importer, rows, batch_size, checkpoint, position):
+        started = time.perf_counter()
+        processed = skipped = 0
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            line_numbers, parsed = [], []
+            for line_number, row in batch:
+                if row == '':
+                    continue
+                try:
+                    parsed.append(parse_row(row))
+                except ImportRowError as exc:
+                    self.report_error(line_number, exc)
+                    skipped += 1
+                    continue
+                line_numbers.append(line_number)
+
+            for index, error in importer.import_batch(parsed):
+                self.report_error(line_numbers[index], error)
+                skipped += 1
+
+            position = batch[-1][0]
+            checkpoint.save(position)
+            processed += len(batch)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"row {position}: {importer.recipes_created} recipes, "
+                f"{processed / elapsed:.0f} rows/s"
+            )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {importer.recipes_created} recipes, created {importer.ingredients_created} "
+            f"ingredients, skipped {skipped} rows in {elapsed:.1f}s "
+            f"({processed / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
+
+    def report_error(self, line_number, error):
+        self.stderr.write(f"row {line_number}: {error}")
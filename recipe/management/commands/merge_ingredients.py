@@ -0,0 +1,53 @@
+"""
+manage.py merge_ingredients — находит и сливает дубликаты ингредиентов.
+
+Дубликаты — ингредиенты с одинаковым нормализованным именем или похожие
+по триграммам на имя канонического (см. recipe/canonical.py). Каноническим
+в группе остается самый старый ингредиент, связи остальных переносятся на
+него.
+
+Пример:
+    python manage.py merge_ingredients --dry-run
+    python manage.py merge_ingredients --threshold 0.85
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.canonical import DEFAULT_SIMILARITY, find_duplicate_groups, merge_ingredients
+from recipe.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = "Merges duplicate ingredients into their canonical (oldest) entry"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=DEFAULT_SIMILARITY,
+                            help="Minimum trigram similarity (0..1) for fuzzy duplicates")
+        parser.add_argument('--exact', action='store_true',
+                            help="Merge only identical normalized names")
+        parser.add_argument('--dry-run', action='store_true', help="Only print the groups")
+
+    def handle(self, *args, **options):
+        threshold = options['threshold']
+        if not 0 < threshold <= 1:
+            raise CommandError("--threshold must be in (0, 1]")
+        if options['exact']:
+            threshold = 1.0
+
+        names = dict(Ingredient.objects.values_list('id', 'name'))
+        groups = find_duplicate_groups(Ingredient.objects.values_list('id', 'normalized_name'), threshold)
+
+        moved = 0
+        for canonical_id, *duplicate_ids in groups:
+            self.stdout.write(
+                f"{names[canonical_id]!r} <- " + ', '.join(repr(names[i]) for i in duplicate_ids)
+            )
+            if not options['dry_run']:
+                moved += merge_ingredients(canonical_id, duplicate_ids)
+
+        merged = sum(len(group) - 1 for group in groups)
+        if options['dry_run']:
+            self.stdout.write(f"{len(groups)} groups, {merged} duplicates (dry run)")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Merged {merged} duplicates in {len(groups)} groups, re-pointed {moved} recipe ingredients"
+            ))
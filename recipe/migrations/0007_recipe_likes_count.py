@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-19 02:25
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_likes_count(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    Like = apps.get_model('recipe', 'Like')
+    likes_count = (Like.objects
+                   .filter(recipe=OuterRef('pk'))
+                   .values('recipe')
+                   .annotate(total=Count('id'))
+                   .values('total')[:1])
+    Recipe.objects.update(likes_count=Coalesce(Subquery(likes_count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0006_like_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_likes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-19 02:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0008_comment_recipe_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='ingredient',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='recipe.ingredient'),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='quantity',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='recipe',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='recipe.recipe'),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='unit',
+            field=models.CharField(blank=True, default='', max_length=25),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.15 on 2026-10-19 02:52
+
+from django.db import migrations, models
+
+from recipe.canonical import normalize_name
+
+
+def fill_normalized_name(apps, schema_editor):
+    Ingredient = apps.get_model('recipe', 'Ingredient')
+    ingredients = list(Ingredient.objects.only('id', 'name'))
+    for ingredient in ingredients:
+        ingredient.normalized_name = normalize_name(ingredient.name)
+    Ingredient.objects.bulk_update(ingredients, ['normalized_name'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0010_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='normalized_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_normalized_name, migrations.RunPython.noop),
+    ]
@@ -8,6 +8,27 @@ User = get_user_model()
 
 class Ingredient(models.Model):
     name = models.CharField(max_length=100)
+    # Ключ канонического словаря, см. recipe/canonical.py
+    normalized_name = models.CharField(max_length=100, db_index=True, editable=False, default='')
+
+    def save(self, *args, **kwargs):
+        from .canonical import normalize_name
+
+        self.normalized_name = normalize_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_name'}
+        super().save(*args, **kwargs)
+
+
+class RecipeQuerySet(models.QuerySet):
+    def with_is_liked(self, user):
+        """Добавляет is_liked текущего пользователя одним подзапросом EXISTS."""
+        if user is None or not user.is_authenticated:
+            return self.annotate(is_liked=models.Value(False, output_field=models.BooleanField()))
+        return self.annotate(is_liked=models.Exists(
+            Like.objects.filter(recipe=models.OuterRef('pk'), user=user)
+        ))
 
 
 class Recipe(models.Model):
@@ -22,9 +43,18 @@ class Recipe(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     is_private = models.BooleanField(default=False)
+    likes_count = models.PositiveIntegerField(default=0)
     ingredients = models.ManyToManyField(to='Ingredient',
                                          through="RecipeIngredient")
 
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['author', '-created_at'], name='recipe_author_created_idx'),
+            models.Index(fields=['is_active', 'is_private', '-created_at'], name='recipe_visible_created_idx'),
+        ]
+
 
 class RecipeIngredient(models.Model):
     ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
@@ -43,6 +73,9 @@ class Like(models.Model):
 
     class Meta:
         unique_together = ('recipe', 'user')
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='like_user_created_idx'),
+        ]
 
 
 class SearchHistory(models.Model):
@@ -50,6 +83,11 @@ class SearchHistory(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='search_user_created_idx'),
+        ]
+
 
 class Comment(models.Model):
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
@@ -57,7 +95,70 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     comment_text = models.TextField(max_length=2000)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipe', '-created_at'], name='comment_recipe_created_idx'),
+        ]
+
 
 class Cart(models.Model):
+    """Строка списка покупок.
+
+    Строки, добавленные из рецепта, хранят ингредиент, количество и
+    нормализованную единицу измерения, что позволяет суммировать одинаковые
+    ингредиенты из разных рецептов в одном GROUP BY.
+    """
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    text_recipe_ingredient = models.TextField()
\ No newline at end of file
+    text_recipe_ingredient = models.TextField()
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, null=True, blank=True)
+    recipe = models.ForeignKey(Recipe, on_delete=models.SET_NULL, null=True, blank=True)
+    quantity = models.FloatField(null=True, blank=True)
+    unit = models.CharField(max_length=25, blank=True, default='')
+
+
+class FeedEntry(models.Model):
+    """Запись персональной ленты: рецепт автора, на которого подписан user.
+
+    Заполняется при публикации рецепта (fan-out on write), поэтому чтение
+    ленты — это выборка по индексу (user, created_at) без join'а с Followers.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='feed_entries')
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='feed_entries')
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'recipe')
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='feed_user_created_idx'),
+            models.Index(fields=['user', 'author'], name='feed_user_author_idx'),
+        ]
+
+
+class RecipeSimilarity(models.Model):
+    """
+    Предрасчитанные похожие рецепты: top-k соседей по косинусной близости
+    наборов ингредиентов (см. recipe/similarity.py).
+    """
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='similar_entries')
+    similar = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('recipe', 'similar')
+
+
+class RecipeSimilarityState(models.Model):
+    """Подпись набора ингредиентов, по которой считались соседи рецепта."""
+    recipe = models.OneToOneField(Recipe, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    signature = models.BigIntegerField()
+
+
+class Recommendation(models.Model):
+    """Предрасчитанные рекомендации пользователю по лайкам (см. recipe/recommendations.py)."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='recommendations')
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('user', 'recipe')
@@ -0,0 +1,114 @@
+"""
+Рекомендации рецептов по лайкам (item-item collaborative filtering).
+
+Лайки — бинарная матрица пользователь × рецепт. Близость двух рецептов —
+косинус их столбцов: |общие лайкнувшие| / sqrt(|лайки A| · |лайки B|).
+Для каждого рецепта хранится ITEM_NEIGHBOURS самых близких, а оценка
+рецепта для пользователя — сумма близостей к рецептам, которые он лайкнул.
+
+Списки считаются периодически (manage.py build_recommendations) и хранятся
+в Recommendation по TOP_N на пользователя: в них нет собственных,
+уже лайкнутых, приватных и неактивных рецептов. /recipe/recommended/ читает
+готовый список одним запросом по индексу (user, recipe).
+"""
+import math
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from .export import iter_batches
+from .models import Like, Recipe, Recommendation
+from .similarity import chunks, top_k
+
+TOP_N = 50
+ITEM_NEIGHBOURS = 50
+BLOCK_SIZE = 1000
+# Пользователи с очень большим числом лайков почти ничего не говорят о
+# близости конкретных рецептов, но дают квадратичный вклад в стоимость
+# подсчета совместных лайков — в близость рецептов они не входят
+MAX_USER_LIKES = 500
+
+
+def load_likes(chunk_size=BLOCK_SIZE * 10):
+    """{пользователь: множество лайкнутых рецептов} пачками по id лайка."""
+    user_likes = defaultdict(set)
+    for batch in iter_batches(Like.objects.values('id', 'user_id', 'recipe_id'), chunk_size):
+        for row in batch:
+            user_likes[row['user_id']].add(row['recipe_id'])
+    return user_likes
+
+
+def load_candidates(chunk_size=BLOCK_SIZE * 10):
+    """{id рецепта: id автора} для рецептов, которые можно рекомендовать."""
+    candidates = {}
+    queryset = Recipe.objects.filter(is_active=True, is_private=False).values('id', 'author_id')
+    for batch in iter_batches(queryset, chunk_size):
+        for row in batch:
+            candidates[row['id']] = row['author_id']
+    return candidates
+
+
+def item_neighbours(user_likes, k=ITEM_NEIGHBOURS):
+    """{рецепт: [(рецепт, близость)]} — k самых близких рецептов по совместным лайкам."""
+    item_users = defaultdict(list)
+    for user_id, recipe_ids in user_likes.items():
+        if len(recipe_ids) <= MAX_USER_LIKES:
+            for recipe_id in recipe_ids:
+                item_users[recipe_id].append(user_id)
+
+    neighbours = {}
+    for recipe_id, user_ids in item_users.items():
+        co_likes = Counter()
+        for user_id in user_ids:
+            co_likes.update(user_likes[user_id])
+        del co_likes[recipe_id]
+        neighbours[recipe_id] = top_k({
+            other_id: count / math.sqrt(len(user_ids) * len(item_users[other_id]))
+            for other_id, count in co_likes.items()
+        }, k)
+    return neighbours
+
+
+def recommend(liked, neighbours, candidates, user_id, n=TOP_N):
+    """Top-n рецептов для пользователя с лайками liked."""
+    scores = defaultdict(float)
+    for recipe_id in liked:
+        for other_id, similarity in neighbours.get(recipe_id, ()):
+            scores[other_id] += similarity
+    return top_k({
+        recipe_id: score for recipe_id, score in scores.items()
+        if recipe_id not in liked and candidates.get(recipe_id, user_id) != user_id
+    }, n)
+
+
+def save_recommendations(recommendations):
+    """Заменяет списки рекомендаций пользователей из словаря {пользователь: [(рецепт, оценка)]}."""
+    with transaction.atomic():
+        Recommendation.objects.filter(user_id__in=list(recommendations)).delete()
+        Recommendation.objects.bulk_create(
+            Recommendation(user_id=user_id, recipe_id=recipe_id, score=round(score, 6))
+            for user_id, items in recommendations.items()
+            for recipe_id, score in items
+        )
+
+
+def build_recommendations(n=TOP_N, k=ITEM_NEIGHBOURS, block_size=BLOCK_SIZE):
+    """Пересобирает рекомендации всех пользователей и возвращает статистику."""
+    user_likes = load_likes()
+    candidates = load_candidates()
+    neighbours = item_neighbours(user_likes, k)
+
+    stored_users = set(Recommendation.objects.values_list('user_id', flat=True).distinct())
+    rows = 0
+    for block in chunks(sorted(user_likes), block_size):
+        recommendations = {
+            user_id: recommend(user_likes[user_id], neighbours, candidates, user_id, n)
+            for user_id in block
+        }
+        rows += sum(map(len, recommendations.values()))
+        save_recommendations(recommendations)
+
+    # Пользователи, которые сняли все лайки
+    for block in chunks(sorted(stored_users - set(user_likes)), block_size):
+        Recommendation.objects.filter(user_id__in=block).delete()
+    return {'users': len(user_likes), 'recipes': len(neighbours), 'rows': rows}
@@ -1,12 +1,15 @@
 """Определяет в каком виде приходят и возвращаются данные от клиентов"""
 import json
 
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
 
 import users
+from notifications.notify import notify_likes
+from recipe.canonical import get_or_create_ingredient, normalize_name
+from recipe.likes import is_likeable, refresh_like_counts
 from recipe.models import Recipe, Ingredient, RecipeIngredient, Like, SearchHistory, Comment, Cart
-from users.serializers import UserProfileSerializer
+from users.serializers import UserProfileSerializer, FollowStatusListSerializer
 
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
@@ -31,7 +34,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = '__all__'
-        read_only_fields = ('author', 'created_at', 'updated_at')
+        read_only_fields = ('author', 'created_at', 'updated_at', 'likes_count')
+        list_serializer_class = FollowStatusListSerializer
 
     def validate_ingredients(self, value):
         if isinstance(value, dict):
@@ -67,7 +71,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         """Кастомное представление для вывода"""
         data = dict()
         data['id'] = instance.id
-        data['author'] = UserProfileSerializer(instance.author).data
+        data['author'] = UserProfileSerializer(instance.author, context=self.context).data
         data['ingredients'] = [
             {
                 'ingredient': ri.ingredient.id,
@@ -86,6 +90,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         data['updated_at'] = instance.updated_at
         data['is_active'] = instance.is_active
         data['is_private'] = instance.is_private
+        data['likes_count'] = instance.likes_count
+        data['is_liked'] = getattr(instance, 'is_liked', False)
         return data
 
 
@@ -93,12 +99,14 @@ class IngredientsSerializer(serializers.ModelSerializer):
     """
     Сериализатор для модели Ingredients.
 
-    Обрабатывает основные операции с ингредиентами.
+    Обрабатывает основные операции с ингредиентами. При создании
+    возвращается существующий ингредиент с тем же нормализованным именем,
+    если он есть (self.created == False).
     """
 
     class Meta:
         model = Ingredient
-        fields = '__all__'
+        fields = ('id', 'name')
         extra_kwargs = {
             'name': {
                 'required': True,
@@ -107,6 +115,15 @@ class IngredientsSerializer(serializers.ModelSerializer):
             }
         }
 
+    def validate_name(self, value):
+        if not normalize_name(value):
+            raise serializers.ValidationError("Ingredient name must contain letters or digits")
+        return value
+
+    def create(self, validated_data):
+        ingredient, self.created = get_or_create_ingredient(validated_data['name'])
+        return ingredient
+
 
 class LikesSerializer(serializers.ModelSerializer):
     """
@@ -115,6 +132,9 @@ class LikesSerializer(serializers.ModelSerializer):
     Автоматически устанавливает:
     - Пользователя из запроса
     - Текущую дату создания
+
+    Уникальность пары (user, recipe) проверяет ограничение в БД,
+    а не отдельный SELECT перед вставкой.
     """
     user = serializers.PrimaryKeyRelatedField(read_only=True, default=serializers.CurrentUserDefault())
     recipe = serializers.PrimaryKeyRelatedField(queryset=Recipe.objects.all())
@@ -123,16 +143,37 @@ class LikesSerializer(serializers.ModelSerializer):
         model = Like
         fields = ('id', 'user', 'recipe')
         read_only_fields = ('id', 'user')
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Like.objects.all(),
-                fields=['user', 'recipe']
-            )
-        ]
+        validators = []
+
+    def validate_recipe(self, recipe):
+        # Скрытые и неактивные чужие рецепты для пользователя не существуют
+        if not is_likeable(self.context['request'].user, recipe):
+            raise serializers.ValidationError(f'Invalid pk "{recipe.pk}" - object does not exist.')
+        return recipe
 
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return Like.objects.create(**validated_data)
+        try:
+            with transaction.atomic():
+                like = Like.objects.create(**validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {"non_field_errors": ["The fields user, recipe must make a unique set."]}
+            )
+        refresh_like_counts([like.recipe_id])
+        notify_likes(like.user, [like.recipe_id])
+        return like
+
+
+MAX_BULK_LIKES = 100
+
+
+class BulkLikeSerializer(serializers.Serializer):
+    """Списки id рецептов (не больше MAX_BULK_LIKES в каждом), которым нужно поставить или снять лайк."""
+    like = serializers.ListField(child=serializers.IntegerField(), required=False, default=list,
+                                 max_length=MAX_BULK_LIKES)
+    unlike = serializers.ListField(child=serializers.IntegerField(), required=False, default=list,
+                                   max_length=MAX_BULK_LIKES)
 
 
 class CommentsSerializer(serializers.ModelSerializer):
@@ -150,6 +191,7 @@ class CommentsSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ('recipe', 'created_at', 'comment_text', 'author',)
         read_only_fields = ('created_at',)
+        list_serializer_class = FollowStatusListSerializer
         extra_kwargs = {
             'recipe': {
                 'required': True,
@@ -204,7 +246,8 @@ class CartReadSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Cart
-        fields = ('id', 'user', 'text_recipe_ingredient')
+        fields = ('id', 'user', 'text_recipe_ingredient', 'recipe', 'ingredient', 'quantity', 'unit')
+        read_only_fields = fields
 
 
 class CartWriteSerializer(serializers.ModelSerializer):
@@ -224,14 +267,30 @@ class CartWriteSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
     def update(self, instance, validated_data):
-        instance.text_recipe_ingredient = validated_data.get(
-            'text_recipe_ingredient',
-            instance.text_recipe_ingredient
-        )
+        text = validated_data.get('text_recipe_ingredient', instance.text_recipe_ingredient)
+        if text != instance.text_recipe_ingredient:
+            # Текст правят вручную: строка становится свободным текстом, иначе
+            # сводный список продолжил бы суммировать старое количество
+            instance.ingredient, instance.quantity, instance.unit = None, None, ''
+        instance.text_recipe_ingredient = text
         instance.save()
         return instance
 
 
+class AddRecipeToCartSerializer(serializers.Serializer):
+    """Рецепт, ингредиенты которого добавляются в корзину, и нужное число порций."""
+    recipe = serializers.PrimaryKeyRelatedField(queryset=Recipe.objects.all())
+    servings = serializers.IntegerField(min_value=1, required=False)
+
+
+class AggregatedCartItemSerializer(serializers.Serializer):
+    """Строка сводного списка покупок; у строк со свободным текстом ingredient пустой."""
+    ingredient = serializers.IntegerField(allow_null=True)
+    name = serializers.CharField()
+    quantity = serializers.FloatField(allow_null=True)
+    unit = serializers.CharField(allow_blank=True)
+
+
 class RecipeWithoutAuthorSerializer(serializers.ModelSerializer):
     ingredients = serializers.SerializerMethodField()
     image = serializers.ImageField(required=False, allow_null=True)
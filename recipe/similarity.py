@@ -0,0 +1,212 @@
+"""
+Похожие рецепты по ингредиентам.
+
+Рецепт — разреженный вектор TF-IDF по ингредиентам. Ингредиент либо есть
+в рецепте, либо нет, поэтому tf = 1, а вес ингредиента — его idf:
+ln((1 + N) / (1 + df)) + 1, где df — число рецептов с этим ингредиентом.
+Векторы нормированы по L2, похожесть — их скалярное произведение (косинус).
+
+Соседи считаются офлайн (manage.py build_similar_recipes) пачками по
+BLOCK_SIZE рецептов и хранятся в RecipeSimilarity по TOP_K на рецепт, так
+что запрос похожих рецептов — чтение нескольких строк по индексу.
+Кандидаты в соседи берутся из инвертированного индекса ингредиент ->
+рецепты, а не перебором всех рецептов.
+
+Для каждого рецепта хранится подпись набора ингредиентов и видимости
+(RecipeSimilarityState). При обычном запуске пересчитываются рецепты с
+изменившейся подписью и рецепты, в списки которых измененные рецепты
+попадали или могут попасть: их списки считаются заново по векторам в
+памяти, поэтому выбывший сосед замещается следующим по близости. Списки
+остальных рецептов не трогаются, и их оценки остаются посчитанными по
+прежним idf — их выравнивает полная пересборка (--full).
+"""
+import heapq
+import math
+import zlib
+from collections import defaultdict
+from itertools import islice
+
+from django.db import transaction
+
+from .export import iter_batches
+from .models import Recipe, RecipeIngredient, RecipeSimilarity, RecipeSimilarityState
+
+TOP_K = 20
+BLOCK_SIZE = 1000
+# Ингредиенты из большой доли рецептов (соль, вода) почти не влияют на
+# косинус, но их списки рецептов — основная стоимость подбора кандидатов.
+# Через них кандидаты не ищутся, хотя в оценку найденных кандидатов входят.
+COMMON_INGREDIENT_RATIO = 0.05
+MIN_COMMON_INGREDIENT_DF = 1000
+
+
+def signature(ingredient_ids, is_private):
+    """Меняется при изменении набора ингредиентов или видимости рецепта."""
+    key = f"{int(is_private)}:{','.join(map(str, sorted(ingredient_ids)))}"
+    return zlib.crc32(key.encode())
+
+
+class RecipeVectors:
+    """Нормированные TF-IDF векторы активных рецептов и индекс для подбора кандидатов."""
+
+    def __init__(self, ingredients, private_ids=()):
+        """ingredients — {id рецепта: множество id ингредиентов}."""
+        self.ingredients = ingredients
+        self.private_ids = set(private_ids)
+        df = defaultdict(int)
+        for ingredient_ids in ingredients.values():
+            for ingredient_id in ingredient_ids:
+                df[ingredient_id] += 1
+        total = len(ingredients)
+        idf = {ingredient_id: math.log((1 + total) / (1 + count)) + 1 for ingredient_id, count in df.items()}
+
+        self.vectors = {}
+        for recipe_id, ingredient_ids in ingredients.items():
+            norm = math.sqrt(sum(idf[i] ** 2 for i in ingredient_ids))
+            if norm:
+                self.vectors[recipe_id] = {i: idf[i] / norm for i in ingredient_ids}
+
+        max_df = max(MIN_COMMON_INGREDIENT_DF, COMMON_INGREDIENT_RATIO * total)
+        self.postings = defaultdict(list)
+        for recipe_id, vector in self.vectors.items():
+            for ingredient_id in vector:
+                if df[ingredient_id] <= max_df:
+                    self.postings[ingredient_id].append(recipe_id)
+
+    @classmethod
+    def load(cls, chunk_size=BLOCK_SIZE * 10):
+        """Читает наборы ингредиентов активных рецептов пачками по id."""
+        ingredients = {}
+        private_ids = set()
+        for batch in iter_batches(Recipe.objects.filter(is_active=True).values('id', 'is_private'), chunk_size):
+            for row in batch:
+                ingredients[row['id']] = set()
+                if row['is_private']:
+                    private_ids.add(row['id'])
+        links = RecipeIngredient.objects.filter(recipe__is_active=True).values('id', 'recipe_id', 'ingredient_id')
+        for batch in iter_batches(links, chunk_size):
+            for row in batch:
+                ingredients[row['recipe_id']].add(row['ingredient_id'])
+        return cls(ingredients, private_ids)
+
+    def signatures(self):
+        return {
+            recipe_id: signature(ingredient_ids, recipe_id in self.private_ids)
+            for recipe_id, ingredient_ids in self.ingredients.items()
+        }
+
+    def is_candidate(self, recipe_id):
+        """Приватные рецепты не предлагаются как похожие."""
+        return recipe_id in self.vectors and recipe_id not in self.private_ids
+
+    def scores(self, recipe_id):
+        """Косинусная близость рецепта ко всем рецептам с общими редкими ингредиентами."""
+        vector = self.vectors.get(recipe_id)
+        if not vector:
+            return {}
+        candidates = set()
+        for ingredient_id in vector:
+            candidates.update(self.postings.get(ingredient_id, ()))
+        candidates.discard(recipe_id)
+        scores = {}
+        for candidate in candidates:
+            other = self.vectors[candidate]
+            if len(other) < len(vector):
+                scores[candidate] = sum(weight * vector.get(i, 0.0) for i, weight in other.items())
+            else:
+                scores[candidate] = sum(weight * other.get(i, 0.0) for i, weight in vector.items())
+        return scores
+
+
+def top_k(scores, k):
+    return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+
+
+def save_neighbours(neighbours, signatures=None):
+    """Заменяет списки соседей рецептов; с signatures обновляет и их подписи."""
+    with transaction.atomic():
+        RecipeSimilarity.objects.filter(recipe_id__in=list(neighbours)).delete()
+        RecipeSimilarity.objects.bulk_create(
+            RecipeSimilarity(recipe_id=recipe_id, similar_id=similar_id, score=round(score, 6))
+            for recipe_id, items in neighbours.items()
+            for similar_id, score in items
+        )
+        if signatures is not None:
+            RecipeSimilarityState.objects.bulk_create(
+                [RecipeSimilarityState(recipe_id=recipe_id, signature=signatures[recipe_id])
+                 for recipe_id in neighbours],
+                update_conflicts=True, unique_fields=['recipe'], update_fields=['signature'],
+            )
+
+
+def chunks(items, size):
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def refresh_similar_recipes(full=False, k=TOP_K, block_size=BLOCK_SIZE, vectors=None):
+    """
+    Пересчитывает соседей рецептов и возвращает статистику запуска.
+
+    full=True пересчитывает все рецепты, иначе — только рецепты с
+    изменившейся подписью (и оценки близости к ним в чужих списках).
+    """
+    vectors = vectors or RecipeVectors.load()
+    signatures = vectors.signatures()
+    stored = dict(RecipeSimilarityState.objects.values_list('recipe_id', 'signature'))
+    removed = set(stored) - set(signatures)
+    if full:
+        changed = set(signatures)
+    else:
+        changed = {recipe_id for recipe_id, sig in signatures.items() if stored.get(recipe_id) != sig}
+
+    # Рецепты, в списки которых измененный рецепт может попасть: cos
+    # симметричен, поэтому это его собственные кандидаты
+    related = set()
+    for block in chunks(sorted(changed), block_size):
+        neighbours = {}
+        for recipe_id in block:
+            scores = vectors.scores(recipe_id)
+            neighbours[recipe_id] = top_k(
+                {other_id: score for other_id, score in scores.items() if vectors.is_candidate(other_id)}, k
+            )
+            if not full and vectors.is_candidate(recipe_id):
+                related.update(scores)
+        save_neighbours(neighbours, signatures)
+
+    for block in chunks(sorted(removed), block_size):
+        with transaction.atomic():
+            RecipeSimilarity.objects.filter(recipe_id__in=block).delete()
+            RecipeSimilarityState.objects.filter(recipe_id__in=block).delete()
+    if full:
+        return {'recipes': len(signatures), 'recomputed': len(changed), 'removed': len(removed), 'refreshed': 0}
+
+    # ...и рецепты, в списках которых измененный или удаленный рецепт был
+    touched = changed | removed
+    affected = related
+    for block in chunks(sorted(touched), block_size):
+        affected.update(RecipeSimilarity.objects.filter(similar_id__in=block).values_list('recipe_id', flat=True))
+    affected -= touched
+    affected &= set(signatures)
+
+    # Списки пересчитываются целиком, а не правятся: иначе рецепт, выбывший
+    # из списка, не замещался бы следующим соседом, которого нет в top-k
+    for block in chunks(sorted(affected), block_size):
+        save_neighbours({
+            recipe_id: top_k(
+                {other_id: score for other_id, score in vectors.scores(recipe_id).items()
+                 if vectors.is_candidate(other_id)}, k
+            )
+            for recipe_id in block
+        })
+    return {'recipes': len(signatures), 'recomputed': len(changed), 'removed': len(removed),
+            'refreshed': len(affected)}
+
+
+def get_similar_recipe_ids(recipe, limit):
+    """[(id, близость)] видимых похожих рецептов, самые похожие первыми."""
+    return list(RecipeSimilarity.objects
+                .filter(recipe=recipe, similar__is_active=True, similar__is_private=False)
+                .order_by('-score', 'similar_id')
+                .values_list('similar_id', 'score')[:limit])
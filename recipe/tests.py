@@ -1,10 +1,30 @@
+import json
+import os
+import tempfile
+import tracemalloc
+from io import StringIO
+
+from django.core.management import call_command
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.test import APITestCase, APIClient
 from django.contrib.auth import get_user_model
-from recipe.models import Recipe, Ingredient, RecipeIngredient, Like, Comment, SearchHistory
+from recipe.canonical import TrigramIndex, find_duplicate_groups, normalize_name
+from recipe.facets import get_facets
+from recipe.filters import RecipeFilter
+from recipe.models import (
+    Recipe, Ingredient, RecipeIngredient, Like, Comment, SearchHistory, FeedEntry, Cart,
+    RecipeSimilarity, Recommendation,
+)
+from recipe.recommendations import item_neighbours
+from recipe.serializers import MAX_BULK_LIKES
+from recipe.similarity import RecipeVectors, refresh_similar_recipes
+from users.follows import follow
+from users.models import Followers
 from django.core.cache import cache
+from rest_framework_simplejwt.tokens import RefreshToken
+from asgiref.sync import sync_to_async
 
 User = get_user_model()
 
@@ -23,10 +43,38 @@ LIKES_LIST_URL = reverse('likes_viewset-list')
 def like_detail_url(like_id):
     return reverse('likes_viewset-detail', args=[like_id])
 
+LIKED_RECIPES_URL = reverse('recipe_viewset-liked')
+
+BULK_LIKES_URL = reverse('likes_viewset-bulk')
+
+RECOMMENDED_URL = reverse('recipe_viewset-recommended')
+
+def recipe_similar_url(recipe_id):
+    return reverse('recipe_viewset-similar', args=[recipe_id])
+
+def recipe_like_url(recipe_id):
+    return reverse('recipe_viewset-like', args=[recipe_id])
+
 SEARCH_HISTORY_LIST_URL = reverse('search_viewset-list')
 
 COMMENTS_LIST_URL = reverse('comments_viewset-list')
 
+FEED_URL = reverse('recipe_viewset-feed')
+
+CART_ADD_RECIPE_URL = reverse('cart_viewset-add-recipe')
+
+CART_AGGREGATED_URL = reverse('cart_viewset-aggregated')
+
+ASYNC_RECIPES_LIST_URL = reverse('async-recipe-list')
+
+RECIPES_EXPORT_URL = reverse('recipe_viewset-export')
+
+def async_recipe_detail_url(recipe_id):
+    return reverse('async-recipe-detail', args=[recipe_id])
+
+def follow_url(user_id):
+    return reverse('user_viewset-follow', args=[user_id])
+
 def comment_detail_url(comment_id):
     return reverse('comments_viewset-detail', args=[comment_id])
 
@@ -95,6 +143,89 @@ class IngredientAPITests(APITestCase):
         response = self.client.post(INGREDIENTS_LIST_URL, payload)
         self.assertIn(response.status_code, [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN])
 
+    def test_create_existing_ingredient_returns_canonical(self):
+        """Тест: создание ингредиента с тем же нормализованным именем возвращает существующий"""
+        response = self.client.post(INGREDIENTS_LIST_URL, {'name': '  ПОМИДОР '})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['id'], self.ingredient.id)
+        self.assertEqual(Ingredient.objects.count(), 1)
+
+    def test_create_ingredient_without_letters(self):
+        """Тест: имя ингредиента из одной пунктуации отклоняется"""
+        response = self.client.post(INGREDIENTS_LIST_URL, {'name': '!!!'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class IngredientCanonicalTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='canonical_user', password='password1')
+
+    def create_recipe(self, title, ingredients):
+        recipe = Recipe.objects.create(author=self.user, title=title, description='Описание',
+                                       instructions='Готовить', cooking_time_minutes=10, servings=2)
+        for ingredient in ingredients:
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=ingredient, count=1,
+                                            visible_type_of_count='шт')
+        return recipe
+
+    def test_normalize_name(self):
+        """Тест: регистр, «ё», пунктуация и пробелы не влияют на ключ"""
+        self.assertEqual(normalize_name('  Свёкла,  ВАРЕНАЯ '), 'свекла вареная')
+        self.assertEqual(Ingredient.objects.create(name='Помидор ').normalized_name, 'помидор')
+
+    def test_trigram_index_finds_near_duplicates(self):
+        """Тест: похожие имена находятся, непохожие — нет"""
+        index = TrigramIndex(['помидор', 'помидоры', 'масло сливочное', 'масло оливковое', 'соль'])
+        self.assertEqual([key for key, _ in index.similar('помидор')], ['помидоры'])
+        self.assertEqual(index.similar('масло сливочное'), [])
+        self.assertEqual(index.similar('соль'), [])
+
+    def test_find_duplicate_groups(self):
+        """Тест: в группу попадают совпадающие ключи и похожие имена, канонический — самый старый"""
+        tomato = Ingredient.objects.create(name='Помидор')
+        tomato_lower = Ingredient.objects.create(name='помидор ')
+        tomatoes = Ingredient.objects.create(name='Помидоры')
+        Ingredient.objects.create(name='Огурец')
+        groups = find_duplicate_groups(Ingredient.objects.values_list('id', 'normalized_name'))
+        self.assertEqual(groups, [[tomato.id, tomato_lower.id, tomatoes.id]])
+
+    def test_find_duplicate_groups_does_not_chain(self):
+        """Тест: имя, похожее только на другой дубликат, а не на канонический ключ, в группу не попадает"""
+        pepper = Ingredient.objects.create(name='Перец')
+        black = Ingredient.objects.create(name='Перец черный')
+        Ingredient.objects.create(name='Перец черный молотый')
+        groups = find_duplicate_groups(Ingredient.objects.values_list('id', 'normalized_name'), threshold=0.6)
+        self.assertEqual(groups, [[pepper.id, black.id]])
+
+    def test_merge_repoints_recipe_ingredients(self):
+        """Тест: слияние переносит связи и корзину на канонический ингредиент без нарушения уникальности"""
+        tomato = Ingredient.objects.create(name='Помидор')
+        tomatoes = Ingredient.objects.create(name='Помидоры')
+        cucumber = Ingredient.objects.create(name='Огурец')
+        salad = self.create_recipe('Салат', [tomato, tomatoes, cucumber])
+        sauce = self.create_recipe('Соус', [tomatoes])
+        cart = Cart.objects.create(user=self.user, text_recipe_ingredient='Помидоры', ingredient=tomatoes)
+
+        out = StringIO()
+        call_command('merge_ingredients', stdout=out)
+
+        self.assertIn('Merged 1 duplicates', out.getvalue())
+        self.assertFalse(Ingredient.objects.filter(id=tomatoes.id).exists())
+        self.assertEqual(set(salad.recipeingredient_set.values_list('ingredient_id', flat=True)),
+                         {tomato.id, cucumber.id})
+        self.assertEqual(sauce.recipeingredient_set.get().ingredient_id, tomato.id)
+        cart.refresh_from_db()
+        self.assertEqual(cart.ingredient_id, tomato.id)
+
+    def test_merge_dry_run(self):
+        """Тест: --dry-run только выводит группы"""
+        Ingredient.objects.create(name='Помидор')
+        Ingredient.objects.create(name='Помидоры')
+        out = StringIO()
+        call_command('merge_ingredients', dry_run=True, stdout=out)
+        self.assertIn("'Помидор' <- 'Помидоры'", out.getvalue())
+        self.assertEqual(Ingredient.objects.count(), 2)
+
 
 class RecipeAPITests(APITestCase):
 
@@ -285,6 +416,140 @@ class LikeAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Like.objects.filter(id=like.id).exists())
 
+    def test_list_likes_returns_only_own(self):
+        """Тест: список лайков содержит только лайки текущего пользователя"""
+        Like.objects.create(user=self.user1, recipe=self.recipe)
+        Like.objects.create(user=self.user2, recipe=self.recipe)
+        response = self.client.get(LIKES_LIST_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['user'], self.user1.id)
+
+    def test_recipe_is_liked_flag(self):
+        """Тест: is_liked в списке и деталях рецепта считается для текущего пользователя"""
+        other = Recipe.objects.create(
+            author=self.author, title='Без лайка', description='...',
+            instructions='...', cooking_time_minutes=1, servings=1
+        )
+        Like.objects.create(user=self.user1, recipe=self.recipe)
+        Like.objects.create(user=self.user2, recipe=other)
+
+        response = self.client.get(RECIPES_LIST_URL)
+        flags = {r['id']: r['is_liked'] for r in response.data['results']}
+        self.assertEqual(flags, {self.recipe.id: True, other.id: False})
+
+        response = self.client.get(recipe_detail_url(self.recipe.id))
+        self.assertTrue(response.data['is_liked'])
+
+        self.client.force_authenticate(user=None)
+        response = self.client.get(recipe_detail_url(self.recipe.id))
+        self.assertFalse(response.data['is_liked'])
+
+    def test_liked_recipes_newest_like_first(self):
+        """Тест: понравившиеся рецепты отдаются в порядке лайков, новые первыми"""
+        second = Recipe.objects.create(
+            author=self.author, title='Второй', description='...',
+            instructions='...', cooking_time_minutes=1, servings=1
+        )
+        Like.objects.create(user=self.user1, recipe=second)
+        Like.objects.create(user=self.user1, recipe=self.recipe)
+        Like.objects.create(user=self.user2, recipe=second)
+
+        response = self.client.get(LIKED_RECIPES_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in response.data['results']], [self.recipe.id, second.id])
+        self.assertTrue(all(r['is_liked'] for r in response.data['results']))
+
+    def test_liked_recipes_hide_unpublished(self):
+        """Тест: чужие рецепты, ставшие приватными или неактивными, не попадают в понравившиеся"""
+        hidden = Recipe.objects.create(
+            author=self.author, title='Скрытый', description='...',
+            instructions='...', cooking_time_minutes=1, servings=1
+        )
+        inactive = Recipe.objects.create(
+            author=self.author, title='Неактивный', description='...',
+            instructions='...', cooking_time_minutes=1, servings=1
+        )
+        for recipe in (self.recipe, hidden, inactive):
+            Like.objects.create(user=self.user1, recipe=recipe)
+        Recipe.objects.filter(pk=hidden.pk).update(is_private=True)
+        Recipe.objects.filter(pk=inactive.pk).update(is_active=False)
+
+        response = self.client.get(LIKED_RECIPES_URL)
+        self.assertEqual([r['id'] for r in response.data['results']], [self.recipe.id])
+
+    def test_toggle_like_is_idempotent(self):
+        """Тест: повторный лайк и повторное снятие лайка не меняют результат"""
+        for _ in range(2):
+            response = self.client.post(recipe_like_url(self.recipe.id))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data, {'is_liked': True, 'likes_count': 1})
+        self.assertEqual(Like.objects.filter(user=self.user1, recipe=self.recipe).count(), 1)
+
+        for _ in range(2):
+            response = self.client.delete(recipe_like_url(self.recipe.id))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data, {'is_liked': False, 'likes_count': 0})
+
+    def test_toggle_like_missing_recipe(self):
+        """Тест: лайк несуществующего рецепта"""
+        response = self.client.post(recipe_like_url(self.recipe.id + 100))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_toggle_like_non_numeric_id(self):
+        """Тест: лайк по нечисловому id — 404, а не ошибка сервера"""
+        url = recipe_like_url(self.recipe.id).replace(str(self.recipe.id), 'abc')
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_like_and_unlike(self):
+        """Тест: массовые лайки вставляются без дублей и поддерживают счетчики"""
+        recipes = [self.recipe] + [
+            Recipe.objects.create(author=self.author, title=f'Рецепт {i}', description='...',
+                                  instructions='...', cooking_time_minutes=1, servings=1)
+            for i in range(3)
+        ]
+        Like.objects.create(user=self.user1, recipe=self.recipe)
+        Like.objects.create(user=self.user2, recipe=self.recipe)
+
+        payload = {'like': [r.id for r in recipes] + [recipes[-1].id + 100]}
+        response = self.client.post(BULK_LIKES_URL, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Like.objects.filter(user=self.user1).count(), 4)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.likes_count, 2)
+
+        payload = {'unlike': [self.recipe.id, recipes[1].id]}
+        self.client.post(BULK_LIKES_URL, payload, format='json')
+        self.assertEqual(Like.objects.filter(user=self.user1).count(), 2)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.likes_count, 1)
+
+    def test_cannot_like_unpublished_recipes(self):
+        """Тест: чужие скрытые и неактивные рецепты лайкнуть нельзя, свои — можно"""
+        hidden = Recipe.objects.create(author=self.author, title='Скрытый', description='...', instructions='...',
+                                       cooking_time_minutes=1, servings=1, is_private=True)
+        inactive = Recipe.objects.create(author=self.author, title='Неактивный', description='...',
+                                         instructions='...', cooking_time_minutes=1, servings=1)
+        own = Recipe.objects.create(author=self.user1, title='Свой', description='...', instructions='...',
+                                    cooking_time_minutes=1, servings=1)
+        Recipe.objects.filter(pk__in=[inactive.pk, own.pk]).update(is_active=False)
+
+        response = self.client.post(BULK_LIKES_URL, {'like': [hidden.id, inactive.id, own.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(Like.objects.filter(user=self.user1).values_list('recipe', flat=True)), [own.id])
+        self.assertEqual(self.client.post(recipe_like_url(inactive.id)).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(LIKES_LIST_URL, {'recipe': inactive.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        inactive.refresh_from_db()
+        self.assertEqual(inactive.likes_count, 0)
+
+    def test_bulk_like_limit(self):
+        """Тест: слишком длинный список id в массовых лайках отклоняется"""
+        response = self.client.post(BULK_LIKES_URL, {'like': list(range(1, MAX_BULK_LIKES + 2))}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Like.objects.filter(user=self.user1).exists())
+
     def test_unauthenticated_user_cannot_like(self):
         """Тест: неаутентифицированный пользователь не может лайкать"""
         self.client.force_authenticate(user=None)
@@ -344,13 +609,15 @@ class CommentCreateTest(APITestCase):
 
         response_all = self.client.get(COMMENTS_LIST_URL)
         self.assertEqual(response_all.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response_all.data), 2)
+        self.assertEqual(len(response_all.data['results']), 2)
 
         response_filtered = self.client.get(COMMENTS_LIST_URL, {'recipe': self.recipe.id})
         self.assertEqual(response_filtered.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response_filtered.data), 2)
-        self.assertTrue(any(c['comment_text'] == 'Первый коммент от user2' for c in response_filtered.data))
-        self.assertTrue(any(c['comment_text'] == 'Второй коммент' for c in response_filtered.data))
+        self.assertEqual(len(response_filtered.data['results']), 2)
+        self.assertEqual(
+            [c['comment_text'] for c in response_filtered.data['results']],
+            ['Второй коммент', 'Первый коммент от user2']
+        )
 
     def test_delete_comment_by_author(self):
         """Тест удаления комментария его автором"""
@@ -388,7 +655,29 @@ class CommentCreateTest(APITestCase):
         self.client.force_authenticate(user=self.user1)
         response: Response = self.client.get(COMMENTS_LIST_URL + f"?recipe__id={self.recipe.id}") # noqa
         print()
-        self.assertEqual(response.data[0]['recipe'], self.recipe.id)
+        self.assertEqual(response.data['results'][0]['recipe'], self.recipe.id)
+
+    def test_comments_query_count_is_constant(self):
+        """Тест: страница из 1000 комментариев читается фиксированным числом запросов"""
+        Comment.objects.bulk_create([
+            Comment(author=self.user2 if i % 2 else self.user1, recipe=self.recipe, comment_text=f'Коммент {i}')
+            for i in range(1000)
+        ])
+        url = COMMENTS_LIST_URL + f"?recipe__id={self.recipe.id}&page_size=100"
+
+        seen = 0
+        while url:
+            # комментарии вместе с авторами + статус подписки на авторов страницы
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen += len(response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, 1001)
+
+        self.client.force_authenticate(user=None)
+        with self.assertNumQueries(1):
+            self.client.get(COMMENTS_LIST_URL, {'recipe__id': self.recipe.id, 'page_size': 100})
 
 
 
@@ -445,4 +734,688 @@ class SearchHistoryAPITests(APITestCase):
         self.assertIn(response_post.status_code, [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN])
 
         response_get = self.client.get(SEARCH_HISTORY_LIST_URL)
-        self.assertIn(response_get.status_code, [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN])
\ No newline at end of file
+        self.assertIn(response_get.status_code, [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN])
+
+
+class FeedAPITests(APITestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader', password='password1')
+        self.author = User.objects.create_user(username='feed_author', password='password2')
+        self.stranger = User.objects.create_user(username='stranger', password='password3')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.reader)
+
+    def create_recipe(self, author, title, **kwargs):
+        self.client.force_authenticate(user=author)
+        payload = {
+            'title': title, 'description': '...', 'instructions': '...',
+            'cooking_time_minutes': 5, 'servings': 1, 'ingredients': [],
+        }
+        payload.update(kwargs)
+        response = self.client.post(RECIPES_LIST_URL, payload, format='json')
+        self.client.force_authenticate(user=self.reader)
+        return response
+
+    def test_follow_and_unfollow(self):
+        """Тест подписки и отписки от автора"""
+        response = self.client.post(follow_url(self.author.id))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Followers.objects.filter(user_id=self.reader, author_id=self.author).exists())
+
+        response = self.client.post(follow_url(self.author.id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.delete(follow_url(self.author.id))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Followers.objects.filter(user_id=self.reader, author_id=self.author).exists())
+
+    def test_cannot_follow_self(self):
+        """Тест: нельзя подписаться на самого себя"""
+        response = self.client.post(follow_url(self.reader.id))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_feed_contains_followed_authors_recipes(self):
+        """Тест: в ленту попадают только рецепты авторов из подписок, новые первыми"""
+        self.client.post(follow_url(self.author.id))
+        self.create_recipe(self.author, 'Первый')
+        self.create_recipe(self.author, 'Второй')
+        self.create_recipe(self.author, 'Приватный', is_private=True)
+        self.create_recipe(self.stranger, 'Чужой')
+
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(), 2)
+        response = self.client.get(FEED_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['title'] for r in response.data['results']], ['Второй', 'Первый'])
+
+    def test_feed_cursor_pagination(self):
+        """Тест курсорной пагинации ленты"""
+        self.client.post(follow_url(self.author.id))
+        for i in range(3):
+            self.create_recipe(self.author, f'Рецепт {i}')
+
+        response = self.client.get(FEED_URL, {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([r['title'] for r in response.data['results']], ['Рецепт 0'])
+
+    def test_follow_backfills_and_unfollow_clears_feed(self):
+        """Тест: подписка подтягивает существующие рецепты, отписка убирает их"""
+        self.create_recipe(self.author, 'Старый рецепт')
+        self.client.post(follow_url(self.author.id))
+        response = self.client.get(FEED_URL)
+        self.assertEqual(len(response.data['results']), 1)
+
+        self.client.delete(follow_url(self.author.id))
+        response = self.client.get(FEED_URL)
+        self.assertEqual(len(response.data['results']), 0)
+
+    def test_feed_falls_back_to_fanout_on_read(self):
+        """Тест: рецепты авторов с огромным числом подписчиков читаются без fan-out"""
+        self.client.post(follow_url(self.author.id))
+        with self.settings(FEED_FANOUT_MAX_FOLLOWERS=0):
+            self.create_recipe(self.author, 'Популярный')
+            self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+            response = self.client.get(FEED_URL)
+        self.assertEqual([r['title'] for r in response.data['results']], ['Популярный'])
+
+    def test_feed_merges_materialized_and_pulled_recipes(self):
+        """Тест: лента сливает FeedEntry и рецепты авторов fan-out on read по одному курсору"""
+        self.client.post(follow_url(self.author.id))
+        self.client.post(follow_url(self.stranger.id))
+        self.create_recipe(self.author, 'Первый')
+        with self.settings(FEED_FANOUT_MAX_FOLLOWERS=0):
+            self.create_recipe(self.stranger, 'Второй')
+        self.create_recipe(self.author, 'Третий')
+
+        titles = []
+        with self.settings(FEED_FANOUT_MAX_FOLLOWERS=0):
+            response = self.client.get(FEED_URL, {'page_size': 2})
+            titles += [r['title'] for r in response.data['results']]
+            response = self.client.get(response.data['next'])
+            titles += [r['title'] for r in response.data['results']]
+        self.assertEqual(titles, ['Третий', 'Второй', 'Первый'])
+        self.assertIsNone(response.data['next'])
+
+    def test_feed_invalid_cursor(self):
+        """Тест: неверный курсор ленты — 404"""
+        response = self.client.get(FEED_URL, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_recipe_made_public_reaches_feed(self):
+        """Тест: приватный рецепт попадает в ленту подписчиков, когда его публикуют"""
+        self.client.post(follow_url(self.author.id))
+        recipe_id = self.create_recipe(self.author, 'Черновик', is_private=True).data['data']['id']
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+
+        self.client.force_authenticate(user=self.author)
+        response = self.client.put(recipe_detail_url(recipe_id), {
+            'title': 'Черновик', 'description': '...', 'instructions': '...',
+            'cooking_time_minutes': 5, 'servings': 1, 'ingredients': [], 'is_private': False,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(user=self.reader)
+
+        response = self.client.get(FEED_URL)
+        self.assertEqual([r['title'] for r in response.data['results']], ['Черновик'])
+
+
+class CartAggregationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='shopper', password='password1')
+        self.author = User.objects.create_user(username='cook', password='password2')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.flour = Ingredient.objects.create(name='Мука')
+        self.milk = Ingredient.objects.create(name='Молоко')
+        self.egg = Ingredient.objects.create(name='Яйцо')
+
+        self.pancakes = Recipe.objects.create(author=self.author, title='Блины', description='...',
+                                              instructions='...', cooking_time_minutes=30, servings=2)
+        RecipeIngredient.objects.create(recipe=self.pancakes, ingredient=self.flour, count=400, visible_type_of_count='гр')
+        RecipeIngredient.objects.create(recipe=self.pancakes, ingredient=self.milk, count=0.5, visible_type_of_count='л')
+        RecipeIngredient.objects.create(recipe=self.pancakes, ingredient=self.egg, count=2, visible_type_of_count='шт')
+
+        self.pie = Recipe.objects.create(author=self.author, title='Пирог', description='...',
+                                         instructions='...', cooking_time_minutes=60, servings=4)
+        RecipeIngredient.objects.create(recipe=self.pie, ingredient=self.flour, count=0.8, visible_type_of_count='кг')
+        RecipeIngredient.objects.create(recipe=self.pie, ingredient=self.milk, count=200, visible_type_of_count='мл')
+        RecipeIngredient.objects.create(recipe=self.pie, ingredient=self.egg, count=3, visible_type_of_count='шт.')
+
+    def test_add_recipe_to_cart(self):
+        """Тест: ингредиенты рецепта добавляются в корзину структурированными строками"""
+        response = self.client.post(CART_ADD_RECIPE_URL, {'recipe': self.pancakes.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['data']), 3)
+        flour = Cart.objects.get(user=self.user, ingredient=self.flour)
+        self.assertEqual((flour.quantity, flour.unit), (400, 'г'))
+        self.assertEqual(flour.text_recipe_ingredient, '400г Мука')
+
+    def test_add_recipe_scales_servings(self):
+        """Тест: количества пересчитываются на нужное число порций"""
+        self.client.post(CART_ADD_RECIPE_URL, {'recipe': self.pancakes.id, 'servings': 4}, format='json')
+        self.assertEqual(Cart.objects.get(user=self.user, ingredient=self.egg).quantity, 4)
+
+    def test_aggregated_cart_merges_units(self):
+        """Тест: одинаковые ингредиенты суммируются с приведением единиц, строки без ингредиента не теряются"""
+        self.client.post(CART_ADD_RECIPE_URL, {'recipe': self.pancakes.id}, format='json')
+        self.client.post(CART_ADD_RECIPE_URL, {'recipe': self.pie.id}, format='json')
+        Cart.objects.create(user=self.user, text_recipe_ingredient='Соль по вкусу')
+
+        with self.assertNumQueries(2):
+            response = self.client.get(CART_AGGREGATED_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        items = {item['name']: (item['quantity'], item['unit']) for item in response.data['data']}
+        self.assertEqual(items, {
+            'Мука': (1.2, 'кг'),
+            'Молоко': (700, 'мл'),
+            'Яйцо': (5, 'шт'),
+            'Соль по вкусу': (None, ''),
+        })
+        self.assertIsNone(response.data['data'][-1]['ingredient'])
+
+    def test_edited_line_becomes_free_text(self):
+        """Тест: после правки текста строка из рецепта больше не суммируется по старому количеству"""
+        self.client.post(CART_ADD_RECIPE_URL, {'recipe': self.pancakes.id}, format='json')
+        flour = Cart.objects.get(user=self.user, ingredient=self.flour)
+        response = self.client.patch(reverse('cart_viewset-detail', args=[flour.id]),
+                                     {'text_recipe_ingredient': '1кг Мука'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        flour.refresh_from_db()
+        self.assertEqual((flour.ingredient, flour.quantity, flour.unit), (None, None, ''))
+
+        items = {item['name']: item for item in self.client.get(CART_AGGREGATED_URL).data['data']}
+        self.assertNotIn('Мука', items)
+        self.assertEqual((items['1кг Мука']['ingredient'], items['1кг Мука']['quantity']), (None, None))
+
+    def test_cannot_add_foreign_private_recipe(self):
+        """Тест: чужой приватный рецепт нельзя добавить в корзину"""
+        self.pie.is_private = True
+        self.pie.save()
+        response = self.client.post(CART_ADD_RECIPE_URL, {'recipe': self.pie.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AsyncRecipeReadTests(APITestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='async_reader', password='password1')
+        self.author = User.objects.create_user(username='async_author', password='password2')
+        Followers.objects.create(user_id=self.reader, author_id=self.author)
+        ingredient = Ingredient.objects.create(name='Рис')
+        self.recipes = []
+        for i in range(12):
+            recipe = Recipe.objects.create(
+                author=self.author if i % 2 else self.reader,
+                title=f'Плов {i}', description='...', instructions='...',
+                cooking_time_minutes=40, servings=4
+            )
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=ingredient, count=200, visible_type_of_count='г')
+            self.recipes.append(recipe)
+        Like.objects.create(user=self.reader, recipe=self.recipes[1])
+        self.token = str(RefreshToken.for_user(self.reader).access_token)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.reader)
+
+    def auth_headers(self):
+        return {'Authorization': f'Bearer {self.token}'}
+
+    async def test_async_list_matches_sync_list(self):
+        """Тест: асинхронный список рецептов совпадает с синхронным"""
+        response = await self.async_client.get(ASYNC_RECIPES_LIST_URL, {'page': 2}, headers=self.auth_headers())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sync_data = (await self.sync_get(RECIPES_LIST_URL, {'page': 2})).json()
+        self.assertEqual(response.json()['count'], sync_data['count'])
+        self.assertEqual(response.json()['results'], sync_data['results'])
+
+        results = response.json()['results']
+        self.assertEqual([r['title'] for r in results], ['Плов 10', 'Плов 11'])
+        self.assertTrue(results[1]['author']['is_following'])
+        self.assertIsNotNone(response.json()['previous'])
+
+    async def test_async_list_filters_and_saves_search(self):
+        """Тест: фильтр search работает и запрос попадает в историю поиска"""
+        response = await self.async_client.get(ASYNC_RECIPES_LIST_URL, {'search': 'Плов 3'},
+                                               headers=self.auth_headers())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count'], 12)
+        self.assertTrue(await SearchHistory.objects.filter(user=self.reader, text='Плов 3').aexists())
+
+    async def test_async_detail(self):
+        """Тест: асинхронная карточка рецепта с is_liked и ингредиентами"""
+        recipe = self.recipes[1]
+        response = await self.async_client.get(async_recipe_detail_url(recipe.id), headers=self.auth_headers())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertTrue(data['is_liked'])
+        self.assertEqual(data['ingredients'][0]['name'], 'Рис')
+        sync_response = await self.sync_get(recipe_detail_url(recipe.id))
+        self.assertEqual(data, sync_response.json())
+
+    async def test_async_detail_not_found(self):
+        """Тест: несуществующий рецепт возвращает 404"""
+        response = await self.async_client.get(async_recipe_detail_url(10 ** 6))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_async_invalid_token(self):
+        """Тест: неверный токен возвращает 401"""
+        response = await self.async_client.get(ASYNC_RECIPES_LIST_URL, headers={'Authorization': 'Bearer broken'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_async_anonymous_list(self):
+        """Тест: анонимный пользователь получает список без is_liked и подписок"""
+        response = await self.async_client.get(ASYNC_RECIPES_LIST_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any(r['is_liked'] for r in response.json()['results']))
+
+    async def sync_get(self, url, params=None):
+        from asgiref.sync import sync_to_async
+        return await sync_to_async(self.client.get)(url, params)
+
+
+class RecipeExportTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='export_admin', password='password1', is_staff=True)
+        self.user = User.objects.create_user(username='export_user', password='password2')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def create_recipes(self, count, **kwargs):
+        Recipe.objects.bulk_create(
+            Recipe(author=self.user, title=f'Рецепт {i}', description='Описание', instructions='Готовить',
+                   cooking_time_minutes=10, servings=2, **kwargs)
+            for i in range(count)
+        )
+
+    def read_lines(self, response):
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_export_requires_admin(self):
+        """Тест: выгрузка каталога доступна только администраторам"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(RECIPES_EXPORT_URL)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_public_catalog(self):
+        """Тест: выгружаются только публичные активные рецепты вместе с ингредиентами"""
+        self.create_recipes(3)
+        self.create_recipes(1, is_private=True)
+        self.create_recipes(1, is_active=False)
+        recipe = Recipe.objects.order_by('id').first()
+        RecipeIngredient.objects.create(recipe=recipe, ingredient=Ingredient.objects.create(name='Соль'),
+                                        count=1, visible_type_of_count='щепотка')
+
+        response = self.client.get(RECIPES_EXPORT_URL, HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = self.read_lines(response)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['ingredients'][0]['name'], 'Соль')
+        self.assertEqual(rows[0]['author']['username'], 'export_user')
+
+    def test_export_100k_recipes_with_flat_memory(self):
+        """Тест: выгрузка 100 000 рецептов укладывается в фиксированный объем памяти"""
+        total = 100_000
+        self.create_recipes(total)
+
+        response = self.client.get(RECIPES_EXPORT_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        tracemalloc.start()
+        try:
+            count = 0
+            for chunk in response.streaming_content:
+                count += chunk.count(b'\n')
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(count, total)
+        self.assertLess(peak, 10 * 1024 * 1024)
+
+
+
+class ImportRecipesCommandTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='import_admin', password='password1')
+        self.cook = User.objects.create_user(username='import_cook', password='password2')
+        self.salt = Ingredient.objects.create(name='Соль')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_file(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def jsonl(self, rows):
+        return '\n'.join(row if isinstance(row, str) else json.dumps(row, ensure_ascii=False) for row in rows)
+
+    def recipe_row(self, title, ingredients=(), **kwargs):
+        return {'title': title, 'description': 'Описание', 'instructions': 'Готовить',
+                'cooking_time_minutes': 15, 'servings': 2,
+                'ingredients': [{'name': name, 'count': 100, 'visible_type_of_count': 'г'}
+                                for name in ingredients], **kwargs}
+
+    def import_file(self, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_recipes', path, author='import_admin', stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_jsonl(self):
+        """Тест: импорт JSONL создает рецепты, недостающие ингредиенты и связи"""
+        path = self.write_file('recipes.jsonl', self.jsonl([
+            self.recipe_row('Омлет', ['Яйцо', 'Соль']),
+            self.recipe_row('Пюре', ['Картофель', 'Соль', 'Картофель'], author='import_cook'),
+        ]))
+        out, err = self.import_file(path, batch_size=1)
+
+        self.assertEqual(err, '')
+        self.assertIn('Imported 2 recipes, created 2 ingredients', out)
+        self.assertIn('rows/s', out)
+        omelette = Recipe.objects.get(title='Омлет')
+        self.assertEqual(omelette.author, self.admin)
+        self.assertEqual(set(omelette.ingredients.values_list('name', flat=True)), {'Яйцо', 'Соль'})
+        mash = Recipe.objects.get(title='Пюре')
+        self.assertEqual(mash.author, self.cook)
+        self.assertEqual(mash.recipeingredient_set.count(), 2)
+        self.assertEqual(Ingredient.objects.filter(name='Соль').count(), 1)
+        self.assertEqual(Ingredient.objects.filter(name='Картофель').count(), 1)
+
+    def test_import_fans_out_to_followers(self):
+        """Тест: импортированные рецепты попадают в ленты подписчиков автора"""
+        follow(self.admin, self.cook)
+        path = self.write_file('recipes.jsonl', self.jsonl([self.recipe_row('Каша', author='import_cook')]))
+        self.import_file(path)
+        self.assertEqual(list(FeedEntry.objects.filter(user=self.admin).values_list('recipe__title', flat=True)),
+                         ['Каша'])
+
+    def test_import_matches_normalized_names(self):
+        """Тест: ингредиенты сопоставляются по нормализованному имени"""
+        path = self.write_file('recipes.jsonl', self.jsonl([
+            self.recipe_row('Омлет', ['соль ', 'Свёкла']),
+            self.recipe_row('Винегрет', ['СВЕКЛА']),
+        ]))
+        out, _ = self.import_file(path)
+
+        self.assertIn('created 1 ingredients', out)
+        self.assertEqual(Recipe.objects.get(title='Омлет').recipeingredient_set.filter(ingredient=self.salt).count(), 1)
+        beet = Ingredient.objects.get(normalized_name='свекла')
+        self.assertEqual(beet.name, 'Свёкла')
+        self.assertEqual(beet.recipeingredient_set.count(), 2)
+
+    def test_import_csv(self):
+        """Тест: импорт CSV со списком ингредиентов в JSON-колонке"""
+        path = self.write_file('recipes.csv', (
+            'title,description,instructions,cooking_time_minutes,servings,author,ingredients\n'
+            'Суп,Описание,Варить,40,4,,"[{""name"": ""Соль"", ""count"": 5, ""visible_type_of_count"": ""г""}]"\n'
+        ))
+        self.import_file(path)
+
+        recipe = Recipe.objects.get(title='Суп')
+        self.assertEqual(recipe.cooking_time_minutes, 40)
+        link = recipe.recipeingredient_set.get()
+        self.assertEqual((link.ingredient_id, link.count, link.visible_type_of_count), (self.salt.id, 5, 'г'))
+
+    def test_invalid_rows_are_skipped(self):
+        """Тест: битые строки и неизвестные авторы пропускаются с номером строки в stderr"""
+        path = self.write_file('recipes.jsonl', self.jsonl([
+            self.recipe_row('Омлет'),
+            '{broken',
+            self.recipe_row('Без автора', author='nobody'),
+            {'title': 'Без времени'},
+            self.recipe_row('Пюре'),
+        ]))
+        out, err = self.import_file(path)
+
+        self.assertIn('row 2: invalid JSON', err)
+        self.assertIn("row 3: unknown author 'nobody'", err)
+        self.assertIn('row 4: missing fields', err)
+        self.assertIn('skipped 3 rows', out)
+        self.assertEqual(set(Recipe.objects.values_list('title', flat=True)), {'Омлет', 'Пюре'})
+
+    def test_resume_from_checkpoint(self):
+        """Тест: повторный запуск с чекпоинтом продолжает с первой необработанной строки"""
+        path = self.write_file('recipes.jsonl', self.jsonl(
+            [self.recipe_row(f'Рецепт {i}', ['Соль']) for i in range(5)]
+        ))
+        checkpoint = os.path.join(self.tmpdir.name, 'import.ckpt')
+        with open(checkpoint, 'w') as file:
+            json.dump({'rows': 3}, file)
+
+        out, _ = self.import_file(path, batch_size=2, checkpoint=checkpoint)
+
+        self.assertIn('Resuming after row 3', out)
+        self.assertEqual(sorted(Recipe.objects.values_list('title', flat=True)), ['Рецепт 3', 'Рецепт 4'])
+        with open(checkpoint) as file:
+            self.assertEqual(json.load(file), {'rows': 5})
+
+        out, _ = self.import_file(path, batch_size=2, checkpoint=checkpoint)
+        self.assertIn('Imported 0 recipes', out)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+
+class SimilarRecipesTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='similar_user', password='password1')
+        self.ingredients = [Ingredient.objects.create(name=name) for name in
+                            ('Мука', 'Яйцо', 'Молоко', 'Сахар', 'Картофель', 'Морковь', 'Свекла')]
+
+    def create_recipe(self, title, ingredient_indexes, **kwargs):
+        recipe = Recipe.objects.create(author=self.user, title=title, description='Описание',
+                                       instructions='Готовить', cooking_time_minutes=10, servings=2, **kwargs)
+        self.set_ingredients(recipe, ingredient_indexes)
+        return recipe
+
+    def set_ingredients(self, recipe, ingredient_indexes):
+        recipe.recipeingredient_set.all().delete()
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=self.ingredients[i], count=1, visible_type_of_count='шт')
+            for i in ingredient_indexes
+        )
+
+    def similar_ids(self, recipe):
+        return list(RecipeSimilarity.objects.filter(recipe=recipe).order_by('-score')
+                    .values_list('similar_id', flat=True))
+
+    def test_cosine_scores(self):
+        """Тест: одинаковые наборы дают близость 1, без общих ингредиентов рецепт не кандидат"""
+        vectors = RecipeVectors({1: {1, 2, 3}, 2: {1, 2, 3}, 3: {1, 2}, 4: {5, 6}})
+        scores = vectors.scores(1)
+        self.assertAlmostEqual(scores[2], 1.0)
+        self.assertLess(scores[3], 1.0)
+        self.assertNotIn(4, scores)
+
+    def test_similar_endpoint(self):
+        """Тест: похожие рецепты отдаются по убыванию близости без приватных и неактивных"""
+        pancakes = self.create_recipe('Блины', [0, 1, 2])
+        crepes = self.create_recipe('Блинчики', [0, 1, 2, 3])
+        cake = self.create_recipe('Бисквит', [0, 1, 3])
+        self.create_recipe('Приватные блины', [0, 1, 2], is_private=True)
+        self.create_recipe('Старые блины', [0, 1, 2], is_active=False)
+        self.create_recipe('Винегрет', [4, 5, 6])
+        call_command('build_similar_recipes', stdout=StringIO())
+
+        response = self.client.get(recipe_similar_url(pancakes.id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data], [crepes.id, cake.id])
+        self.assertGreater(response.data[0]['similarity'], response.data[1]['similarity'])
+        self.assertEqual(response.data[0]['title'], 'Блинчики')
+
+        response = self.client.get(recipe_similar_url(pancakes.id), {'limit': 1})
+        self.assertEqual(len(response.data), 1)
+
+    def test_incremental_refresh(self):
+        """Тест: пересчитываются только измененные рецепты, а их близость попадает в чужие списки"""
+        pancakes = self.create_recipe('Блины', [0, 1, 2])
+        crepes = self.create_recipe('Блинчики', [0, 1, 2, 3])
+        salad = self.create_recipe('Винегрет', [4, 5, 6])
+        refresh_similar_recipes()
+        self.assertEqual(self.similar_ids(pancakes), [crepes.id])
+
+        self.set_ingredients(salad, [0, 1, 2])
+        stats = refresh_similar_recipes()
+        self.assertEqual(stats['recomputed'], 1)
+        self.assertEqual(self.similar_ids(salad), [pancakes.id, crepes.id])
+        self.assertEqual(self.similar_ids(pancakes), [salad.id, crepes.id])
+
+        Recipe.objects.filter(id=salad.id).update(is_private=True)
+        refresh_similar_recipes()
+        self.assertEqual(self.similar_ids(pancakes), [crepes.id])
+        self.assertEqual(self.similar_ids(salad), [pancakes.id, crepes.id])
+
+        self.assertEqual(refresh_similar_recipes()['recomputed'], 0)
+
+    def test_incremental_refresh_backfills_dropped_neighbour(self):
+        """Тест: если сосед перестал быть похожим, его место занимает следующий по близости"""
+        pancakes = self.create_recipe('Блины', [0, 1, 2])
+        crepes = self.create_recipe('Блинчики', [0, 1, 2, 3])
+        cake = self.create_recipe('Бисквит', [0, 1, 4])
+        refresh_similar_recipes(k=1)
+        self.assertEqual(self.similar_ids(pancakes), [crepes.id])
+
+        self.set_ingredients(crepes, [5, 6])
+        stats = refresh_similar_recipes(k=1)
+        self.assertEqual(stats['recomputed'], 1)
+        self.assertEqual(self.similar_ids(pancakes), [cake.id])
+
+
+class RecommendationTests(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='rec_alice', password='password1')
+        self.bob = User.objects.create_user(username='rec_bob', password='password2')
+        self.carol = User.objects.create_user(username='rec_carol', password='password3')
+        self.author = User.objects.create_user(username='rec_author', password='password4')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.alice)
+
+    def create_recipe(self, title, author=None, **kwargs):
+        return Recipe.objects.create(author=author or self.author, title=title, description='Описание',
+                                     instructions='Готовить', cooking_time_minutes=10, servings=2, **kwargs)
+
+    def like(self, user, *recipes):
+        Like.objects.bulk_create(Like(user=user, recipe=recipe) for recipe in recipes)
+
+    def test_item_neighbours_cosine(self):
+        """Тест: близость рецептов — косинус по совместным лайкам"""
+        neighbours = item_neighbours({1: {10, 20}, 2: {10, 20}, 3: {10, 30}})
+        self.assertEqual(neighbours[20][0][0], 10)
+        self.assertAlmostEqual(neighbours[20][0][1], 2 / (3 * 2) ** 0.5)
+        self.assertNotIn(30, dict(neighbours[20]))
+
+    def test_recommended_endpoint(self):
+        """Тест: рекомендации без своих, лайкнутых, приватных и неактивных рецептов"""
+        soup, salad, pie, cake = (self.create_recipe(title) for title in ('Суп', 'Салат', 'Пирог', 'Торт'))
+        own = self.create_recipe('Свой рецепт', author=self.alice)
+        hidden = self.create_recipe('Приватный', is_private=True)
+        inactive = self.create_recipe('Неактивный', is_active=False)
+        self.like(self.alice, soup, salad)
+        self.like(self.bob, soup, salad, pie, own, hidden, inactive)
+        self.like(self.carol, salad, pie, cake)
+
+        out = StringIO()
+        call_command('build_recommendations', stdout=out)
+        self.assertIn('recommendations for 3 users', out.getvalue())
+
+        response = self.client.get(RECOMMENDED_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['results']], [pie.id, cake.id])
+        self.assertFalse(Recommendation.objects.filter(user=self.alice, recipe__in=[own, hidden, inactive]).exists())
+
+        # Лайк после расчета сразу убирает рецепт из выдачи
+        self.like(self.alice, pie)
+        response = self.client.get(RECOMMENDED_URL)
+        self.assertEqual([item['id'] for item in response.data['results']], [cake.id])
+
+    def test_recommendations_removed_without_likes(self):
+        """Тест: у пользователя без лайков при пересборке не остается рекомендаций"""
+        soup, salad = self.create_recipe('Суп'), self.create_recipe('Салат')
+        self.like(self.alice, soup)
+        self.like(self.bob, soup, salad)
+        call_command('build_recommendations', stdout=StringIO())
+        self.assertTrue(Recommendation.objects.filter(user=self.alice).exists())
+
+        Like.objects.filter(user=self.alice).delete()
+        call_command('build_recommendations', stdout=StringIO())
+        self.assertFalse(Recommendation.objects.filter(user=self.alice).exists())
+
+    def test_recommended_requires_authentication(self):
+        """Тест: рекомендации доступны только аутентифицированным пользователям"""
+        self.client.force_authenticate(user=None)
+        response = self.client.get(RECOMMENDED_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class RecipeFacetedFilterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='facet_user', password='password1')
+        self.client = APIClient()
+        self.rice, self.chicken, self.carrot = (Ingredient.objects.create(name=name)
+                                                for name in ('Рис', 'Курица', 'Морковь'))
+        self.pilaf = self.create_recipe('Плов', 90, 6, [self.rice, self.chicken, self.carrot], likes_count=5)
+        self.porridge = self.create_recipe('Каша', 20, 2, [self.rice], likes_count=1)
+        self.salad = self.create_recipe('Салат', 10, 2, [self.carrot], likes_count=9)
+        self.roast = self.create_recipe('Курица в духовке', 150, 4, [self.chicken, self.carrot], likes_count=5)
+
+    def create_recipe(self, title, cooking_time, servings, ingredients, **kwargs):
+        recipe = Recipe.objects.create(author=self.user, title=title, description='Описание',
+                                       instructions='Готовить', cooking_time_minutes=cooking_time,
+                                       servings=servings, **kwargs)
+        for ingredient in ingredients:
+            RecipeIngredient.objects.create(recipe=recipe, ingredient=ingredient, count=1,
+                                            visible_type_of_count='шт')
+        return recipe
+
+    def ids(self, params):
+        response = self.client.get(RECIPES_LIST_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in response.data['results']]
+
+    def test_range_filters(self):
+        """Тест: фильтры по диапазонам времени приготовления и числа порций"""
+        self.assertEqual(set(self.ids({'cooking_time_min': 15, 'cooking_time_max': 90})),
+                         {self.pilaf.id, self.porridge.id})
+        self.assertEqual(set(self.ids({'servings_min': 4})), {self.pilaf.id, self.roast.id})
+
+    def test_ingredient_include_exclude(self):
+        """Тест: рецепты со всеми нужными ингредиентами и без исключенных"""
+        self.assertEqual(set(self.ids({'ingredients': f'{self.chicken.id},{self.carrot.id}'})),
+                         {self.pilaf.id, self.roast.id})
+        self.assertEqual(set(self.ids({'exclude_ingredients': f'{self.rice.id}'})),
+                         {self.salad.id, self.roast.id})
+        response = self.client.get(RECIPES_LIST_URL, {'ingredients': ','.join(map(str, range(1, 12)))})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ordering(self):
+        """Тест: сортировка по популярности и по новизне, при равенстве новые первыми"""
+        self.assertEqual(self.ids({'ordering': '-likes_count'}),
+                         [self.salad.id, self.roast.id, self.pilaf.id, self.porridge.id])
+        self.assertEqual(self.ids({'ordering': '-created_at'}),
+                         [self.roast.id, self.salad.id, self.porridge.id, self.pilaf.id])
+
+    def test_facets_for_filtered_result_set(self):
+        """Тест: фасеты считаются по всей отфильтрованной выборке фиксированным числом запросов"""
+        params = {'exclude_ingredients': f'{self.rice.id}', 'page_size': 1}
+        with self.assertNumQueries(2):
+            get_facets(RecipeFilter(params, queryset=Recipe.objects.all()).qs)
+
+        response = self.client.get(RECIPES_LIST_URL, {**params, 'facets': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        facets = response.data['facets']
+        self.assertEqual([bucket['count'] for bucket in facets['cooking_time']], [1, 0, 0, 0, 1])
+        self.assertEqual(facets['cooking_time'][4], {'min': 121, 'max': None, 'count': 1})
+        self.assertEqual([bucket['count'] for bucket in facets['servings']], [1, 1, 0, 0])
+        self.assertEqual(facets['ingredients'][0], {'id': self.carrot.id, 'name': 'Морковь', 'count': 2})
+        self.assertEqual(len(facets['ingredients']), 2)
+
+        self.assertNotIn('facets', self.client.get(RECIPES_LIST_URL).data)
+
+    async def test_async_list_facets(self):
+        """Тест: асинхронный список отдает те же фасеты, что и синхронный"""
+        params = {'servings_max': 4, 'facets': '1'}
+        response = await self.async_client.get(ASYNC_RECIPES_LIST_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sync_response = await sync_to_async(self.client.get)(RECIPES_LIST_URL, params)
+        self.assertEqual(response.json()['facets'], sync_response.json()['facets'])
+        self.assertEqual(response.json()['count'], 3)
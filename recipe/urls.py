@@ -1,6 +1,7 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from recipe import views
+from recipe import async_views, views
 # from recipe.utils import CacheRouter
 
 # router = CacheRouter()
@@ -18,3 +19,9 @@ router.register('search_history', views.SearchHistoryViewSet, basename='search_v
 router.register('comments', views.CommentsViewSet, basename='comments_viewset')
 
 router.register('cart', views.CartViewSet, basename='cart_viewset')
+
+# Асинхронные endpoints чтения для запуска под ASGI
+async_urlpatterns = [
+    path('recipe/', async_views.recipe_list, name='async-recipe-list'),
+    path('recipe/<int:pk>/', async_views.recipe_detail, name='async-recipe-detail'),
+]
@@ -12,27 +12,45 @@ API endpoints для работы с рецептами и связанными
 Все endpoints поддерживают стандартные CRUD операции
 и дополнительные кастомные действия.
 """
+import binascii
+from base64 import b64decode, b64encode
+from datetime import datetime
+
+from django.db.models import F, Q, Value
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
 from django_filters.rest_framework import DjangoFilterBackend
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import viewsets, status
-from rest_framework.exceptions import PermissionDenied
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.pagination import BasePagination, PageNumberPagination, CursorPagination
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
-
+from rest_framework.utils.urls import replace_query_param
+
+from baseAPI.renderers import ORJSONParser, ORJSONRenderer, NDJSONRenderer
+from notifications.notify import notify_comment
+from .cart import add_recipe_to_cart, get_aggregated_cart
+from .export import export_catalog_response
+from .facets import get_facets, wants_facets
+from .feed import fan_out_recipe, get_feed_page, is_published
 from .filters import RecipeFilter
+from .likes import like_recipes, unlike_recipes
 from .models import Recipe, Like, Ingredient, RecipeIngredient, SearchHistory, Comment, Cart
 from .permissions import IsAuthorOrReadOnly
+from .similarity import TOP_K, get_similar_recipe_ids
 from .serializers import (
     RecipeSerializer,
     IngredientsSerializer,
     RecipeIngredientSerializer,
     LikesSerializer,
+    BulkLikeSerializer,
     SearchHistorySerializer,
-    CommentsSerializer, CartReadSerializer, CartWriteSerializer
+    CommentsSerializer, CartReadSerializer, CartWriteSerializer,
+    AddRecipeToCartSerializer, AggregatedCartItemSerializer
 )
 
 
@@ -42,6 +60,60 @@ class RecipePagination(PageNumberPagination):
     max_page_size = 50
 
 
+class FeedPagination(BasePagination):
+    """
+    Keyset-пагинация ленты по (created_at, id) рецепта, только вперед.
+
+    Страницу выбирает recipe.feed.get_feed_page; курсор — base64 от ключа
+    последнего рецепта страницы.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_feed(self, request, user):
+        self.request = request
+        key = self.decode_cursor(request)
+        page, self.next_key = get_feed_page(user, key, self.get_page_size(request))
+        return page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            created_at, recipe_id = b64decode(encoded.encode('ascii')).decode('ascii').split('|')
+            return datetime.fromisoformat(created_at), int(recipe_id)
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_key is None:
+            return None
+        created_at, recipe_id = self.next_key
+        cursor = b64encode(f'{created_at.isoformat()}|{recipe_id}'.encode('ascii')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'previous': None, 'results': data})
+
+
+class CommentPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
 @method_decorator(never_cache, name='dispatch')
 class RecipeViewSet(viewsets.ModelViewSet):
     """
@@ -61,11 +133,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
     serializer_class = RecipeSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     pagination_class = RecipePagination
-    parser_classes = [JSONParser, MultiPartParser, FormParser]
+    parser_classes = [ORJSONParser, MultiPartParser, FormParser]
     http_method_names = ['get', 'post', 'put', 'delete']
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        """Добавляет к рецептам признак is_liked для текущего пользователя"""
+        return self.queryset.with_is_liked(self.request.user).select_related('author__stats')
+
     @swagger_auto_schema(
         operation_description="Создание нового рецепта",
         responses={
@@ -82,6 +158,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         # print(request.data['ingredients'])
         serializer.is_valid(raise_exception=True)
         serializer.save(author=request.user)
+        fan_out_recipe(serializer.instance)
 
         return Response(
             {
@@ -111,22 +188,152 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        self.perform_update(serializer)
 
         return Response(serializer.data)
 
+    def perform_update(self, serializer):
+        """Рассылает рецепт по лентам, если он стал опубликованным (из приватного или неактивного)"""
+        was_published = is_published(serializer.instance)
+        recipe = serializer.save()
+        if not was_published and is_published(recipe):
+            fan_out_recipe(recipe)
+
     def perform_destroy(self, instance):
         if instance.author != self.request.user:
             raise PermissionDenied("Вы не можете удалить чужой рецепт")
         instance.delete()
 
+    @swagger_auto_schema(
+        manual_parameters=[openapi.Parameter(
+            'facets', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN,
+            description="Добавить в ответ facets: число рецептов выборки по диапазонам времени "
+                        "приготовления и порций и самые частые ингредиенты"
+        )]
+    )
     def list(self, request, *args, **kwargs):
         if request.user.is_authenticated and (text := request.query_params.get("search")):
             last_search = SearchHistory.objects.filter(user__id=request.user.id).last()
             if last_search is None or (last_search.text != text):
                 search = SearchHistory(text=text, user=request.user)
                 search.save()
-        return super().list(request, args, kwargs)
+        response = super().list(request, args, kwargs)
+        if wants_facets(request.query_params):
+            # Фасеты по всей отфильтрованной выборке, а не только по странице
+            response.data['facets'] = get_facets(self.filter_queryset(self.queryset))
+        return response
+
+    @swagger_auto_schema(
+        operation_description="Лента рецептов от авторов, на которых подписан пользователь",
+        responses={200: RecipeSerializer(many=True)}
+    )
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated],
+            pagination_class=FeedPagination, filter_backends=[])
+    def feed(self, request):
+        """Возвращает ленту подписок с курсорной пагинацией, новые рецепты первыми"""
+        page = self.paginator.paginate_feed(request, request.user)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @swagger_auto_schema(
+        operation_description="Потоковая выгрузка всех публичных рецептов в NDJSON (только для администраторов)",
+        responses={200: "application/x-ndjson, один рецепт на строку"}
+    )
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser], filter_backends=[],
+            pagination_class=None, renderer_classes=[ORJSONRenderer, NDJSONRenderer])
+    def export(self, request):
+        """Выгружает каталог одним потоком без пагинации"""
+        return export_catalog_response()
+
+    @swagger_auto_schema(
+        methods=['post', 'delete'],
+        operation_description="Идемпотентно ставит (POST) или снимает (DELETE) лайк с рецепта",
+        request_body=None
+    )
+    @action(detail=True, methods=['post', 'delete'], permission_classes=[IsAuthenticated])
+    def like(self, request, pk=None):
+        """Лайк по id рецепта без предварительной проверки существующего лайка"""
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            return Response({"message": "Recipe not found"}, status=status.HTTP_404_NOT_FOUND)
+        if request.method == 'DELETE':
+            recipe_ids = unlike_recipes(request.user, [recipe_id])
+        else:
+            recipe_ids = like_recipes(request.user, [recipe_id])
+        if not recipe_ids:
+            return Response({"message": "Recipe not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        likes_count = Recipe.objects.filter(pk=recipe_ids[0]).values_list('likes_count', flat=True).first()
+        if likes_count is None:
+            return Response({"message": "Recipe not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(
+            {"is_liked": request.method != 'DELETE', "likes_count": likes_count},
+            status=status.HTTP_200_OK
+        )
+
+    @swagger_auto_schema(
+        operation_description="Рецепты, которые понравились текущему пользователю",
+        responses={200: RecipeSerializer(many=True)}
+    )
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated], filter_backends=[])
+    def liked(self, request):
+        """Возвращает понравившиеся рецепты, последние лайки первыми (чужие — только опубликованные)"""
+        queryset = (Recipe.objects
+                    .filter(Q(is_private=False, is_active=True) | Q(author=request.user), like__user=request.user)
+                    .annotate(liked_at=F('like__created_at'), is_liked=Value(True))
+                    .select_related('author__stats')
+                    .prefetch_related('recipeingredient_set__ingredient')
+                    .order_by('-liked_at', '-id'))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @swagger_auto_schema(
+        operation_description="Рекомендации текущему пользователю по лайкам (предрасчитанные), "
+                              "самые подходящие первыми",
+        responses={200: RecipeSerializer(many=True)}
+    )
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated], filter_backends=[])
+    def recommended(self, request):
+        """Возвращает готовый список рекомендаций без рецептов, лайкнутых после его расчета"""
+        queryset = (Recipe.objects
+                    .filter(recommendations__user=request.user, is_active=True, is_private=False)
+                    .exclude(like__user=request.user)
+                    .annotate(recommendation_score=F('recommendations__score'), is_liked=Value(False))
+                    .select_related('author__stats')
+                    .prefetch_related('recipeingredient_set__ingredient')
+                    .order_by('-recommendation_score', 'id'))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @swagger_auto_schema(
+        operation_description="Рецепты, похожие на данный по набору ингредиентов (предрасчитанные)",
+        manual_parameters=[openapi.Parameter(
+            'limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+            description=f"Сколько рецептов вернуть (по умолчанию 10, максимум {TOP_K})"
+        )],
+        responses={200: RecipeSerializer(many=True)}
+    )
+    @action(detail=True, methods=['get'], filter_backends=[], pagination_class=None)
+    def similar(self, request, pk=None):
+        """Возвращает похожие рецепты с оценкой близости similarity, самые похожие первыми"""
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), TOP_K)
+        except ValueError:
+            return Response({"message": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        recipe = self.get_object()
+        neighbours = get_similar_recipe_ids(recipe, limit)
+        recipes = {r.id: r for r in (self.get_queryset()
+                                     .filter(id__in=[recipe_id for recipe_id, _ in neighbours])
+                                     .prefetch_related('recipeingredient_set__ingredient'))}
+        ordered = [(recipes[recipe_id], score) for recipe_id, score in neighbours if recipe_id in recipes]
+        data = self.get_serializer([similar for similar, _ in ordered], many=True).data
+        for item, (_, score) in zip(data, ordered):
+            item['similarity'] = score
+        return Response(data)
 
 
 @method_decorator(never_cache, name='dispatch')
@@ -144,18 +351,28 @@ class IngredientsViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     @swagger_auto_schema(
-        operation_description="Создание нового ингредиента",
+        operation_description="Создание нового ингредиента. Если ингредиент с таким же "
+                              "нормализованным именем уже есть, возвращается он",
         responses={
+            200: "Ингредиент уже существует",
             201: "Ингредиент успешно создан",
             400: "Неверные входные данные"
         }
     )
     def create(self, request, *args, **kwargs):
-        """Создает новый ингредиент"""
+        """Создает новый ингредиент или возвращает существующий канонический"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
 
+        if not serializer.created:
+            return Response(
+                {
+                    "message": "Ingredient already exists",
+                    "data": serializer.data
+                },
+                status=status.HTTP_200_OK
+            )
         return Response(
             {
                 "message": "Ingredient created successfully",
@@ -217,6 +434,15 @@ class LikesViewSet(viewsets.ModelViewSet):
     queryset = Like.objects.all()
     serializer_class = LikesSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipePagination
+
+    def get_queryset(self):
+        """
+        Возвращает только лайки текущего пользователя, новые первыми.
+        """
+        if not self.request.user.is_authenticated:
+            return self.queryset.none()
+        return self.queryset.filter(user=self.request.user).order_by('-created_at', '-id')
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -231,6 +457,22 @@ class LikesViewSet(viewsets.ModelViewSet):
             status=status.HTTP_201_CREATED
         )
 
+    def perform_destroy(self, instance):
+        unlike_recipes(self.request.user, [instance.recipe_id])
+
+    @swagger_auto_schema(
+        operation_description="Массовая установка и снятие лайков по id рецептов",
+        request_body=BulkLikeSerializer
+    )
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Ставит лайки на рецепты из like и снимает с рецептов из unlike"""
+        serializer = BulkLikeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        liked = like_recipes(request.user, serializer.validated_data['like'])
+        unliked = unlike_recipes(request.user, serializer.validated_data['unlike'])
+        return Response({"liked": liked, "unliked": unliked}, status=status.HTTP_200_OK)
+
 
 @method_decorator(never_cache, name='dispatch')
 class SearchHistoryViewSet(viewsets.ModelViewSet):
@@ -253,6 +495,7 @@ class SearchHistoryViewSet(viewsets.ModelViewSet):
         if self.request.user.is_authenticated:
             return (self.queryset
                     .filter(user=self.request.user.id)
+                    .select_related('user__stats')
                     .order_by('-created_at'))[:5]
 
     def create(self, request, *args, **kwargs):
@@ -275,18 +518,20 @@ class CommentsViewSet(viewsets.ModelViewSet):
     ViewSet для работы с комментариями к рецептам.
 
     Позволяет:
-    - Просматривать комментарии
+    - Просматривать комментарии (новые первыми, курсорная пагинация)
     - Оставлять новые комментарии
     - Удалять/редактировать свои комментарии
     """
     serializer_class = CommentsSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    queryset = Comment.objects.all()
+    queryset = Comment.objects.select_related('author__stats')
+    pagination_class = CommentPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['recipe__id']
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        comment = serializer.save(author=self.request.user)
+        notify_comment(comment)
 
     def perform_destroy(self, instance):
         if instance.author != self.request.user:
@@ -300,6 +545,8 @@ class CartViewSet(viewsets.ModelViewSet):
     GET (list/retrieve) — возвращает все записи корзины текущего пользователя
       без тела запроса.
     POST/PUT/PATCH — CRUD по полю text_recipe_ingredient.
+    POST add_recipe — добавляет все ингредиенты рецепта структурированными строками.
+    GET aggregated — сводный список покупок с суммированием по ингредиентам.
     """
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
@@ -307,7 +554,7 @@ class CartViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         if self.request.user.is_authenticated:
-            return Cart.objects.filter(user=self.request.user)
+            return Cart.objects.filter(user=self.request.user).select_related('user__stats')
         else:
             return Cart.objects.none()
 
@@ -392,3 +639,37 @@ class CartViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         self.get_object().delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @swagger_auto_schema(
+        request_body=AddRecipeToCartSerializer,
+        responses={
+            201: CartReadSerializer(many=True)
+        })
+    @action(detail=False, methods=['post'])
+    def add_recipe(self, request):
+        """
+        Добавляет в корзину все ингредиенты рецепта структурированными строками
+        (ингредиент, количество, единица измерения).
+        """
+        serializer = AddRecipeToCartSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe = serializer.validated_data['recipe']
+        if recipe.is_private and recipe.author_id != request.user.id:
+            return Response({"message": "Recipe not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        items = add_recipe_to_cart(request.user, recipe, serializer.validated_data.get('servings'))
+        read_ser = CartReadSerializer(items, many=True, context={'request': request})
+        return Response({'data': read_ser.data}, status=status.HTTP_201_CREATED)
+
+    @swagger_auto_schema(
+        request_body=None,
+        responses={
+            200: AggregatedCartItemSerializer(many=True)
+        })
+    @action(detail=False, methods=['get'])
+    def aggregated(self, request):
+        """
+        Сводный список покупок: одинаковые ингредиенты из разных рецептов
+        суммируются с приведением единиц (г/кг, мл/л, шт).
+        """
+        return Response({'data': get_aggregated_cart(request.user)})
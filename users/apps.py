@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        # baseAPI не приложение: закрепление пользователей за основной базой проверяется здесь
+        from baseAPI.checks import check_replica_pin_cache
+
+        checks.register(check_replica_pin_cache, checks.Tags.caches, deploy=True)
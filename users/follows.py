@@ -0,0 +1,61 @@
+"""
+Подписки пользователей на авторов.
+
+Счетчики followers_count/following_count на CustomUser денормализованы и
+обновляются атомарно (через F-выражения) в одной транзакции с изменением
+Followers, поэтому их можно отдавать в списках без агрегаций.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from notifications.notify import notify_follow
+from .models import CustomUser, Followers
+
+
+def follow(user, author):
+    """Подписывает user на author. Возвращает True, если подписка создана."""
+    with transaction.atomic():
+        _, created = Followers.objects.get_or_create(user_id=user, author_id=author)
+        if created:
+            CustomUser.objects.filter(pk=user.pk).update(following_count=F('following_count') + 1)
+            CustomUser.objects.filter(pk=author.pk).update(followers_count=F('followers_count') + 1)
+            notify_follow(user, author)
+    return created
+
+
+def unfollow(user, author):
+    """Отписывает user от author. Возвращает True, если подписка была."""
+    with transaction.atomic():
+        deleted, _ = Followers.objects.filter(user_id=user, author_id=author).delete()
+        if deleted:
+            CustomUser.objects.filter(pk=user.pk).update(following_count=F('following_count') - 1)
+            CustomUser.objects.filter(pk=author.pk).update(followers_count=F('followers_count') - 1)
+    return bool(deleted)
+
+
+def get_following_ids(user, author_ids):
+    """Одним запросом возвращает множество id авторов из author_ids, на которых подписан user."""
+    if user is None or not user.is_authenticated:
+        return set()
+    author_ids = {author_id for author_id in author_ids if author_id is not None}
+    if not author_ids:
+        return set()
+    return set(
+        Followers.objects
+        .filter(user_id=user, author_id__in=author_ids)
+        .values_list('author_id', flat=True)
+    )
+
+
+async def aget_following_ids(user, author_ids):
+    """Асинхронный вариант get_following_ids для async view."""
+    if user is None or not user.is_authenticated:
+        return set()
+    author_ids = {author_id for author_id in author_ids if author_id is not None}
+    if not author_ids:
+        return set()
+    return {
+        author_id async for author_id in Followers.objects
+        .filter(user_id=user, author_id__in=author_ids)
+        .values_list('author_id', flat=True)
+    }
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.15 on 2026-10-19 02:22
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_follow_counters(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    Followers = apps.get_model('users', 'Followers')
+
+    def count_of(field):
+        return Coalesce(Subquery(
+            Followers.objects
+            .filter(**{field: OuterRef('pk')})
+            .values(field)
+            .annotate(total=Count('id'))
+            .values('total')[:1]
+        ), 0)
+
+    CustomUser.objects.update(
+        followers_count=count_of('author_id'),
+        following_count=count_of('user_id'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_follow_counters, migrations.RunPython.noop),
+    ]
@@ -8,6 +8,8 @@ class CustomUser(AbstractUser):
     bio = models.TextField(max_length=500, blank=True)
     profile_picture = models.ImageField()
     registered_on = models.DateTimeField(auto_now_add=True)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
 
 
 class Followers(models.Model):
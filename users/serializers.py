@@ -1,6 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.db import models
 from rest_framework import serializers
 
+from profiles.stats import get_author_stats
+from .follows import get_following_ids
+
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     class Meta:
@@ -32,7 +36,59 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['username', 'email', 'password', 'bio', 'profile_picture']
 
 
+class FollowStatusListSerializer(serializers.ListSerializer):
+    """
+    Список, который перед сериализацией одним запросом определяет,
+    на каких авторов страницы подписан текущий пользователь.
+
+    Результат накапливается в context['following_ids'] и используется
+    вложенными UserProfileSerializer вместо запроса на каждую строку.
+    Атрибут с id автора задается в Meta дочернего сериализатора через
+    follow_status_author_field.
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        author_field = getattr(self.child.Meta, 'follow_status_author_field', 'author_id')
+        prefetch_follow_status(self.context, [getattr(item, author_field) for item in items])
+        return super().to_representation(items)
+
+
+def prefetch_follow_status(context, author_ids):
+    """Дополняет context статусом подписки на author_ids (не более одного запроса)."""
+    request = context.get('request')
+    checked = context.setdefault('follow_status_checked_ids', set())
+    following = context.setdefault('following_ids', set())
+    unchecked = set(author_ids) - checked
+    if unchecked:
+        following |= get_following_ids(getattr(request, 'user', None), unchecked)
+        checked |= unchecked
+    return following
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
+    """
+    Автор в выдаче. stats берется из AuthorStats — чтобы не было запроса на
+    строку, пользователи загружаются с select_related('stats')
+    (авторы рецептов — select_related('author__stats')).
+    """
+    is_following = serializers.SerializerMethodField()
+    stats = serializers.SerializerMethodField()
+
     class Meta:
         model = get_user_model()
-        fields = ['id', 'username', 'email', 'bio', 'profile_picture']
\ No newline at end of file
+        fields = ['id', 'username', 'email', 'bio', 'profile_picture',
+                  'followers_count', 'following_count', 'is_following', 'stats']
+        read_only_fields = ['followers_count', 'following_count']
+        list_serializer_class = FollowStatusListSerializer
+        follow_status_author_field = 'id'
+
+    def get_is_following(self, obj) -> bool:
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated or user.id == obj.id:
+            return False
+        return obj.id in prefetch_follow_status(self.context, [obj.id])
+
+    def get_stats(self, obj) -> dict:
+        return get_author_stats(obj)
\ No newline at end of file
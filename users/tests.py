@@ -1,3 +1,108 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
 
-# Create your tests here.
+from recipe.models import Recipe, Comment
+from users.views import MAX_FOLLOW_STATUS_IDS
+
+User = get_user_model()
+
+FOLLOW_STATUS_URL = reverse('user_viewset-follow-status')
+
+RECIPES_LIST_URL = reverse('recipe_viewset-list')
+
+COMMENTS_LIST_URL = reverse('comments_viewset-list')
+
+def follow_url(user_id):
+    return reverse('user_viewset-follow', args=[user_id])
+
+
+class FollowAPITests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='follower', password='password1')
+        self.authors = [
+            User.objects.create_user(username=f'author{i}', password='password2')
+            for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_follow_updates_counters(self):
+        """Тест: подписка и отписка атомарно меняют счетчики"""
+        self.client.post(follow_url(self.authors[0].id))
+        self.client.post(follow_url(self.authors[0].id))
+        self.user.refresh_from_db()
+        self.authors[0].refresh_from_db()
+        self.assertEqual(self.user.following_count, 1)
+        self.assertEqual(self.authors[0].followers_count, 1)
+
+        self.client.delete(follow_url(self.authors[0].id))
+        self.client.delete(follow_url(self.authors[0].id))
+        self.user.refresh_from_db()
+        self.authors[0].refresh_from_db()
+        self.assertEqual(self.user.following_count, 0)
+        self.assertEqual(self.authors[0].followers_count, 0)
+
+    def test_bulk_follow_status(self):
+        """Тест: статус подписки на список авторов возвращается одним запросом"""
+        self.client.post(follow_url(self.authors[1].id))
+        ids = ','.join(str(a.id) for a in self.authors)
+        with self.assertNumQueries(1):
+            response = self.client.get(FOLLOW_STATUS_URL, {'ids': ids})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            str(self.authors[0].id): False,
+            str(self.authors[1].id): True,
+            str(self.authors[2].id): False,
+        })
+
+    def test_bulk_follow_status_invalid_ids(self):
+        """Тест: некорректный список id"""
+        response = self.client.get(FOLLOW_STATUS_URL, {'ids': '1,abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_follow_status_limits_ids(self):
+        """Тест: больше MAX_FOLLOW_STATUS_IDS авторов за раз — 400 без запроса к подпискам"""
+        ids = ','.join(str(i) for i in range(1, MAX_FOLLOW_STATUS_IDS + 2))
+        with self.assertNumQueries(0):
+            response = self.client.get(FOLLOW_STATUS_URL, {'ids': ids})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        ids = ','.join(str(i) for i in range(1, MAX_FOLLOW_STATUS_IDS + 1))
+        self.assertEqual(self.client.get(FOLLOW_STATUS_URL, {'ids': ids}).status_code, status.HTTP_200_OK)
+
+    def test_recipe_list_includes_follow_status_without_extra_queries(self):
+        """Тест: is_following и счетчики авторов в списке рецептов не дают N+1"""
+        self.client.post(follow_url(self.authors[0].id))
+        for author in self.authors:
+            for i in range(3):
+                Recipe.objects.create(author=author, title=f'{author.username} {i}', description='...',
+                                      instructions='...', cooking_time_minutes=1, servings=1)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(RECIPES_LIST_URL)
+        followers_queries = [q for q in captured.captured_queries if 'users_followers' in q['sql']]
+        self.assertEqual(len(followers_queries), 1)
+
+        results = [r for r in response.data['results'] if r['author']['id'] == self.authors[0].id]
+        self.assertTrue(results)
+        self.assertTrue(all(r['author']['is_following'] for r in results))
+        self.assertEqual(results[0]['author']['followers_count'], 1)
+
+        response = self.client.get(RECIPES_LIST_URL, {'author': self.authors[1].id})
+        self.assertFalse(any(r['author']['is_following'] for r in response.data['results']))
+
+    def test_comments_follow_status_single_query(self):
+        """Тест: статус подписки для авторов комментариев считается одним запросом на страницу"""
+        recipe = Recipe.objects.create(author=self.authors[0], title='...', description='...',
+                                       instructions='...', cooking_time_minutes=1, servings=1)
+        self.client.post(follow_url(self.authors[1].id))
+        for author in self.authors:
+            Comment.objects.create(recipe=recipe, author=author, comment_text='...')
+
+        response = self.client.get(COMMENTS_LIST_URL, {'recipe__id': recipe.id})
+        statuses = {c['author']['username']: c['author']['is_following'] for c in response.data['results']}
+        self.assertEqual(statuses, {'author0': False, 'author1': True, 'author2': False})
@@ -1,15 +1,23 @@
 from django.contrib.auth import get_user_model
+from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from recipe.feed import backfill_author, remove_author
+from .follows import follow, unfollow, get_following_ids
 from .models import CustomUser
 from .serializers import UserRegistrationSerializer, UserSerializer
 
+# Сколько авторов можно проверить одним запросом follow_status
+MAX_FOLLOW_STATUS_IDS = 100
+
 
 @method_decorator(never_cache, name='dispatch')
 class UserRegistrationViewSet(viewsets.ViewSet):
@@ -41,4 +49,46 @@ class UserViewSet(viewsets.ViewSet):
     def retrieve(self, request, pk):
         user = self.queryset.objects.get(pk=pk)
         serializer = self.serializer_class(user)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(methods=['post', 'delete'], request_body=None)
+    @action(detail=True, methods=['post', 'delete'])
+    def follow(self, request, pk=None):
+        """POST — подписаться на автора, DELETE — отписаться"""
+        author = get_object_or_404(self.queryset, pk=pk)
+        if author.id == request.user.id:
+            return Response({"message": "You cannot follow yourself"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.method == 'DELETE':
+            if unfollow(request.user, author):
+                remove_author(request.user, author)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        created = follow(request.user, author)
+        if created:
+            backfill_author(request.user, author)
+        return Response(
+            {"message": "Followed successfully"},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    @swagger_auto_schema(manual_parameters=[
+        openapi.Parameter('ids', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                          description=f"Список id авторов через запятую (не больше {MAX_FOLLOW_STATUS_IDS})")
+    ])
+    @action(detail=False, methods=['get'])
+    def follow_status(self, request):
+        """Возвращает статус подписки текущего пользователя на каждого из авторов одним запросом"""
+        try:
+            author_ids = [int(i) for i in request.query_params.get('ids', '').split(',') if i.strip()]
+        except ValueError:
+            return Response({"message": "ids must be a comma-separated list of integers"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(author_ids) > MAX_FOLLOW_STATUS_IDS:
+            return Response({"message": f"ids must contain at most {MAX_FOLLOW_STATUS_IDS} items"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        following_ids = get_following_ids(request.user, author_ids)
+        return Response(
+            {str(author_id): author_id in following_ids for author_id in author_ids},
+            status=status.HTTP_200_OK
+        )